@@ -5,135 +5,336 @@ Modulo principale del backend Flask.
 Gestisce la comunicazione tra frontend e modello AI
 """
 
+# Misura del tempo di import dell'applicazione (report di import)
+import time
+_import_start = time.perf_counter()
+
 # Import principali per la creazione del server Flask e gestione richieste HTTP
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 
 # Modelli linguistici e embedding tramite LangChain + Ollama
-from langchain_ollama import ChatOllama, OllamaEmbeddings
-
-# Vector Store in memoria per salvataggio temporaneo degli embedding
-from langchain_community.vectorstores import InMemoryVectorStore
+from langchain_ollama import ChatOllama
 
 from core.config import (
     ModelConfig,       # Parametri del modello di chat Ollama
     EmbeddingConfig,   # Parametri del modello di embedding
+    RetrievalConfig,   # Parametri della ricerca semantica (RAG)
     ChatConfig,        # Parametri di sessione chat
+    FeatureConfig,     # Profili di funzionalità (testo, STT, TTS)
     WebConfig,         # Impostazioni server Flask
     KokoroConfig,      # Parametri per la voce sintetica (TTS)
     WhisperConfig      # Parametri per il modello di trascrizione audio (ASR)
 )
 
-# Formattazione per HTML e TTS
-from core.utils import format_for_html, format_for_tts
+# Formattazione per HTML, TTS e risposte HTTP
+from core.utils import format_for_html, format_for_tts, format_sse, split_sentences, encode_multipart
+
+# Codifica WAV dei segmenti audio e decodifica dell'audio degli utenti, in memoria
+from core.audio_utils import encode_wav, decode_audio, audio_extension
+from core.audio_preprocessing import EmptyUtteranceError, preprocess_speech
+
+# Embedding delle domande con cache condivisa (chat e generazione delle domande)
+from core.embedding_cache import get_query_embeddings
+
+# Cronologia conversazionale per sessione
+from core.session_store import SessionStore
+
+# Riassunto progressivo della conversazione in background
+from core.conversation_memory import ConversationSummarizer
+
+# Cache semantica delle risposte (domande simili, stessi documenti)
+from core.answer_cache import AnswerCache, answer_scope
+
+# Cache dell'audio sintetizzato da Kokoro
+from core.tts_cache import TTSCache
+
+# Sintesi vocale parallela su più processi
+from core.tts_engine import ParallelSynthesizer
 
 # Embedding e creazione .db vettoriali
 from core.vector_utils import load_DB, get_relevant_chunks
 
-# Libreria PyTorch
-import torch
+# Assemblaggio dei documenti recuperati nel contesto (dedup + budget di token)
+from core.context_builder import build_document_context
 
-# Gestione di stringhe binarie e codifica base64
-import base64
+# Caricamento dei modelli in background, warm-up e stato per /health e /ready
+from core.model_loader import ComponentRegistry
 
-# Lettura/scrittura di file audio
-import soundfile as sf
+# Trascrizione incrementale delle domande vocali (VAD + Whisper per segmento)
+from core.streaming_asr import StreamingTranscriber
+from core.batch_transcription import BatchTranscriber
+from core.whisper_profiles import load_whisper, transcribe_options
 
-# Moduli principali di Kokoro
-from kokoro import KPipeline, KModel
+# Profili di funzionalità e import differito delle librerie audio
+from core.features import profile_features, detect_device, current_rss_mb, import_report, print_import_report
 
-# Whisper per la trascrizione vocale (speech-to-text)
-import whisper
+# Gestione di stringhe binarie e codifica base64
+import base64
 
-# Pydub per conversione e manipolazione di file audio
-from pydub import AudioSegment
+# Concatenazione in memoria dei segmenti audio
+import numpy as np
 
 # Libreria standard per gestire flussi binari in memoria
 import io
 
+# Serializzazione dei metadati nelle risposte multipart
+import json
+
 # Libreria standard per gestire percorsi e file system
 import os
 
+# Codifica dei testi negli header HTTP
+from urllib.parse import quote
+
+# Generazione degli identificativi di sessione
+import re
+import uuid
+
+# Librerie standard per la pipeline LLM → TTS (produttore/consumatore)
+import queue
+import threading
+
+# Archiviazione in background dell'audio degli utenti
+from concurrent.futures import ThreadPoolExecutor
+
+# WebSocket per la trascrizione in streaming (dipendenza opzionale: flask-sock)
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# Parametri da riga di comando (profilo, report di import)
+import argparse
+
+# Tempo e memoria dell'import dell'applicazione (senza librerie audio)
+_import_seconds = time.perf_counter() - _import_start
+_import_rss = current_rss_mb()
+
 
 class AICompanion:
-    def __init__(self):
-        """Costruttore: inizializza tutti i moduli principali e registra le route Flask."""
+    def __init__(self, profile: str = FeatureConfig.PROFILE, asr_profile: str = WhisperConfig.ASR_PROFILE,
+                 tts_workers: int = KokoroConfig.WORKERS):
+        """
+        Costruttore: inizializza tutti i moduli principali e registra le route Flask.
+
+        Parametri:
+            profile (str): Profilo di funzionalità (vedi FeatureConfig.PROFILES).
+            asr_profile (str): Profilo di inferenza Whisper (vedi WhisperConfig.ASR_PROFILES).
+            tts_workers (int): Processi di sintesi vocale (0 = sintesi nel processo del server).
+        """
+
+        # SEZIONE PROFILO
+        # Funzionalità audio abilitate: "stt" (Whisper) e/o "tts" (Kokoro)
+        self.profile = profile
+        self.features = profile_features(profile)
+        self.stt_enabled = "stt" in self.features
+        self.tts_enabled = "tts" in self.features
+
+        # Profilo Whisper: modello (float32 o int8) e preset di decodifica
+        self.asr_profile = asr_profile
+        self.asr_options = transcribe_options(asr_profile)
+
+        # Sintesi vocale: nel processo del server oppure su un pool di processi
+        self.tts_workers = tts_workers
 
         # SEZIONE DISPOSITIVO
         # Se CUDA è disponibile, usa la GPU, altrimenti la CPU
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Dispositivo scelto per il modello: {self.device}")
+        # (torch viene importato solo se il profilo include funzionalità audio)
+        self.device = detect_device() if self.features else "cpu"
+        print(f"Profilo: {profile} - dispositivo scelto per il modello: {self.device}")
 
         # SEZIONE FLASK
         # Crea l'app Flask, specificando la cartella dei file statici (frontend)
         self.app = Flask(__name__, static_folder=WebConfig.STATIC_FOLDER)
 
-        # SEZIONE MODELLO DI CHAT
-        # Inizializza il modello linguistico Ollama con i parametri da config
-        self.model = ChatOllama(
+        # WebSocket sull'app Flask (trascrizione in streaming), se flask-sock è installato
+        self.sock = Sock(self.app) if Sock is not None else None
+
+        # SEZIONE COMPONENTI (MODELLI E DATABASE)
+        # Ogni componente viene caricato una sola volta ed eseguito a vuoto (warm-up);
+        # con WebConfig.LAZY_LOADING il caricamento avviene in background e il server
+        # accetta subito connessioni (le richieste attendono solo i componenti che usano)
+        self.components = ComponentRegistry()
+        self.components.add("llm", self._load_chat_model, self._warmup_chat_model)
+        self.components.add("embeddings", self._load_embeddings, self._warmup_embeddings)
+        self.components.add("vectorstore", self._load_retriever)
+        if self.tts_enabled:
+            self.components.add("tts", self._load_tts, self._warmup_tts)
+        if self.stt_enabled:
+            self.components.add("asr", self._load_asr, self._warmup_asr)
+
+        # SEZIONE CRONOLOGIA CHAT
+        # Mantiene lo storico delle conversazioni (prompt e risposte) separato per sessione,
+        # con un buffer circolare di messaggi per ciascun client
+        self.summary_mode = ChatConfig.MEMORY_MODE == "summary"
+        self.sessions = SessionStore(
+            # Messaggi conservati per sessione (in modalità riassunto: in attesa di essere riassunti)
+            max_messages=ChatConfig.SUMMARY_MAX_PENDING if self.summary_mode else ChatConfig.CHAT_HISTORY_LIMIT,
+            max_sessions=ChatConfig.MAX_SESSIONS, # Numero massimo di sessioni in memoria
+            idle_timeout=ChatConfig.SESSION_IDLE_TIMEOUT, # Secondi di inattività prima dell'eliminazione
+            memory_limit=ChatConfig.SESSION_MEMORY_LIMIT # Memoria stimata complessiva (byte)
+        )
+
+        # I messaggi più vecchi vengono fusi in un riassunto dopo ogni risposta
+        self.summarizer = ConversationSummarizer(self.sessions) if self.summary_mode else None
+
+        # SEZIONE CACHE DELLE RISPOSTE
+        # Risposte (e audio) riusate per domande simili con gli stessi documenti recuperati
+        self.answer_cache = AnswerCache() if ChatConfig.ANSWER_CACHE else None
+
+        # Cache dell'audio sintetizzato (frasi ricorrenti e risposte ripetute)
+        self.tts_cache = TTSCache() if KokoroConfig.CACHE and self.tts_enabled else None
+
+        # SEZIONE SALVATAGGIO
+        # Salvataggio su disco (storico domande/risposte)
+        os.makedirs("questions", exist_ok=True)
+        os.makedirs("responses", exist_ok=True)
+
+        # Indici dei file salvati, riservati in modo thread-safe (vedi reserve_index)
+        self._index_lock = threading.Lock()
+        self._last_index = 0
+
+        # Una trascrizione Whisper alla volta (richieste /audio e flussi WebSocket concorrenti)
+        self._asr_lock = threading.Lock()
+
+        # L'audio originale degli utenti viene archiviato fuori dal percorso critico della risposta
+        self.archiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-archive") \
+            if self.stt_enabled and WhisperConfig.ARCHIVE_AUDIO else None
+
+        # SEZIONE ROUTE FLASK
+        # Registra tutte le route API (es. /test, /audio, /static ecc.)
+        self._register_routes()
+
+        # Avvio del caricamento: in background oppure subito, prima di accettare connessioni
+        self.components.start(background=WebConfig.LAZY_LOADING)
+
+    # CARICAMENTO DEI COMPONENTI
+    def _load_chat_model(self):
+        """Inizializza il modello linguistico Ollama con i parametri da config."""
+        return ChatOllama(
             model=ModelConfig.NAME, # Nome modello 
             temperature=ModelConfig.TEMPERATURE, # Controlla la creatività delle risposte
             reasoning=ModelConfig.REASONING, # Abilita eventuali capacità di ragionamento
             device=self.device # Esegue su GPU se disponibile
         )
 
-        # SEZIONE EMBEDDINGS & VECTOR STORE
-        # Generatore di embeddings basato su Ollama
-        self.embeddings = OllamaEmbeddings(model=EmbeddingConfig.NAME)
+    def _warmup_chat_model(self, model):
+        """Carica il modello nella memoria di Ollama con una generazione di un solo token."""
+        model.invoke([("human", "Ciao")], options={"num_predict": 1})
 
-        # Carica e unisce tutti i database vettoriali presenti in ./vs
-        # Ogni .db contiene embedding di documenti diversi utilizzati per la ricerca semantica (RAG)
-        self.vs = load_DB()
+    def _load_embeddings(self):
+        """Generatore di embeddings basato su Ollama, con cache delle domande condivisa dal processo."""
+        return get_query_embeddings(EmbeddingConfig.NAME)
 
-        # Crea un retriever dal Vector Store per effettuare ricerche semantiche (RAG)
-        # Il retriever permette di recuperare i documenti più rilevanti rispetto a una domanda utente.
-        self.retriever = self.vs.as_retriever()
+    def _warmup_embeddings(self, embeddings):
+        """Carica il modello di embedding in Ollama (senza passare dalla cache delle domande)."""
+        embeddings.embeddings.embed_query("warm-up")
 
-        # SEZIONE CRONOLOGIA CHAT
-        # Mantiene lo storico delle conversazioni (prompt e risposte)
-        self.chat_history = []
+    def _load_retriever(self):
+        """
+        Carica e unisce tutti i database vettoriali presenti in ./vs in un unico VectorIndex
+        e crea il retriever per la ricerca semantica (RAG).
+        """
+        return load_DB().as_retriever(k=RetrievalConfig.TOP_K)
 
-        # SEZIONE MODELLO AUDIO - TTS (KOKORO)
-        # Inizializza il modello vocale di Kokoro e lo porta su CPU
-        self.kmodel = KModel(
+    def _load_tts(self):
+        """
+        Inizializza il modello vocale di Kokoro (su CPU) e la pipeline di sintesi vocale,
+        oppure il pool di processi di sintesi se `tts_workers` > 0.
+        """
+        if self.tts_workers > 0:
+            return ParallelSynthesizer(workers=self.tts_workers)
+
+        # Moduli principali di Kokoro (import pesante, solo quando serve)
+        from kokoro import KPipeline, KModel
+
+        kmodel = KModel(
             model=KokoroConfig.MODEL_PATH, # Percorso al file del modello TTS
             config=KokoroConfig.CONFIG_PATH # Percorso al file di configurazione
         ).to("cpu")
 
-        # Pipeline di sintesi vocale (Text-to-Speech)
-        self.pipeline = KPipeline(
-            lang_code="i", # Codice lingua ("i" per italiano)
-            model=self.kmodel
+        return KPipeline(
+            lang_code=KokoroConfig.LANG_CODE, # Codice lingua ("i" per italiano)
+            model=kmodel
         )
 
-        # SEZIONE MODELLO AUDIO - ASR (WHISPER)
-        # Carica il modello Whisper per la trascrizione audio → testo
-        self.wmodel = whisper.load_model(
-            name=WhisperConfig.MODEL_PATH, # Nome o percorso del modello Whisper
-            device=WhisperConfig.DEVICE_NAME # Dispositivo su cui caricare il modello
-        )
+    def _warmup_tts(self, pipeline):
+        """Prima sintesi a vuoto: carica la voce e inizializza il modello (in ogni processo di sintesi)."""
+        if isinstance(pipeline, ParallelSynthesizer):
+            pipeline.warmup()
+            return
 
-        # SEZIONE SALVATAGGIO
-        # Salvataggio su disco (storico domande/risposte)
-        os.makedirs("questions", exist_ok=True)
-        os.makedirs("responses", exist_ok=True)
+        for _ in pipeline("Ciao.", voice=KokoroConfig.VOICE_PATH, speed=KokoroConfig.AUDIO_SPEED):
+            pass
 
-        # SEZIONE ROUTE FLASK
-        # Registra tutte le route API (es. /test, /audio, /static ecc.)
-        self._register_routes()
+    def _load_asr(self):
+        """Carica il modello Whisper per la trascrizione audio → testo (quantizzato se previsto dal profilo)."""
+        return load_whisper(
+            name=WhisperConfig.MODEL_PATH, # Nome o percorso del modello Whisper
+            device=WhisperConfig.DEVICE_NAME, # Dispositivo su cui caricare il modello
+            profile=self.asr_profile # Profilo di inferenza (float32 o int8)
+        )
 
-    def create_context(self, user_message: str, retrieved_documents: str):
+    def _warmup_asr(self, wmodel):
+        """Prima trascrizione a vuoto (1 s di silenzio a 16 kHz)."""
+        wmodel.transcribe(np.zeros(16000, dtype=np.float32), **self.asr_options)
+
+    # Componenti (attendono il caricamento, se ancora in corso)
+    @property
+    def model(self):
+        """Modello di chat (ChatOllama)."""
+        return self.components.get("llm")
+
+    @property
+    def embeddings(self):
+        """Embedding delle domande (con cache)."""
+        return self.components.get("embeddings")
+
+    @property
+    def retriever(self):
+        """Retriever sull'indice vettoriale unico di tutti i database."""
+        return self.components.get("vectorstore")
+
+    @property
+    def vs(self):
+        """Indice vettoriale unico di tutti i database (VectorIndex)."""
+        return self.retriever.index
+
+    @property
+    def pipeline(self):
+        """Pipeline di sintesi vocale Kokoro (KPipeline, oppure ParallelSynthesizer con `tts_workers` > 0)."""
+        return self.components.get("tts")
+
+    @property
+    def kmodel(self):
+        """Modello vocale Kokoro (KModel; None se la sintesi avviene nei processi worker)."""
+        return self.pipeline.model
+
+    @property
+    def wmodel(self):
+        """Modello Whisper per la trascrizione."""
+        return self.components.get("asr")
+
+    def create_context(self, user_message: str, retrieved_documents: list, history: list, summary: str = ""):
         """
         Crea il contesto completo da fornire al modello di chat.
 
+        I documenti recuperati vengono uniti (chunk sovrapposti della stessa fonte),
+        ripuliti dai quasi-duplicati e inseriti per pertinenza fino al budget di
+        token RetrievalConfig.CONTEXT_TOKEN_BUDGET.
+
         Parametri:
             user_message (str): Messaggio inviato dall'utente.
-            retrieved_documents (str): Testo concatenato dei documenti recuperati dal VectorStore.
+            retrieved_documents (list[Document]): Documenti recuperati dal VectorStore, dal più pertinente.
+            history (list[tuple[str, str]]): Cronologia recente della sessione.
+            summary (str): Riassunto dei messaggi precedenti alla cronologia recente (se presente).
 
         Restituisce:
             list[tuple[str, str]]: Lista di coppie (ruolo, messaggio) da passare al modello.
                                    Include:
                                    - Prompt di sistema base
                                    - Eventuali documenti di contesto
+                                   - Eventuale riassunto della conversazione
                                    - Cronologia conversazionale recente
                                    - Ultimo messaggio utente
         """
@@ -141,18 +342,22 @@ class AICompanion:
         # Prompt di sistema iniziale, definito in config
         context_messages = [('system', ModelConfig.BASE_SYSTEM_PROMPT.strip())]
 
+        # Testo dei documenti: senza sovrapposizioni né duplicati, entro il budget di token
+        doc_text = build_document_context(retrieved_documents)
+
         # Se sono stati recuperati documenti dal Vector Store, li aggiunge al contesto
-        if retrieved_documents:
+        if doc_text:
             context_messages.append((
                 'system',
-                f"{ModelConfig.DOC_SYSTEM_TEMPLATE.strip()}\n{retrieved_documents}"
+                f"{ModelConfig.DOC_SYSTEM_TEMPLATE.strip()}\n{doc_text}"
             ))
 
-        # Limita la cronologia alle ultime N interazioni 
-        limited_history = self.chat_history[-ChatConfig.CHAT_HISTORY_LIMIT:]
+        # Riassunto dei messaggi più vecchi (modalità "summary")
+        if summary:
+            context_messages.append(('system', f"{ModelConfig.SUMMARY_CONTEXT_TEMPLATE}\n{summary}"))
 
-        # Aggiunge la cronologia al contesto
-        context_messages.extend(limited_history)
+        # Aggiunge la cronologia al contesto (già limitata alle interazioni recenti)
+        context_messages.extend(history)
 
         # Inserisce il messaggio corrente dell’utente
         context_messages.append(('human', user_message))
@@ -160,18 +365,135 @@ class AICompanion:
         # Ritorna il contesto completo (system + documents + history + user)
         return context_messages
 
-    def chat_text(self, user_message):
+    def retrieve_context(self, user_message: str, session_id: str, documents: list = None):
+        """
+        Recupera i documenti pertinenti e costruisce il contesto per il modello.
+
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            session_id (str): Sessione di cui usare la cronologia.
+            documents (list[Document]): Documenti già recuperati (se None vengono recuperati ora).
+
+        Restituisce:
+            list[tuple[str, str]]: Contesto completo (system + documenti + cronologia + utente).
+        """
+
+        # Recupera documenti rilevanti (se non già recuperati)
+        if documents is None:
+            documents = self.retriever.invoke(user_message)
+
+        # Riassunto e coda recente (limitata in token) oppure ultimi CHAT_HISTORY_LIMIT messaggi
+        budget = ChatConfig.HISTORY_TOKEN_BUDGET if self.summary_mode else None
+        summary, history = self.sessions.get_context(session_id, budget)
+
+        # Combina prompt di sistema, documenti, riassunto, cronologia e messaggio utente
+        return self.create_context(user_message, documents, history, summary)
+
+    def lookup_answer(self, user_message: str, documents: list, query_vector, session_id: str,
+                      use_cache: bool = True):
+        """
+        Cerca nella cache una risposta a una domanda simile con gli stessi documenti.
+
+        La cache vale solo per le domande autonome: se la sessione ha già una
+        cronologia (o un riassunto) la risposta può dipendere dai messaggi
+        precedenti ("perché?") e la cache viene ignorata. Viene ignorata anche
+        quando il retriever si è fermato alla via lessicale, per non calcolare
+        un embedding che la ricerca ha evitato.
+
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            documents (list[Document]): Documenti recuperati per il messaggio.
+            query_vector (np.ndarray | None): Embedding della domanda calcolato dal retriever (None = via lessicale).
+            session_id (str): Sessione conversazionale del client.
+            use_cache (bool): Se False la cache viene ignorata (né letta né aggiornata).
+
+        Restituisce:
+            tuple[CachedAnswer | None, tuple | None]: Risposta salvata (se trovata) e
+            riferimento (embedding, ambito) con cui salvare la nuova risposta.
+        """
+        if self.answer_cache is None or not use_cache or query_vector is None:
+            return None, None
+
+        # Domanda che segue altri messaggi: la risposta dipende dal contesto della sessione
+        summary, history = self.sessions.get_context(session_id)
+        if summary or history:
+            return None, None
+
+        # Chiave semantica: l'embedding della domanda già usato dal retriever
+        scope = answer_scope(documents, f"{ModelConfig.BASE_SYSTEM_PROMPT}\0{ModelConfig.DOC_SYSTEM_TEMPLATE}")
+        return self.answer_cache.get(query_vector, scope), (query_vector, scope)
+
+    def record_exchange(self, user_message: str, ai_message_raw: str, session_id: str):
+        """
+        Aggiorna la cronologia della sessione con il messaggio utente e la risposta.
+
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            ai_message_raw (str): Testo completo della risposta.
+            session_id (str): Sessione di cui aggiornare la cronologia.
+        """
+
+        # Aggiunge il messaggio utente e la risposta AI alla cronologia
+        # (testo del modello, non HTML: i tag occuperebbero token nei prompt successivi)
+        self.sessions.append(session_id, 'human', user_message)
+        self.sessions.append(session_id, 'assistant', ai_message_raw)
+
+        # Aggiorna il riassunto in background, senza rallentare la risposta
+        if self.summarizer is not None:
+            self.summarizer.schedule(session_id)
+
+    def finalize_response(self, user_message: str, ai_message_raw: str, session_id: str, cache_ref: tuple = None):
+        """
+        Formatta la risposta grezza del modello e aggiorna la cronologia.
+
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            ai_message_raw (str): Testo completo generato dal modello.
+            session_id (str): Sessione di cui aggiornare la cronologia.
+            cache_ref (tuple | None): Riferimento restituito da `lookup_answer`, per salvare la risposta in cache.
+
+        Restituisce:
+            tuple[str, str]: Risposta formattata per HTML e per TTS.
+        """
+
+        # Converte la risposta per output HTML 
+        ai_message_html = format_for_html(ai_message_raw)
+        # Converte la risposta per sintesi vocale
+        ai_message_tts = format_for_tts(ai_message_raw)
+
+        self.record_exchange(user_message, ai_message_raw, session_id)
+
+        # Salva la risposta per le domande simili successive
+        if cache_ref is not None and ai_message_raw:
+            self.answer_cache.put(*cache_ref, ai_message_raw, ai_message_html, ai_message_tts)
+
+        return ai_message_html, ai_message_tts
+
+    def cached_response(self, user_message: str, cached, session_id: str):
+        """
+        Restituisce una risposta salvata in cache, aggiornando la cronologia come per una risposta nuova.
+
+        Restituisce:
+            tuple[str, str]: Risposta salvata, formattata per HTML e per TTS.
+        """
+        self.record_exchange(user_message, cached.raw, session_id)
+        return cached.html, cached.tts
+
+    def chat_text(self, user_message, session_id, use_cache=True):
         """
         Gestisce una singola interazione testuale con l'assistente AI.
 
         Passaggi:
         1. Recupera documenti semantici pertinenti tramite il retriever.
-        2. Costruisce il contesto con documenti + cronologia + messaggio utente.
-        3. Invoca il modello linguistico (ChatOllama) con il contesto.
-        4. Restituisce la risposta formattata per HTML e TTS.
+        2. Se una domanda simile con gli stessi documenti ha già una risposta in cache, la restituisce.
+        3. Costruisce il contesto con documenti + cronologia + messaggio utente.
+        4. Invoca il modello linguistico (ChatOllama) con il contesto.
+        5. Restituisce la risposta formattata per HTML e TTS.
 
         Parametri:
             user_message (str): Messaggio inviato dall'utente.
+            session_id (str): Sessione conversazionale del client.
+            use_cache (bool): Se False ignora la cache delle risposte.
 
         Restituisce:
             tuple[str, str]:
@@ -179,14 +501,14 @@ class AICompanion:
                 - ai_message_tts → Risposta pulita per la sintesi vocale (TTS).
         """
 
-        # Recupera documenti rilevanti 
-        documents = self.retriever.invoke(user_message)
-
-        # Concatena il contenuto testuale dei documenti trovati
-        doc_text = "\n".join(doc.page_content for doc in documents)
+        # Recupera documenti rilevanti e cerca una risposta già data a una domanda simile
+        documents, query_vector = self.retriever.search(user_message)
+        cached, cache_ref = self.lookup_answer(user_message, documents, query_vector, session_id, use_cache)
+        if cached is not None:
+            return self.cached_response(user_message, cached, session_id)
 
         # Combina prompt di sistema, documenti, cronologia e messaggio utente
-        context = self.create_context(user_message, doc_text)
+        context = self.retrieve_context(user_message, session_id, documents)
 
         # Esegue la chiamata al modello Ollama con il contesto completo
         response = self.model.invoke(context)
@@ -194,84 +516,522 @@ class AICompanion:
         # Estrae la risposta testuale grezza 
         ai_message_raw = getattr(response, "content", str(response)).strip()
 
-        # Converte la risposta per output HTML 
-        ai_message_html = format_for_html(ai_message_raw)
-        # Converte la risposta per sintesi vocale
-        ai_message_tts = format_for_tts(ai_message_raw)
+        # Restituisce la risposta HTML per la chat e la versione TTS per eventuale voce
+        return self.finalize_response(user_message, ai_message_raw, session_id, cache_ref)
 
-        # Aggiunge il messaggio utente e la risposta AI alla cronologia
-        self.chat_history.append(('human', user_message))
-        self.chat_history.append(('assistant', ai_message_html))
+    def chat_text_stream(self, user_message, session_id, use_cache=True):
+        """
+        Variante in streaming di `chat_text`: restituisce i token man mano che
+        il modello li genera tramite `ChatOllama.stream`.
 
-        # Restituisce la risposta HTML per la chat e la versione TTS per eventuale voce
-        return ai_message_html, ai_message_tts
+        La formattazione HTML/TTS e l'aggiornamento della cronologia avvengono
+        solo a generazione conclusa, sul testo completo. Una risposta trovata
+        in cache viene inviata come unico frammento.
 
-    def text_to_speech(self, text):
-            """
-            Converte un testo in parlato (audio WAV) utilizzando il modello Kokoro.
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            session_id (str): Sessione conversazionale del client.
+            use_cache (bool): Se False ignora la cache delle risposte.
 
-            Passaggi:
-            1. Esegue la pipeline TTS (Text-To-Speech) con la voce e velocità configurate.
-            2. Salva ciascun frammento audio generato su disco.
-            3. Restituisce i percorsi dei file audio generati.
+        Restituisce (generatore):
+            tuple[str, object]:
+                - ("token", str) → frammento di testo appena generato
+                - ("done", (ai_message_html, ai_message_tts)) → evento finale
+        """
 
-            Parametri:
-                text (str): Testo da convertire in parlato.
+        # Recupera documenti rilevanti e cerca una risposta già data a una domanda simile
+        documents, query_vector = self.retriever.search(user_message)
+        cached, cache_ref = self.lookup_answer(user_message, documents, query_vector, session_id, use_cache)
+        if cached is not None:
+            yield "token", cached.raw
+            yield "done", self.cached_response(user_message, cached, session_id)
+            return
 
-            Restituisce:
-                list[str]: Elenco dei percorsi ai file WAV generati.
-            """
+        # Combina prompt di sistema, documenti, cronologia e messaggio utente
+        context = self.retrieve_context(user_message, session_id, documents)
+
+        # Accumula i frammenti per ricostruire la risposta completa
+        parts = []
+
+        for chunk in self.model.stream(context):
+            token = getattr(chunk, "content", str(chunk))
+            if not token:
+                continue
+            parts.append(token)
+            yield "token", token
+
+        # Risposta completa → formattazione e cronologia
+        ai_message_raw = "".join(parts).strip()
+        yield "done", self.finalize_response(user_message, ai_message_raw, session_id, cache_ref)
+
+    def reserve_index(self) -> int:
+        """
+        Riserva il prossimo indice libero (1, 2, 3, ...) per i file di `questions/` e `responses/`.
+
+        Gli indici già riservati non vengono riassegnati anche se i relativi file
+        non sono ancora stati scritti (es. archiviazione audio in background).
+        """
+        with self._index_lock:
+            used = {name.split(".", 1)[0] for name in os.listdir("questions")}
+            idx = self._last_index + 1
+            while str(idx) in used:
+                idx += 1
+            self._last_index = idx
+            return idx
+
+    def save_text_exchange(self, user_message: str, ai_message_tts: str) -> int:
+        """
+        Salva su disco domanda e risposta testuale con il prossimo indice libero.
+
+        Restituisce:
+            int: Indice usato per i file `questions/{idx}.txt` e `responses/{idx}.txt`.
+        """
+
+        # Riserva il prossimo indice disponibile
+        idx = self.reserve_index()
+
+        # Salva la domanda
+        with open(os.path.join("questions", f"{idx}.txt"), "w", encoding="utf-8") as f:
+            f.write(user_message)
 
+        # Salva la risposta (versione pulita per TTS)
+        with open(os.path.join("responses", f"{idx}.txt"), "w", encoding="utf-8") as f:
+            f.write(ai_message_tts)
+
+        return idx
+
+    def save_audio_question(self, audio_bytes: bytes, mimetype: str = None) -> int:
+        """
+        Riserva l'indice della domanda vocale e, se `WhisperConfig.ARCHIVE_AUDIO`,
+        archivia in background l'audio originale in `questions/{idx}.<estensione>`.
+
+        Parametri:
+            audio_bytes (bytes): Contenuto dell'audio inviato dall'utente.
+            mimetype (str): Content-Type della richiesta (determina l'estensione del file).
+
+        Restituisce:
+            int: Indice usato per i file della domanda e della risposta.
+        """
+
+        # Riserva il prossimo indice disponibile
+        idx = self.reserve_index()
+
+        # Scrittura su disco fuori dal percorso critico della risposta
+        if self.archiver is not None:
+            user_path = os.path.join("questions", f"{idx}{audio_extension(mimetype)}")
+            self.archiver.submit(self._write_file, user_path, audio_bytes)
+
+        return idx
+
+    def save_stream_question(self, audio) -> int:
+        """
+        Riserva l'indice di una domanda vocale ricevuta in streaming e, se
+        `WhisperConfig.ARCHIVE_AUDIO`, la archivia in background come WAV.
+
+        Parametri:
+            audio (np.ndarray): Campioni float32 mono a `WhisperConfig.SAMPLE_RATE`.
+
+        Restituisce:
+            int: Indice usato per i file della domanda e della risposta.
+        """
+        idx = self.reserve_index()
+
+        if self.archiver is not None and len(audio):
+            user_path = os.path.join("questions", f"{idx}.wav")
+            self.archiver.submit(lambda: self._write_file(user_path, encode_wav(audio, WhisperConfig.SAMPLE_RATE)))
+
+        return idx
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        """Scrive un file binario (eseguita in background dall'archiviazione audio)."""
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"[audio-archive] Impossibile salvare {path}: {e}")
+
+    def save_text(self, folder: str, idx: int, text: str):
+        """Salva un testo su disco nel file `{folder}/{idx}.txt`."""
+        with open(os.path.join(folder, f"{idx}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def chat_events(self, user_message: str, session_id: str, generate_audio: bool, save_response,
+                    use_cache: bool = True):
+        """
+        Converte lo stream di una risposta in eventi serializzabili (nome, dati JSON),
+        comuni a Server-Sent Events e WebSocket.
+
+        Parametri:
+            user_message (str): Messaggio dell'utente (testo o trascrizione).
+            session_id (str): Sessione conversazionale del client.
+            generate_audio (bool): Se True usa la sintesi vocale in pipeline.
+            save_response (callable): Chiamata con la risposta TTS completa per salvarla su disco.
+            use_cache (bool): Se False ignora la cache delle risposte.
+
+        Restituisce (generatore):
+            tuple[str, dict]: Eventi `token`, `audio`, `done` oppure `error`.
+        """
+        try:
+            if generate_audio:
+                events = self.chat_speech_stream(user_message, session_id, use_cache)
+            else:
+                events = self.chat_text_stream(user_message, session_id, use_cache)
+
+            for event, payload in events:
+                if event == "token":
+                    yield "token", {"text": payload}
+
+                elif event == "audio":
+                    # Segmento audio pronto: WAV in memoria codificato in Base64
+                    index, text, audio = payload
+                    wav_bytes = encode_wav(audio, KokoroConfig.AUDIO_FREQ)
+                    yield "audio", {
+                        "index": index,
+                        "text": text,
+                        "base64": base64.b64encode(wav_bytes).decode("utf-8"),
+                    }
+
+                else:
+                    # Evento finale: risposta completa già formattata
+                    ai_message_html, ai_message_tts = payload
+                    save_response(ai_message_tts)
+                    yield "done", {
+                        "user": user_message,
+                        "response": ai_message_tts,
+                        "html": ai_message_html,
+                    }
+
+        except Exception as e:
+            # La risposta è già iniziata: l'errore viaggia come evento
+            yield "error", {"error": str(e)}
+
+    def stream_chat_events(self, user_message: str, session_id: str, generate_audio: bool, save_response,
+                           use_cache: bool = True):
+        """
+        Converte lo stream di una risposta in eventi Server-Sent Events (vedi `chat_events`).
+
+        Restituisce (generatore):
+            str: Eventi SSE `token`, `audio`, `done` oppure `error`.
+        """
+        for event, data in self.chat_events(user_message, session_id, generate_audio, save_response, use_cache):
+            yield format_sse(event, data)
+
+    def chat_speech_stream(self, user_message, session_id, use_cache=True):
+        """
+        Variante in streaming con sintesi vocale in pipeline.
+
+        Un thread produttore consuma lo stream del modello e separa le frasi
+        man mano che vengono completate; il generatore (consumatore) passa ogni
+        frase al `KPipeline` di Kokoro non appena disponibile, così la sintesi
+        della frase N si sovrappone alla generazione delle frasi successive.
+
+        Parametri:
+            user_message (str): Messaggio inviato dall'utente.
+            session_id (str): Sessione conversazionale del client.
+            use_cache (bool): Se False ignora la cache delle risposte.
+
+        Restituisce (generatore):
+            tuple[str, object]:
+                - ("token", str) → frammento di testo generato
+                - ("audio", (int, str, audio)) → indice, frase e campioni del segmento audio
+                - ("done", (ai_message_html, ai_message_tts)) → evento finale
+        """
+
+        # Coda tra produttore (LLM) e consumatore (TTS)
+        events = queue.Queue()
+        # Segnala al produttore di fermarsi se il client si disconnette
+        stop = threading.Event()
+
+        def produce():
+            buffer = ""
+            try:
+                for event, payload in self.chat_text_stream(user_message, session_id, use_cache):
+                    if stop.is_set():
+                        return
+
+                    if event == "token":
+                        events.put(("token", payload))
+
+                        # Inoltra subito al TTS le frasi complete
+                        buffer += payload
+                        sentences, buffer = split_sentences(buffer)
+                        for sentence in sentences:
+                            events.put(("sentence", sentence))
+                    else:
+                        # Ultimo frammento rimasto nel buffer
+                        if buffer.strip():
+                            events.put(("sentence", buffer.strip()))
+                        events.put(("done", payload))
+
+            except Exception as e:
+                events.put(("error", e))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        # Indice progressivo dei segmenti audio inviati al client
+        index = 0
+
+        try:
+            while True:
+                event, payload = events.get()
+
+                if event == "error":
+                    raise payload
+
+                if event == "sentence":
+                    # Pulisce Markdown/HTML prima della sintesi
+                    text = format_for_tts(payload)
+                    if not text:
+                        continue
+
+                    for audio in self.synthesize_segments(text):
+                        yield "audio", (index, text, audio)
+                        index += 1
+                    continue
+
+                yield event, payload
+
+                if event == "done":
+                    break
+        finally:
+            stop.set()
+
+    def synthesize_segments(self, text):
+        """
+        Esegue la pipeline Kokoro e restituisce i segmenti audio man mano che
+        vengono generati (in parallelo su più processi con `tts_workers` > 0,
+        vedi core/tts_engine.py).
+
+        Se il testo (una frase in streaming o una risposta intera) è già stato
+        sintetizzato con la stessa voce e velocità, i segmenti arrivano dalla
+        cache senza eseguire il modello.
+
+        Parametri:
+            text (str): Testo da convertire in parlato.
+
+        Restituisce (generatore):
+            Campioni audio float32 di ciascun segmento (frequenza `KokoroConfig.AUDIO_FREQ`).
+        """
+
+        # Audio già sintetizzato: solo una lettura dalla cache
+        if self.tts_cache is not None:
+            cached = self.tts_cache.get(text)
+            if cached is not None:
+                yield from cached
+                return
+
+        pipeline = self.pipeline
+        if isinstance(pipeline, ParallelSynthesizer):
+            # Segmenti sintetizzati in parallelo dai processi worker, nell'ordine del testo
+            generator = pipeline.synthesize(text, voice=KokoroConfig.VOICE_PATH, speed=KokoroConfig.AUDIO_SPEED)
+        else:
             # Esegue la pipeline di generazione vocale Kokoro
-            generator = self.pipeline(
+            # Ogni ciclo restituisce: (grafemi, fonemi, array_audio)
+            generator = (audio for _, _, audio in pipeline(
                 text,
                 voice=KokoroConfig.VOICE_PATH,    
                 speed=KokoroConfig.AUDIO_SPEED    
-            )
+            ))
+
+        segments = []
+        for audio in generator:
+            audio = np.asarray(audio, dtype=np.float32)
+            segments.append(audio)
+            yield audio
+
+        # Solo sintesi completate (un client disconnesso interrompe il generatore prima)
+        if self.tts_cache is not None and segments:
+            self.tts_cache.put(text, segments)
 
-            # Lista dei file WAV generati
-            audio_paths = []  
+    def text_to_speech(self, text):
+        """
+        Converte un testo in parlato utilizzando il modello Kokoro.
+
+        Passaggi:
+        1. Esegue la pipeline TTS (Text-To-Speech) con la voce e velocità configurate.
+        2. Concatena in memoria i segmenti audio generati, senza passare dal disco.
+
+        Parametri:
+            text (str): Testo da convertire in parlato.
 
-            # Ogni ciclo restituisce: (timestamp_inizio, timestamp_fine, array_audio)
-            for i, (_, _, audio) in enumerate(generator):
-                # Costruisce il percorso di output per ciascun file
-                path = f"{KokoroConfig.GENERATED_PATH}{i}.wav"
+        Restituisce:
+            np.ndarray: Campioni audio float32 a `KokoroConfig.AUDIO_FREQ` Hz
+                        (array vuoto se la pipeline non produce segmenti).
+        """
 
-                # Scrive l’audio su disco in formato WAV 16-bit PCM
-                sf.write(path, audio, KokoroConfig.AUDIO_FREQ, "PCM_16")
+        # Segmenti audio generati dalla pipeline Kokoro
+        segments = [
+            np.asarray(audio, dtype=np.float32)
+            for audio in self.synthesize_segments(text)
+        ]
 
-                # Salva il percorso nella lista di output
-                audio_paths.append(path)
+        if not segments:
+            return np.zeros(0, dtype=np.float32)
 
-            # Restituisce la lista completa dei file generati
-            return audio_paths
+        # Un'unica copia contigua di tutti i campioni
+        return np.concatenate(segments)
 
-    def speech_to_text(self, audio_path):
+    def build_audio_response(self, user_message: str, ai_message_tts: str, idx: int):
         """
-        Converte un file audio in testo utilizzando il modello Whisper.
+        Sintetizza la risposta e costruisce la risposta HTTP con audio.
+
+        L'audio viene codificato in WAV una sola volta in memoria (una risposta già
+        sintetizzata arriva dalla cache dell'audio, `KokoroConfig.CACHE`); il salvataggio
+        su disco (`responses/{idx}.wav`) avviene solo se `KokoroConfig.SAVE_AUDIO`.
+
+        Formati supportati (query string "format", default `WebConfig.AUDIO_RESPONSE_FORMAT`):
+            - "json"      → JSON con l'audio codificato in Base64 (compatibilità)
+            - "wav"       → corpo binario `audio/wav`, testi negli header
+                            `X-User-Message` e `X-Response` (URL-encoded)
+            - "multipart" → `multipart/form-data` con la parte "meta" (JSON)
+                            e la parte "audio" (WAV binario)
+
+        Parametri:
+            user_message (str): Messaggio (o trascrizione) dell'utente.
+            ai_message_tts (str): Risposta pulita da sintetizzare.
+            idx (int): Indice usato per l'eventuale salvataggio su disco.
+
+        Restituisce:
+            flask.Response: Risposta HTTP nel formato richiesto.
+        """
+
+        response_format = request.args.get("format", WebConfig.AUDIO_RESPONSE_FORMAT)
+        if response_format not in ("json", "wav", "multipart"):
+            return jsonify({"error": f"Formato non supportato: {response_format}"}), 400
+
+        # Sintesi (o lettura dalla cache dell'audio) e codifica WAV in memoria
+        audio = self.text_to_speech(ai_message_tts)
+        wav_bytes = encode_wav(audio, KokoroConfig.AUDIO_FREQ)
+
+        # Salvataggio opzionale su disco
+        if KokoroConfig.SAVE_AUDIO:
+            with open(f"{KokoroConfig.GENERATED_PATH}{idx}.wav", "wb") as f:
+                f.write(wav_bytes)
+
+        meta = {
+            "user": user_message,
+            "response": ai_message_tts,
+        }
+
+        if response_format == "wav":
+            return Response(wav_bytes, mimetype="audio/wav", headers={
+                "X-User-Message": quote(user_message),
+                "X-Response": quote(ai_message_tts),
+            })
+
+        if response_format == "multipart":
+            body, content_type = encode_multipart([
+                ("meta", None, "application/json", json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+                ("audio", f"{idx}.wav", "audio/wav", wav_bytes),
+            ])
+            return Response(body, content_type=content_type)
+
+        meta["base64"] = base64.b64encode(wav_bytes).decode("utf-8")
+        return jsonify(meta)
+
+    def speech_to_text(self, audio):
+        """
+        Converte un audio in testo utilizzando il modello Whisper.
 
         Passaggi:
-        1. Esegue la trascrizione automatica del parlato (Speech-to-Text).
-        2. Specifica lingua e precisione FP32 per compatibilità.
-        3. Restituisce la trascrizione testuale pulita.
+        1. Decodifica in memoria l'audio ricevuto (ffmpeg via pipe, 16 kHz mono).
+        2. Taglia il silenzio iniziale/finale e normalizza il volume (`WhisperConfig.PREPROCESS`).
+        3. Esegue la trascrizione automatica del parlato (Speech-to-Text).
+        4. Restituisce la trascrizione testuale pulita.
 
         Parametri:
-            audio_path (str): Percorso del file audio da trascrivere.
+            audio (bytes | np.ndarray | str): Contenuto del file audio, campioni float32
+                                              a 16 kHz oppure percorso di un file.
 
         Restituisce:
             str: Testo trascritto dal parlato.
+
+        Solleva:
+            EmptyUtteranceError: Se l'audio o la trascrizione non contengono parlato
+                                 (prima di Whisper o del modello di chat).
         """
 
-        # Esegue la trascrizione con il modello Whisper
-        result = self.wmodel.transcribe(
-            audio=audio_path,
-            language=WhisperConfig.LANGUAGE,  
-            fp16=False                   
-        )
+        # Contenuto del file ricevuto → campioni in memoria, senza passare dal disco
+        if isinstance(audio, (bytes, bytearray)):
+            audio = decode_audio(bytes(audio))
+
+        # Meno audio da trascrivere: solo il parlato, a volume uniforme
+        if WhisperConfig.PREPROCESS and isinstance(audio, np.ndarray):
+            audio = preprocess_speech(audio)
+
+        # Trascrizione vuota (es. solo rumore): non arriva al modello di chat
+        text = self.transcribe(audio)
+        if not text or not text.strip():
+            raise EmptyUtteranceError("Nessun parlato rilevato nell'audio")
+        return text
+
+    def transcribe(self, audio, prompt: str = None) -> str:
+        """
+        Trascrive un audio con il modello Whisper (una trascrizione alla volta:
+        il modello non supporta inferenze concorrenti).
+
+        Parametri:
+            audio (np.ndarray | str): Campioni float32 a 16 kHz oppure percorso di un file.
+            prompt (str): Testo precedente, usato come contesto (trascrizione in streaming).
+
+        Restituisce:
+            str: Testo trascritto.
+        """
+        wmodel = self.wmodel
+        with self._asr_lock:
+            # Esegue la trascrizione con il modello Whisper (lingua, FP32 e preset del profilo)
+            result = wmodel.transcribe(
+                audio=audio,
+                initial_prompt=prompt,
+                **self.asr_options
+            )
 
         # Restituisce solo il campo 'text' se il risultato è un dizionario
         return result.get('text') if isinstance(result, dict) else str(result)
 
+    def tts_unavailable(self):
+        """
+        Risposta di errore (400) se la richiesta chiede l'audio (`?tts=1`) ma il
+        profilo attivo non abilita la sintesi vocale; altrimenti None.
+        """
+        if request.args.get("tts", "0") == "1" and not self.tts_enabled:
+            return jsonify({"error": f"Sintesi vocale non abilitata (profilo: {self.profile})"}), 400
+        return None
+
+    def health(self) -> dict:
+        """
+        Stato dei componenti, profilo attivo e funzionalità disponibili
+        (usate dall'interfaccia per mostrare solo i controlli supportati).
+        """
+        return {
+            **self.components.health(),
+            "profile": self.profile,
+            "features": {
+                "stt": self.stt_enabled,
+                "tts": self.tts_enabled,
+                "stt_stream": self.stt_enabled and self.sock is not None,
+            },
+        }
+
+    def session_id(self) -> str:
+        """
+        Restituisce l'identificativo di sessione della richiesta corrente.
+
+        L'id viene letto dall'header `X-Session-Id`, dal parametro `session` della
+        query string (WebSocket, dove il browser non può impostare header) o dal
+        cookie `ChatConfig.SESSION_COOKIE_NAME`; se assente o non valido ne viene
+        generato uno nuovo. L'id viene (re)inviato al client come cookie a fine richiesta.
+        """
+        if "session_id" not in g:
+            session_id = (request.headers.get("X-Session-Id") or request.args.get("session")
+                          or request.cookies.get(ChatConfig.SESSION_COOKIE_NAME))
+            if not session_id or not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", session_id):
+                session_id = uuid.uuid4().hex
+            g.session_id = session_id
+        return g.session_id
+
     # ROUTES Flask
     def _register_routes(self):
         """
@@ -283,9 +1043,32 @@ class AICompanion:
         Routes principali:
         - `/` : Serve l’interfaccia grafica principale (index.html)
         - `/test` : Gestisce i messaggi testuali utente → AI
-        - `/audio` : Gestisce i messaggi vocali (Speech-to-Text + risposta AI)
+        - `/test/stream` : Come `/test`, ma invia token e audio in streaming (SSE)
+        - `/audio` : Gestisce i messaggi vocali (Speech-to-Text + risposta AI), solo con STT abilitato
+        - `/audio/stream` : Come `/audio`, ma invia token e audio in streaming (SSE), solo con STT abilitato
+        - `/audio/ws` : Domanda vocale in streaming (WebSocket, trascrizione durante la registrazione),
+          solo con STT abilitato e flask-sock installato
+        - `/audio/batch` : Trascrizione in blocco di più file audio (JSONL), solo con STT abilitato
+        - `/health` : Stato e tempi di caricamento di ciascun componente
+        - `/ready` : 200 solo quando tutti i componenti sono caricati (altrimenti 503)
         """
 
+        @self.app.after_request
+        def set_session_cookie(response):
+            """
+            Invia al client il cookie della sessione usata dalla richiesta, rinnovandone
+            la scadenza: come la sessione sul server, scade solo dopo SESSION_IDLE_TIMEOUT di inattività.
+            """
+            if "session_id" in g:
+                response.set_cookie(
+                    ChatConfig.SESSION_COOKIE_NAME,
+                    g.session_id,
+                    max_age=ChatConfig.SESSION_IDLE_TIMEOUT,
+                    httponly=True,
+                    samesite="Lax"
+                )
+            return response
+
         @self.app.route('/', methods=['GET'])
         def gui():
             """
@@ -299,6 +1082,34 @@ class AICompanion:
             # Restituisce il file index.html dalla directory statica configurata
             return send_from_directory(WebConfig.STATIC_FOLDER, 'index.html')
 
+        # Route: /health
+        @self.app.route(WebConfig.APP_ROUTE_HEALTH, methods=['GET'])
+        def health():
+            """
+            Stato del server: risponde sempre 200 se il processo è attivo.
+
+            Risposta JSON:
+                {
+                    "status": "ready" | "loading" | "error",
+                    "components": {
+                        "<nome>": {"status": "...", "load_time": <s>, "warmup_time": <s>, "error": "..."}
+                    },
+                    "profile": "<profilo attivo>",
+                    "features": {"stt": bool, "tts": bool, "stt_stream": bool}
+                }
+            """
+            return jsonify(self.health())
+
+        # Route: /ready
+        @self.app.route(WebConfig.APP_ROUTE_READY, methods=['GET'])
+        def ready():
+            """
+            Prontezza del server (es. per load balancer o script di avvio):
+            200 quando tutti i componenti sono caricati, altrimenti 503.
+            Il corpo è lo stesso di `/health`.
+            """
+            return jsonify(self.health()), 200 if self.components.ready else 503
+
         # Route: /test 
         @self.app.route(WebConfig.APP_ROUTE_TEST, methods=['POST'])
         def chat():
@@ -310,7 +1121,8 @@ class AICompanion:
             2. Elabora il messaggio tramite il modello LLM (`ChatOllama`).
             3. Salva la domanda e la risposta su disco (per logging/debug).
             4. Se richiesto, genera anche l’audio della risposta (TTS con Kokoro).
-            5. Restituisce un oggetto JSON con il testo (e l’audio opzionale in Base64).
+            5. Restituisce un oggetto JSON con il testo; con l'audio il formato
+               dipende dal parametro "format" (vedi `build_audio_response`).
 
             Endpoint configurato in: `WebConfig.APP_ROUTE_TEST`
             Metodo: POST
@@ -318,6 +1130,9 @@ class AICompanion:
                 - "message": testo del messaggio utente
             Parametri opzionali (query string):
                 - "tts": "1" per generare anche l’audio della risposta (default: "0")
+                - "format": "json", "wav" o "multipart" per la risposta con audio
+                  (default: `WebConfig.AUDIO_RESPONSE_FORMAT`)
+                - "cache": "0" per ignorare la cache delle risposte (default: "1")
 
             Risposta JSON:
                 {
@@ -326,6 +1141,11 @@ class AICompanion:
                     "base64": "<audio codificato Base64, se richiesto>"
                 }
             """
+            # Audio richiesto ma sintesi vocale non abilitata dal profilo
+            unavailable = self.tts_unavailable()
+            if unavailable:
+                return unavailable
+
             try:
                 # Lettura e validazione input
                 data = request.get_json()
@@ -335,145 +1155,361 @@ class AICompanion:
                 # Normalizza il messaggio utente
                 user_message = data["message"].strip()
 
-                # Genera la risposta del modello AI
-                ai_message_html, ai_message_tts = self.chat_text(user_message)
+                # Cache delle risposte, escludibile per la singola richiesta
+                use_cache = request.args.get("cache", "1") != "0"
 
-                # Trova il prossimo indice disponibile (1, 2, 3, ...)
-                idx = 1
-                while os.path.exists(os.path.join("questions", f"{idx}.txt")):
-                    idx += 1
-
-                # Salva la domanda
-                with open(os.path.join("questions", f"{idx}.txt"), "w", encoding="utf-8") as f:
-                    f.write(user_message)
+                # Genera la risposta del modello AI
+                ai_message_html, ai_message_tts = self.chat_text(user_message, self.session_id(), use_cache)
 
-                # Salva la risposta (versione pulita per TTS)
-                with open(os.path.join("responses", f"{idx}.txt"), "w", encoding="utf-8") as f:
-                    f.write(ai_message_tts)
+                # Salva domanda e risposta su disco
+                idx = self.save_text_exchange(user_message, ai_message_tts)
 
-                # Generazione audio opzionale (TTS)
+                # Generazione audio opzionale (TTS), interamente in memoria
                 generate_audio = request.args.get("tts", "0") == "1"
-                base64_audio = None
-
                 if generate_audio:
-                    # Genera i segmenti audio tramite Kokoro
-                    audio_paths = self.text_to_speech(ai_message_tts)
-
-                    # Combina eventuali più segmenti audio in un unico file
-                    combined = AudioSegment.from_wav(audio_paths[0])
-                    for path in audio_paths[1:]:
-                        combined += AudioSegment.from_wav(path)
-
-                    # Esporta l’audio combinato e codifica in Base64
-                    output_path = os.path.join("responses", f"{idx}.wav")
-                    combined.export(output_path, format="wav")
-                    with open(output_path, "rb") as f:
-                        base64_audio = base64.b64encode(f.read()).decode("utf-8")
+                    return self.build_audio_response(user_message, ai_message_tts, idx)
 
                 # Risposta finale al client
-                resp = {
+                return jsonify({
                     "user": user_message,
                     "response": ai_message_tts,
-                }
-                if base64_audio:
-                    resp["base64"] = base64_audio
-
-                return jsonify(resp)
+                })
 
             except Exception as e:
                 # Gestione di eventuali errori imprevisti
                 return jsonify({"error": str(e)}), 500
 
 
-        # Route: /audio 
-        @self.app.route(WebConfig.APP_ROUTE_AUDIO, methods=['POST'])
-        def chataudio():
+        # Route: /test/stream 
+        @self.app.route(WebConfig.APP_ROUTE_TEST_STREAM, methods=['POST'])
+        def chat_stream():
             """
-            Gestisce una richiesta di chat tramite audio (POST).
+            Gestisce una richiesta di chat testuale in streaming (POST, Server-Sent Events).
 
             Funzionamento:
-            1. Riceve un file audio dall'utente nel body della richiesta.
-            2. Salva l'audio su disco per logging.
-            3. Trascrive l'audio in testo tramite Whisper.
-            4. Genera la risposta del modello AI (`ChatOllama`).
-            5. Salva la trascrizione e la risposta su disco.
-            6. Se richiesto, genera anche l’audio della risposta (TTS con Kokoro).
-            7. Restituisce JSON con trascrizione, risposta testuale e audio opzionale.
-
-            Endpoint configurato in: `WebConfig.APP_ROUTE_AUDIO`
+            1. Riceve dal frontend un messaggio utente in formato JSON.
+            2. Invia al client ogni token appena generato dal modello (`ChatOllama.stream`).
+            3. Se richiesto, sintetizza ogni frase appena completata e la invia come audio,
+               senza attendere la fine della generazione.
+            4. A generazione conclusa formatta la risposta, aggiorna la cronologia
+               e salva domanda e risposta su disco.
+
+            Endpoint configurato in: `WebConfig.APP_ROUTE_TEST_STREAM`
             Metodo: POST
+            Parametri JSON:
+                - "message": testo del messaggio utente
             Parametri opzionali (query string):
-                - "tts": "1" per generare anche l’audio della risposta (default: "0")
-
-            Risposta JSON:
-                {
-                    "user": "<trascrizione audio utente>",
-                    "response": "<risposta AI pulita>",
-                    "base64": "<audio codificato Base64, se richiesto>"
-                }
+                - "tts": "1" per ricevere anche l’audio della risposta, frase per frase (default: "0")
+                - "cache": "0" per ignorare la cache delle risposte (default: "1")
+
+            Eventi SSE:
+                - token: {"text": "<frammento generato>"}
+                - audio: {"index": <n>, "text": "<frase>", "base64": "<WAV codificato Base64>"}
+                - done:  {"user": "<testo utente>", "response": "<risposta per TTS>", "html": "<risposta HTML>"}
+                - error: {"error": "<messaggio di errore>"}
             """
-            try:
-                # Lettura del body audio
-                audio_bytes = request.get_data()
-                if not audio_bytes:
-                    return jsonify({"error": "Body audio mancante"}), 400
-
-                # Determina prossimo indice disponibile
-                idx = 1
-                while os.path.exists(os.path.join("questions", f"{idx}.wav")):
-                    idx += 1
-
-                # Salva audio utente su disco
-                user_path = os.path.join("questions", f"{idx}.wav")
-                with open(user_path, 'wb') as f:
-                    f.write(audio_bytes)
-
-                # Trascrizione dell’audio utente
-                user_message = self.speech_to_text(user_path)
-
-                # Salva la trascrizione testuale
-                with open(os.path.join("questions", f"{idx}.txt"), "w", encoding="utf-8") as f:
-                    f.write(user_message)
-
-                # Generazione risposta AI
-                ai_message_html, ai_message_tts = self.chat_text(user_message)
-
-                # Salva la risposta testuale pulita
-                with open(os.path.join("responses", f"{idx}.txt"), "w", encoding="utf-8") as f:
-                    f.write(ai_message_tts)
+            # Audio richiesto ma sintesi vocale non abilitata dal profilo
+            unavailable = self.tts_unavailable()
+            if unavailable:
+                return unavailable
+
+            # Lettura e validazione input
+            data = request.get_json(silent=True)
+            if not data or not data.get("message"):
+                return jsonify({"error": "Messaggio mancante"}), 400
+
+            # Normalizza il messaggio utente
+            user_message = data["message"].strip()
+
+            # Sintesi vocale in pipeline opzionale
+            generate_audio = request.args.get("tts", "0") == "1"
+
+            events = self.stream_chat_events(
+                user_message,
+                self.session_id(),
+                generate_audio,
+                lambda ai_message_tts: self.save_text_exchange(user_message, ai_message_tts),
+                use_cache=request.args.get("cache", "1") != "0"
+            )
 
-                # Generazione audio TTS opzionale
+            return self._sse_response(events)
+
+        # Route audio registrate solo se il profilo abilita la trascrizione (STT)
+        if self.stt_enabled:
+            # Route: /audio 
+            @self.app.route(WebConfig.APP_ROUTE_AUDIO, methods=['POST'])
+            def chataudio():
+                """
+                Gestisce una richiesta di chat tramite audio (POST).
+
+                Funzionamento:
+                1. Riceve un file audio dall'utente nel body della richiesta.
+                2. Se abilitato, archivia l'audio su disco in background (`WhisperConfig.ARCHIVE_AUDIO`).
+                3. Decodifica l'audio in memoria e lo trascrive in testo tramite Whisper.
+                4. Genera la risposta del modello AI (`ChatOllama`).
+                5. Salva la trascrizione e la risposta su disco.
+                6. Se richiesto, genera anche l’audio della risposta (TTS con Kokoro).
+                7. Restituisce JSON con trascrizione e risposta testuale; con l'audio il
+                   formato dipende dal parametro "format" (vedi `build_audio_response`).
+
+                Endpoint configurato in: `WebConfig.APP_ROUTE_AUDIO`
+                Metodo: POST
+                Parametri opzionali (query string):
+                    - "tts": "1" per generare anche l’audio della risposta (default: "0")
+                    - "format": "json", "wav" o "multipart" per la risposta con audio
+                      (default: `WebConfig.AUDIO_RESPONSE_FORMAT`)
+                    - "cache": "0" per ignorare la cache delle risposte (default: "1")
+
+                Risposta JSON:
+                    {
+                        "user": "<trascrizione audio utente>",
+                        "response": "<risposta AI pulita>",
+                        "base64": "<audio codificato Base64, se richiesto>"
+                    }
+                """
+                # Audio richiesto ma sintesi vocale non abilitata dal profilo
+                unavailable = self.tts_unavailable()
+                if unavailable:
+                    return unavailable
+
+                try:
+                    # Lettura del body audio
+                    audio_bytes = request.get_data()
+                    if not audio_bytes:
+                        return jsonify({"error": "Body audio mancante"}), 400
+
+                    # Archiviazione (opzionale, in background) dell'audio utente
+                    idx = self.save_audio_question(audio_bytes, request.mimetype)
+
+                    # Trascrizione dell’audio utente, decodificato in memoria
+                    user_message = self.speech_to_text(audio_bytes)
+
+                    # Salva la trascrizione testuale
+                    self.save_text("questions", idx, user_message)
+
+                    # Generazione risposta AI (cache delle risposte escludibile per la singola richiesta)
+                    use_cache = request.args.get("cache", "1") != "0"
+                    ai_message_html, ai_message_tts = self.chat_text(user_message, self.session_id(), use_cache)
+
+                    # Salva la risposta testuale pulita
+                    self.save_text("responses", idx, ai_message_tts)
+
+                    # Generazione audio TTS opzionale, interamente in memoria
+                    generate_audio = request.args.get("tts", "0") == "1"
+                    if generate_audio:
+                        return self.build_audio_response(user_message, ai_message_tts, idx)
+
+                    # Prepara e invia risposta JSON
+                    return jsonify({
+                        "user": user_message,
+                        "response": ai_message_tts,
+                    })
+
+                except ValueError as e:
+                    # Audio non decodificabile (formato non valido o file danneggiato) o senza parlato
+                    return jsonify({"error": str(e)}), 400
+
+                except Exception as e:
+                    # Gestione errori generici
+                    return jsonify({"error": str(e)}), 500
+
+            # Route: /audio/stream 
+            @self.app.route(WebConfig.APP_ROUTE_AUDIO_STREAM, methods=['POST'])
+            def chataudio_stream():
+                """
+                Gestisce una richiesta di chat tramite audio in streaming (POST, Server-Sent Events).
+
+                Funzionamento:
+                1. Riceve un file audio dall'utente, lo decodifica in memoria e lo trascrive con Whisper
+                   (archiviandolo su disco in background, se abilitato).
+                2. Invia subito la trascrizione al client (evento `user`).
+                3. Prosegue come `/test/stream`: token, audio frase per frase (se richiesto), evento finale.
+
+                Endpoint configurato in: `WebConfig.APP_ROUTE_AUDIO_STREAM`
+                Metodo: POST
+                Parametri opzionali (query string):
+                    - "tts": "1" per ricevere anche l’audio della risposta, frase per frase (default: "0")
+                    - "cache": "0" per ignorare la cache delle risposte (default: "1")
+
+                Eventi SSE:
+                    - user: {"user": "<trascrizione audio utente>"}
+                    - token, audio, done, error: come `/test/stream`
+                """
+                # Audio richiesto ma sintesi vocale non abilitata dal profilo
+                unavailable = self.tts_unavailable()
+                if unavailable:
+                    return unavailable
+
+                try:
+                    # Lettura del body audio
+                    audio_bytes = request.get_data()
+                    if not audio_bytes:
+                        return jsonify({"error": "Body audio mancante"}), 400
+
+                    # Archivia (in background) l'audio utente e lo trascrive dalla memoria
+                    idx = self.save_audio_question(audio_bytes, request.mimetype)
+                    user_message = self.speech_to_text(audio_bytes)
+                    self.save_text("questions", idx, user_message)
+
+                except ValueError as e:
+                    # Audio non decodificabile (formato non valido o file danneggiato) o senza parlato
+                    return jsonify({"error": str(e)}), 400
+
+                except Exception as e:
+                    # Gestione errori generici
+                    return jsonify({"error": str(e)}), 500
+
+                # Sintesi vocale in pipeline opzionale
                 generate_audio = request.args.get("tts", "0") == "1"
-                base64_audio = None
-
-                if generate_audio:
-                    # Genera segmenti audio tramite Kokoro
-                    audio_paths = self.text_to_speech(ai_message_tts)
-
-                    # Combina eventuali segmenti multipli in un unico file WAV
-                    combined = AudioSegment.from_wav(audio_paths[0])
-                    for path in audio_paths[1:]:
-                        combined += AudioSegment.from_wav(path)
-
-                    # Esporta l’audio combinato e codifica in Base64
-                    output_path = os.path.join("responses", f"{idx}.wav")
-                    combined.export(output_path, format="wav")
-                    with open(output_path, "rb") as f:
-                        base64_audio = base64.b64encode(f.read()).decode("utf-8")
-
-                # Prepara e invia risposta JSON
-                resp = {
-                    "user": user_message,
-                    "response": ai_message_tts,
-                }
-                if base64_audio:
-                    resp["base64"] = base64_audio
-
-                return jsonify(resp)
 
-            except Exception as e:
-                # Gestione errori generici
-                return jsonify({"error": str(e)}), 500
+                # Il generatore gira fuori dal contesto della richiesta: legge sessione e parametri ora
+                session_id = self.session_id()
+                use_cache = request.args.get("cache", "1") != "0"
+
+                def generate():
+                    # La trascrizione è disponibile prima della risposta del modello
+                    yield format_sse("user", {"user": user_message})
+                    yield from self.stream_chat_events(
+                        user_message,
+                        session_id,
+                        generate_audio,
+                        lambda ai_message_tts: self.save_text("responses", idx, ai_message_tts),
+                        use_cache
+                    )
+
+                return self._sse_response(generate())
+
+            # Route: /audio/ws (solo con flask-sock installato)
+            if self.sock is not None:
+                @self.sock.route(WebConfig.APP_ROUTE_AUDIO_WS)
+                def chataudio_ws(ws):
+                    """
+                    Domanda vocale in streaming tramite WebSocket.
+
+                    L'audio viene inviato mentre l'utente parla e trascritto segmento per
+                    segmento (VAD + Whisper): alla fine resta da trascrivere solo l'ultimo
+                    segmento, poi la risposta arriva in streaming come su `/audio/stream`.
+
+                    Endpoint configurato in: `WebConfig.APP_ROUTE_AUDIO_WS`
+                    Parametri opzionali (query string):
+                        - "cache": "0" per ignorare la cache delle risposte (default: "1")
+                        - "session": id di sessione ricevuto in precedenza (in alternativa al cookie)
+
+                    Messaggi client → server:
+                        - binario: PCM 16-bit little-endian mono a `WhisperConfig.SAMPLE_RATE` Hz
+                        - testo: {"event": "end", "tts": true|false} a fine registrazione
+
+                    Messaggi server → client (testo JSON {"event": ..., "data": {...}}):
+                        - session: {"session_id": "<id>"} all'apertura; la risposta di un WebSocket
+                          non imposta cookie, quindi il client lo conserva e lo reinvia con "session"
+                        - partial: {"text": "<trascrizione dei segmenti completati>"}
+                        - user: {"user": "<trascrizione completa>"}
+                        - token, audio, done, error: come `/test/stream`
+                    """
+                    # Sessione e parametri letti dalla richiesta di apertura del WebSocket
+                    session_id = self.session_id()
+                    use_cache = request.args.get("cache", "1") != "0"
+
+                    def send(event, data):
+                        ws.send(json.dumps({"event": event, "data": data}, ensure_ascii=False))
+
+                    transcriber = StreamingTranscriber(self.transcribe, keep_audio=self.archiver is not None)
+                    try:
+                        # Id di sessione al client: le domande successive continuano la stessa conversazione
+                        send("session", {"session_id": session_id})
+
+                        # Ricezione dell'audio: i segmenti completati vengono trascritti in background
+                        partial = ""
+                        while True:
+                            message = ws.receive()
+                            if isinstance(message, (bytes, bytearray)):
+                                transcriber.feed(message)
+                                if transcriber.text != partial:
+                                    partial = transcriber.text
+                                    send("partial", {"text": partial})
+                                continue
+
+                            control = json.loads(message)
+                            if control.get("event") == "end":
+                                generate_audio = bool(control.get("tts"))
+                                break
+
+                        if generate_audio and not self.tts_enabled:
+                            send("error", {"error": f"Sintesi vocale non abilitata (profilo: {self.profile})"})
+                            return
+
+                        # Fine del parlato: resta da trascrivere solo l'ultimo segmento
+                        user_message = transcriber.finish().strip()
+                        if not user_message:
+                            send("error", {"error": "Nessun parlato rilevato"})
+                            return
+
+                        idx = self.save_stream_question(transcriber.audio)
+                        self.save_text("questions", idx, user_message)
+                        send("user", {"user": user_message})
+
+                        for event, data in self.chat_events(
+                            user_message,
+                            session_id,
+                            generate_audio,
+                            lambda ai_message_tts: self.save_text("responses", idx, ai_message_tts),
+                            use_cache
+                        ):
+                            send(event, data)
+
+                    except Exception as e:
+                        # Connessione chiusa dal client (registrazione scartata) o errore di trascrizione
+                        try:
+                            send("error", {"error": str(e)})
+                        except Exception:
+                            pass
+
+                    finally:
+                        transcriber.close()
+
+            # Route: /audio/batch
+            @self.app.route(WebConfig.APP_ROUTE_AUDIO_BATCH, methods=['POST'])
+            def audio_batch():
+                """
+                Trascrizione in blocco di più file audio, senza risposta del modello di chat.
+
+                I file vengono decodificati in parallelo e trascritti a gruppi con il
+                modello Whisper già caricato (vedi core/batch_transcription.py).
+
+                Endpoint configurato in: `WebConfig.APP_ROUTE_AUDIO_BATCH`
+                Body: multipart/form-data con uno o più file nel campo "audio"
+
+                Restituisce:
+                    application/x-ndjson, una riga JSON per file nell'ordine di invio:
+                    {"file", "text", "language", "duration"} oppure {"file", "error"}
+                """
+                uploads = request.files.getlist("audio")
+                if not uploads:
+                    return jsonify({"error": "Nessun file nel campo 'audio'"}), 400
+
+                # Contenuti letti ora: il generatore gira fuori dal contesto della richiesta
+                sources = [(upload.filename, upload.read()) for upload in uploads]
+                transcriber = BatchTranscriber(self.wmodel, lock=self._asr_lock, profile=self.asr_profile)
+
+                def generate():
+                    for result in transcriber.transcribe(sources):
+                        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+                return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    def _sse_response(self, events):
+        """
+        Crea una risposta HTTP in streaming (Server-Sent Events) a partire
+        da un generatore di eventi già serializzati.
+        """
+        return Response(
+            stream_with_context(events),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",  # Evita che proxy/browser accumulino la risposta
+                "X-Accel-Buffering": "no"     # Disattiva il buffering di eventuali reverse proxy
+            }
+        )
 
     # Avvio server Flask
     def run(self):
@@ -492,6 +1528,26 @@ class AICompanion:
         )
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backend Flask di AICompanion.")
+    parser.add_argument("--profile", default=FeatureConfig.PROFILE, choices=list(FeatureConfig.PROFILES),
+                        help=f"funzionalità abilitate (default: {FeatureConfig.PROFILE})")
+    parser.add_argument("--import-report", action="store_true", default=FeatureConfig.IMPORT_REPORT,
+                        help="stampa tempo e memoria di import di ciascuna libreria del profilo")
+    parser.add_argument("--asr-profile", default=WhisperConfig.ASR_PROFILE, choices=list(WhisperConfig.ASR_PROFILES),
+                        help=f"profilo di inferenza Whisper (default: {WhisperConfig.ASR_PROFILE})")
+    parser.add_argument("--tts-workers", type=int, default=KokoroConfig.WORKERS,
+                        help="processi di sintesi vocale in parallelo (0 = nel processo del server)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    companion = AICompanion()
-    companion.run()
\ No newline at end of file
+    args = parse_args()
+
+    # Le librerie del profilo vengono importate subito (invece che in background) per misurarle
+    if args.import_report:
+        report = import_report(profile_features(args.profile))
+        print_import_report(args.profile, _import_seconds, _import_rss, report)
+
+    companion = AICompanion(profile=args.profile, asr_profile=args.asr_profile, tts_workers=args.tts_workers)
+    companion.run()
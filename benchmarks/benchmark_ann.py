@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import statistics
+
+import numpy as np
+
+from core.config import BenchmarksConfig, RetrievalConfig
+from core.vector_utils import IVFIndex, load_DB, get_relevant_chunks
+
+
+class BenchmarkANN:
+    """
+    Benchmark recall/latenza dell'indice approssimato IVF rispetto alla ricerca esatta:
+    - Ground truth: risultati esatti di get_relevant_chunks per ogni domanda
+    - Per ogni valore di nprobe misura recall@k e latenza media per query
+    - Se i .db non hanno un indice IVF, ne addestra uno in memoria
+    """
+
+    def __init__(self):
+        self.top_k = BenchmarksConfig.ANN_TOP_K
+        self.nprobe_values = BenchmarksConfig.ANN_NPROBE_VALUES
+        self.index = load_DB()
+
+        for db in self.index.dbs:
+            if db.ann is None and len(db):
+                print(f"Nessun indice IVF su disco per {db.path}: addestramento in memoria...")
+                db.ann = IVFIndex.train(db.matrix)
+
+    def _load_queries(self):
+        """Carica le domande di test dal file JSON dell'interrogazione."""
+        with open(BenchmarksConfig.ANN_QUERIES_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        questions = [q for q in data.get("questions", []) if isinstance(q, str) and q.strip()]
+        if not questions:
+            raise ValueError(f"Nessuna domanda trovata in {BenchmarksConfig.ANN_QUERIES_PATH}")
+        return questions
+
+    def _timed_search(self, query_vectors, exact, nprobe=RetrievalConfig.ANN_NPROBE):
+        """Esegue una ricerca per query e restituisce risultati e latenze (ms)."""
+        results, latencies = [], []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            idx, _ = self.index.search_by_vectors(vector, self.top_k, exact=exact, nprobe=nprobe)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([self.index.document(i).page_content for i in idx[0]])
+        return results, latencies
+
+    def run_benchmark(self):
+        """
+        Esegue il benchmark:
+        - Calcola la ground truth esatta con get_relevant_chunks
+        - Misura la ricerca esatta e quella IVF per ogni nprobe
+        - Stampa recall@k e latenze
+        """
+        questions = self._load_queries()
+        nlist = sum(db.ann.nlist for db in self.index.dbs if db.ann is not None)
+        print(f"▶ Avvio benchmark ANN: {len(self.index)} chunk, {nlist} liste, {len(questions)} query, k={self.top_k}")
+
+        # Ground truth (ricerca esatta)
+        ground_truth = [get_relevant_chunks(q, self.index, top_k=self.top_k, exact=True) for q in questions]
+
+        # Embedding delle query calcolati una sola volta: si misura solo la ricerca
+        query_vectors = self.index.embeddings.embed_documents(questions)
+
+        _, exact_latencies = self._timed_search(query_vectors, exact=True)
+        print(f"  esatta          recall=1.000  latenza media={statistics.mean(exact_latencies):.3f} ms  "
+              f"p95={np.percentile(exact_latencies, 95):.3f} ms")
+
+        for nprobe in self.nprobe_values:
+            results, latencies = self._timed_search(query_vectors, exact=False, nprobe=nprobe)
+            recall = statistics.mean(
+                len(set(found) & set(truth)) / max(1, len(set(truth)))
+                for found, truth in zip(results, ground_truth)
+            )
+            print(f"  nprobe={nprobe:<8} recall={recall:.3f}  latenza media={statistics.mean(latencies):.3f} ms  "
+                  f"p95={np.percentile(latencies, 95):.3f} ms")
+
+        print("Benchmark completato.")
+
+if __name__ == "__main__":
+    benchmark = BenchmarkANN()
+    benchmark.run_benchmark()
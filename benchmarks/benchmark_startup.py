@@ -0,0 +1,58 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import subprocess
+
+from core.config import FeatureConfig
+
+
+# Eseguito in un processo nuovo per ogni profilo: import dell'applicazione e delle librerie del profilo
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import aicompanion
+from core.features import current_rss_mb, import_report, profile_features
+app = {"seconds": time.perf_counter() - start, "rss_mb": current_rss_mb()}
+report = import_report(profile_features(sys.argv[1]))
+print(json.dumps({"app": app, "modules": report, "total_rss_mb": current_rss_mb()}))
+"""
+
+
+class BenchmarkStartup:
+    """
+    Benchmark dell'avvio per profilo di funzionalità (FeatureConfig.PROFILES):
+    - Ogni profilo viene misurato in un processo Python separato (import "a freddo")
+    - Tempo e memoria dell'import di aicompanion.py e di ciascuna libreria audio del profilo
+    """
+
+    def __init__(self):
+        self.root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.profiles = list(FeatureConfig.PROFILES)
+
+    def _measure(self, profile: str) -> dict:
+        """Esegue la misura di un profilo in un sottoprocesso e ne restituisce il risultato."""
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE, profile],
+            cwd=self.root, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run_benchmark(self):
+        print(f"Benchmark avvio per profilo ({', '.join(self.profiles)})")
+
+        for profile in self.profiles:
+            data = self._measure(profile)
+            total = data["app"]["seconds"] + sum(m["seconds"] for m in data["modules"])
+            print(f"\n  profilo={profile:<6} totale={total:.2f} s  memoria={data['total_rss_mb']:.1f} MB")
+            print(f"    {'aicompanion':<14}{data['app']['seconds']:8.2f} s {data['app']['rss_mb']:9.1f} MB")
+            for m in data["modules"]:
+                print(f"    {m['module']:<14}{m['seconds']:8.2f} s {m['rss_mb']:+9.1f} MB  ({m['feature']})")
+
+        print("\nBenchmark completato.")
+
+if __name__ == "__main__":
+    benchmark = BenchmarkStartup()
+    benchmark.run_benchmark()
@@ -0,0 +1,71 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from core.config import BenchmarksConfig, WhisperConfig
+from core.audio_utils import decode_audio
+from core.batch_transcription import BatchTranscriber, find_audio_files
+
+
+class BenchmarkTranscription:
+    """
+    Benchmark della trascrizione in blocco rispetto a un ciclo su `transcribe`:
+    - Stessi file audio (registrazioni archiviate in BenchmarksConfig.TRANSCRIPTION_AUDIO_DIR)
+    - Ciclo sequenziale: decodifica + `model.transcribe` file per file
+    - BatchTranscriber per ogni dimensione di gruppo configurata
+    - Throughput in secondi di audio per secondo, totale e per core (thread torch)
+    """
+
+    def __init__(self):
+        import torch
+        import whisper
+
+        self.files = find_audio_files([BenchmarksConfig.TRANSCRIPTION_AUDIO_DIR])[:BenchmarksConfig.TRANSCRIPTION_MAX_FILES]
+        if not self.files:
+            raise ValueError(f"Nessun file audio trovato in {BenchmarksConfig.TRANSCRIPTION_AUDIO_DIR}")
+
+        self.batch_sizes = BenchmarksConfig.TRANSCRIPTION_BATCH_SIZES
+        self.cores = torch.get_num_threads()
+        self.model = whisper.load_model(name=WhisperConfig.MODEL_PATH, device=WhisperConfig.DEVICE_NAME)
+
+    def _report(self, label: str, files: int, audio_seconds: float, elapsed: float):
+        throughput = audio_seconds / elapsed
+        print(f"  {label:<16} file={files:<4} tempo={elapsed:7.2f} s  "
+              f"throughput={throughput:6.2f}x  per core={throughput / self.cores:6.3f}x")
+
+    def _run_sequential(self):
+        """Ciclo su `transcribe` (percorso di `/audio`, senza chiamata al modello di chat)."""
+        audio_seconds = 0.0
+        start = time.perf_counter()
+        for path in self.files:
+            with open(path, "rb") as f:
+                audio = decode_audio(f.read())
+            audio_seconds += len(audio) / WhisperConfig.SAMPLE_RATE
+            self.model.transcribe(audio, language=WhisperConfig.LANGUAGE, fp16=False)
+        self._report("sequenziale", len(self.files), audio_seconds, time.perf_counter() - start)
+
+    def _run_batch(self, batch_size: int):
+        transcriber = BatchTranscriber(self.model, batch_size=batch_size)
+        start = time.perf_counter()
+        results = [r for r in transcriber.transcribe((path, path) for path in self.files) if "error" not in r]
+        audio_seconds = sum(r["duration"] for r in results)
+        self._report(f"batch={batch_size}", len(results), audio_seconds, time.perf_counter() - start)
+
+    def run_benchmark(self):
+        print(f"Benchmark trascrizione: {len(self.files)} file, {self.cores} thread torch")
+
+        # Prima trascrizione a vuoto: esclude l'inizializzazione del modello dalle misure
+        self.model.transcribe(decode_audio(open(self.files[0], "rb").read()), language=WhisperConfig.LANGUAGE, fp16=False)
+
+        self._run_sequential()
+        for batch_size in self.batch_sizes:
+            self._run_batch(batch_size)
+
+        print("Benchmark completato.")
+
+if __name__ == "__main__":
+    benchmark = BenchmarkTranscription()
+    benchmark.run_benchmark()
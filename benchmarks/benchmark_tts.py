@@ -0,0 +1,68 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+from core.config import BenchmarksConfig, KokoroConfig
+from core.tts_engine import ParallelSynthesizer
+
+
+class BenchmarkTTS:
+    """
+    Benchmark della sintesi vocale Kokoro di una risposta lunga al variare dei processi:
+    - workers=0: KPipeline con un solo modello nel processo (sintesi attuale del server)
+    - workers=N: ParallelSynthesizer con N processi, ognuno con KokoroConfig.WORKER_THREADS thread torch
+    - Tempo totale (wall-clock), durata dell'audio prodotto e speedup rispetto a workers=0
+    """
+
+    def __init__(self):
+        self.text = BenchmarksConfig.TTS_TEXT
+        self.worker_counts = BenchmarksConfig.TTS_WORKER_COUNTS
+        self.runs = BenchmarksConfig.TTS_RUNS
+
+    def _serial_pipeline(self):
+        from kokoro import KPipeline, KModel
+
+        kmodel = KModel(model=KokoroConfig.MODEL_PATH, config=KokoroConfig.CONFIG_PATH).to("cpu")
+        pipeline = KPipeline(lang_code=KokoroConfig.LANG_CODE, model=kmodel)
+        return lambda text: [audio for _, _, audio in pipeline(text, voice=KokoroConfig.VOICE_PATH,
+                                                                speed=KokoroConfig.AUDIO_SPEED)]
+
+    def _measure(self, synthesize) -> tuple:
+        """Sintesi a vuoto, poi il tempo migliore su più esecuzioni e la durata dell'audio."""
+        synthesize("Ciao.")
+        best = float("inf")
+        for _ in range(self.runs):
+            start = time.perf_counter()
+            segments = synthesize(self.text)
+            best = min(best, time.perf_counter() - start)
+        audio_seconds = sum(len(segment) for segment in segments) / KokoroConfig.AUDIO_FREQ
+        return best, audio_seconds, len(segments)
+
+    def run_benchmark(self):
+        print(f"Benchmark sintesi Kokoro: {len(self.text)} caratteri, {self.runs} esecuzioni per configurazione, "
+              f"{os.cpu_count()} core")
+
+        baseline = None
+        for workers in self.worker_counts:
+            if workers == 0:
+                seconds, audio_seconds, segments = self._measure(self._serial_pipeline())
+            else:
+                engine = ParallelSynthesizer(workers=workers)
+                engine.warmup()
+                try:
+                    seconds, audio_seconds, segments = self._measure(lambda text: list(engine.synthesize(text)))
+                finally:
+                    engine.shutdown()
+
+            baseline = baseline or seconds
+            print(f"  workers={workers:<3} tempo={seconds:7.2f} s  audio={audio_seconds:6.1f} s  "
+                  f"segmenti={segments:<3} speedup={baseline / seconds:5.2f}x")
+
+        print("Benchmark completato.")
+
+if __name__ == "__main__":
+    benchmark = BenchmarkTTS()
+    benchmark.run_benchmark()
@@ -0,0 +1,104 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import re
+import time
+
+from core.config import BenchmarksConfig, WhisperConfig
+from core.audio_utils import decode_audio
+from core.whisper_profiles import asr_profile, quantize_whisper, transcribe_options
+
+
+def normalize_words(text: str) -> list:
+    """Parole in minuscolo senza punteggiatura (confronto per il word error rate)."""
+    return re.findall(r"\w+", text.lower())
+
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    """Distanza di edit (sostituzioni, inserimenti, cancellazioni) tra due sequenze di parole."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, start=1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+class BenchmarkWhisper:
+    """
+    Benchmark dei profili di inferenza Whisper (WhisperConfig.ASR_PROFILES):
+    - Insieme fisso di audio locali con trascrizione di riferimento (JSONL {"file", "text"},
+      lo stesso formato prodotto da transcribe.py)
+    - Per ogni profilo: real-time factor (tempo di trascrizione / durata dell'audio)
+      e word error rate rispetto ai riferimenti
+    - L'audio viene decodificato una sola volta: si misura solo la trascrizione
+    """
+
+    def __init__(self):
+        import whisper
+
+        self.profiles = BenchmarksConfig.WHISPER_PROFILES or tuple(WhisperConfig.ASR_PROFILES)
+        self.samples = self._load_samples()
+        self.model = whisper.load_model(name=WhisperConfig.MODEL_PATH, device=WhisperConfig.DEVICE_NAME)
+
+    def _load_samples(self):
+        """Carica l'insieme di test: (audio decodificato, parole di riferimento)."""
+        path = BenchmarksConfig.WHISPER_REFERENCE_PATH
+        base = os.path.dirname(path)
+        samples = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                audio_path = item["file"] if os.path.isabs(item["file"]) else os.path.join(base, item["file"])
+                with open(audio_path, "rb") as audio_file:
+                    samples.append((decode_audio(audio_file.read()), normalize_words(item["text"])))
+        if not samples:
+            raise ValueError(f"Nessun audio di riferimento in {path}")
+        return samples
+
+    def _model_for(self, profile: str):
+        """Modello del profilo: float32 condiviso o copia quantizzata int8."""
+        if asr_profile(profile)["quantize"] and self.model.device.type == "cpu":
+            return quantize_whisper(self.model)
+        return self.model
+
+    def _run_profile(self, profile: str):
+        model = self._model_for(profile)
+        options = transcribe_options(profile)
+
+        # Prima trascrizione a vuoto: esclude l'inizializzazione dalle misure
+        model.transcribe(self.samples[0][0], **options)
+
+        audio_seconds = elapsed = 0.0
+        errors = words = 0
+        for audio, reference in self.samples:
+            start = time.perf_counter()
+            result = model.transcribe(audio, **options)
+            elapsed += time.perf_counter() - start
+            audio_seconds += len(audio) / WhisperConfig.SAMPLE_RATE
+
+            errors += word_errors(reference, normalize_words(result["text"]))
+            words += len(reference)
+
+        print(f"  {profile:<12} RTF={elapsed / audio_seconds:6.3f}  WER={errors / max(1, words):6.1%}  "
+              f"tempo={elapsed:7.2f} s")
+
+    def run_benchmark(self):
+        audio_seconds = sum(len(audio) for audio, _ in self.samples) / WhisperConfig.SAMPLE_RATE
+        print(f"Benchmark profili Whisper: {len(self.samples)} audio ({audio_seconds:.0f} s), "
+              f"modello {WhisperConfig.MODEL_PATH} su {self.model.device}")
+
+        for profile in self.profiles:
+            self._run_profile(profile)
+
+        print("Benchmark completato.")
+
+if __name__ == "__main__":
+    benchmark = BenchmarkWhisper()
+    benchmark.run_benchmark()
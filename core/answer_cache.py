@@ -0,0 +1,156 @@
+"""
+answer_cache.py
+---------------
+Cache semantica delle risposte del modello di chat.
+
+Gli studenti pongono spesso la stessa domanda sullo stesso libro: invece di
+rigenerare ogni volta la risposta, una domanda viene confrontata (similarità
+coseno tra embedding) con quelle a cui è già stata data risposta. La
+risposta salvata viene riusata se la similarità supera la soglia configurata
+e se l'ambito coincide:
+- stesso insieme di documenti recuperati (RAG)
+- stesso prompt di sistema
+
+Le voci scadono dopo un TTL e, oltre il numero massimo, vengono eliminate
+quelle usate meno di recente (LRU). L'audio della risposta non viene
+conservato qui: la sintesi dello stesso testo TTS è già riusata dalla cache
+dell'audio (`core/tts_cache.py`), limitata in byte.
+"""
+
+# Chiave dell'ambito (documenti + prompt di sistema)
+import hashlib
+
+# Accesso concorrente dai thread del server Flask
+import threading
+
+# Scadenza delle voci
+import time
+
+# Dizionario ordinato per l'ordine LRU
+from collections import OrderedDict
+
+import numpy as np
+
+from core.config import ChatConfig
+
+
+class CachedAnswer:
+    """Risposta salvata: embedding della domanda e testi formattati."""
+
+    __slots__ = ("vector", "scope", "raw", "html", "tts", "created")
+
+    def __init__(self, vector: np.ndarray, scope: str, raw: str, html: str, tts: str):
+        self.vector = vector
+        self.scope = scope
+        self.raw = raw
+        self.html = html
+        self.tts = tts
+        self.created = time.monotonic()
+
+
+def answer_scope(documents: list, system_prompt: str) -> str:
+    """
+    Chiave dell'ambito di una risposta: prompt di sistema e insieme dei documenti recuperati
+    (identificati dall'id del chunk, o dal contenuto se l'id manca).
+    """
+    ids = sorted(
+        doc.id or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        for doc in documents
+    )
+    return hashlib.sha256("\0".join([system_prompt, *ids]).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Cache delle risposte con ricerca per similarità, TTL ed eliminazione LRU.
+    """
+
+    def __init__(self, threshold: float = ChatConfig.ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ChatConfig.ANSWER_CACHE_TTL,
+                 max_entries: int = ChatConfig.ANSWER_CACHE_MAX_ENTRIES):
+        """
+        Parametri:
+            threshold (float): Similarità coseno minima tra le domande per riusare una risposta.
+            ttl (float): Secondi dopo i quali una risposta salvata scade.
+            max_entries (int): Numero massimo di risposte in memoria (oltre → eliminazione LRU).
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # Voci in ordine LRU e, per ambito, le chiavi delle voci corrispondenti
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key)
+        keys = self._scopes[entry.scope]
+        keys.remove(key)
+        if not keys:
+            del self._scopes[entry.scope]
+
+    def get(self, vector, scope: str) -> CachedAnswer | None:
+        """
+        Cerca una risposta a una domanda simile nello stesso ambito.
+
+        Parametri:
+            vector: Embedding della domanda.
+            scope (str): Ambito della risposta (vedi `answer_scope`).
+
+        Restituisce:
+            CachedAnswer | None: La risposta più simile sopra soglia, se presente e non scaduta.
+        """
+        query = self._normalize(vector)
+        now = time.monotonic()
+
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for key in list(self._scopes.get(scope, ())):
+                entry = self._entries[key]
+                if now - entry.created > self.ttl:
+                    self._remove(key)
+                    continue
+                score = float(entry.vector @ query)
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key]
+
+    def put(self, vector, scope: str, raw: str, html: str, tts: str) -> CachedAnswer:
+        """Salva la risposta a una domanda; oltre `max_entries` elimina le voci usate meno di recente."""
+        entry = CachedAnswer(self._normalize(vector), scope, raw, html, tts)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = entry
+            self._scopes.setdefault(scope, []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def stats(self) -> dict:
+        """Statistiche della cache: voci, hit/miss e hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
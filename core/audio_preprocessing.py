@@ -0,0 +1,101 @@
+"""
+audio_preprocessing.py
+----------------------
+Pre-elaborazione delle domande vocali prima della trascrizione (Whisper).
+
+Le registrazioni del browser contengono spesso secondi di silenzio iniziale
+e finale, che Whisper elaborerebbe comunque. Con operazioni vettoriali
+NumPy l'audio viene:
+1. diviso in frame e classificato parlato/silenzio in base all'energia
+   (stessa soglia del VAD in streaming, vedi core/vad.py);
+2. tagliato dal primo all'ultimo frame di parlato (più un margine);
+3. normalizzato in volume sul parlato.
+
+Gli audio senza parlato vengono rifiutati prima di Whisper e del modello di chat.
+"""
+
+import numpy as np
+
+from core.config import WhisperConfig
+from core.vad import frame_energies
+
+
+class EmptyUtteranceError(ValueError):
+    """Audio senza parlato (silenzio o solo rumore)."""
+
+
+def speech_frames(audio: np.ndarray, frame_size: int,
+                  threshold_db: float = WhisperConfig.VAD_THRESHOLD_DB,
+                  margin_db: float = WhisperConfig.VAD_MARGIN_DB) -> tuple:
+    """
+    Classifica i frame di un audio come parlato o silenzio.
+
+    Il rumore di fondo è stimato dal 10° percentile dell'energia dei frame;
+    la soglia resta comunque entro `margin_db` dal frame più forte, così un
+    audio senza pause non viene scambiato per rumore.
+
+    Parametri:
+        audio (np.ndarray): Campioni float32 mono.
+        frame_size (int): Campioni per frame.
+        threshold_db (float): Energia minima (dBFS) di un frame di parlato.
+        margin_db (float): Margine sopra il rumore di fondo stimato.
+
+    Restituisce:
+        tuple[np.ndarray, np.ndarray]: Maschera booleana dei frame di parlato ed energie (dBFS).
+    """
+    n = len(audio) // frame_size
+    if n == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0)
+
+    energies = frame_energies(audio[:n * frame_size].reshape(n, frame_size))
+    noise_db = np.percentile(energies, 10)
+    threshold = max(threshold_db, min(noise_db + margin_db, energies.max() - margin_db))
+    return energies >= threshold, energies
+
+
+def preprocess_speech(audio: np.ndarray, sample_rate: int = WhisperConfig.SAMPLE_RATE,
+                      frame_ms: int = WhisperConfig.VAD_FRAME_MS,
+                      padding_ms: int = WhisperConfig.VAD_PADDING_MS,
+                      min_speech_ms: int = WhisperConfig.VAD_MIN_SPEECH_MS,
+                      target_dbfs: float = WhisperConfig.NORMALIZE_TARGET_DBFS,
+                      max_gain_db: float = WhisperConfig.NORMALIZE_MAX_GAIN_DB) -> np.ndarray:
+    """
+    Taglia il silenzio iniziale e finale e normalizza il volume del parlato.
+
+    Parametri:
+        audio (np.ndarray): Campioni float32 mono.
+        sample_rate (int): Frequenza di campionamento.
+        frame_ms (int): Durata dei frame analizzati.
+        padding_ms (int): Audio mantenuto prima e dopo il parlato.
+        min_speech_ms (int): Parlato minimo perché l'audio venga trascritto.
+        target_dbfs (float): Livello RMS (dBFS) del parlato dopo la normalizzazione.
+        max_gain_db (float): Guadagno massimo applicato (evita di amplificare il rumore).
+
+    Restituisce:
+        np.ndarray: Audio tagliato e normalizzato (float32).
+
+    Solleva:
+        EmptyUtteranceError: Se l'audio non contiene parlato.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    frame_size = sample_rate * frame_ms // 1000
+
+    speech, energies = speech_frames(audio, frame_size)
+    if speech.sum() < max(1, min_speech_ms // frame_ms):
+        raise EmptyUtteranceError("Nessun parlato rilevato nell'audio")
+
+    # Dal primo all'ultimo frame di parlato, con il margine
+    indices = np.flatnonzero(speech)
+    padding = padding_ms * sample_rate // 1000
+    start = max(0, indices[0] * frame_size - padding)
+    end = min(len(audio), (indices[-1] + 1) * frame_size + padding)
+    audio = audio[start:end]
+
+    # Guadagno calcolato sui soli frame di parlato, limitato per non saturare i picchi
+    speech_rms_db = 10.0 * np.log10(np.mean(np.power(10.0, energies[speech] / 10.0)))
+    gain = 10.0 ** (min(target_dbfs - speech_rms_db, max_gain_db) / 20.0)
+    peak = np.abs(audio).max()
+    if peak * gain > 0.99:
+        gain = 0.99 / peak
+
+    return (audio * gain).astype(np.float32)
@@ -0,0 +1,88 @@
+"""
+audio_utils.py
+--------------
+Funzioni di supporto per la gestione dell'audio in memoria
+(codifica WAV dei segmenti generati da Kokoro, decodifica dell'audio
+inviato dagli utenti per Whisper).
+"""
+
+# Libreria standard per gestire flussi binari in memoria
+import io
+
+# Decodifica tramite ffmpeg (pipe, senza file temporanei)
+import subprocess
+
+import numpy as np
+
+from core.config import WhisperConfig
+
+
+# Estensione dei file archiviati in base al Content-Type della richiesta
+AUDIO_EXTENSIONS = {
+    "audio/webm": ".webm",
+    "audio/ogg": ".ogg",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/wave": ".wav",
+    "audio/mpeg": ".mp3",
+    "audio/mp4": ".m4a",
+}
+
+
+def encode_wav(audio, sample_rate: int) -> bytes:
+    """
+    Codifica un array audio in un file WAV 16-bit PCM interamente in memoria.
+
+    Parametri:
+        audio: Campioni audio (array NumPy o tensore float).
+        sample_rate (int): Frequenza di campionamento in Hz.
+
+    Restituisce:
+        bytes: Contenuto del file WAV.
+    """
+    # Lettura/scrittura di file audio (importata solo quando serve: profili senza sintesi vocale)
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def audio_extension(mimetype: str | None, default: str = ".webm") -> str:
+    """Estensione di file corrispondente al MIME type dell'audio (default: webm, formato del MediaRecorder)."""
+    return AUDIO_EXTENSIONS.get((mimetype or "").lower(), default)
+
+
+def decode_audio(data: bytes, sample_rate: int = WhisperConfig.SAMPLE_RATE) -> np.ndarray:
+    """
+    Decodifica un file audio (qualsiasi formato supportato da ffmpeg) interamente in memoria.
+
+    Il contenuto viene passato a ffmpeg su stdin e letto da stdout come PCM
+    16-bit mono ricampionato: nessun file viene scritto su disco.
+
+    Parametri:
+        data (bytes): Contenuto del file audio (es. webm dal browser).
+        sample_rate (int): Frequenza di campionamento in uscita (16 kHz per Whisper).
+
+    Restituisce:
+        np.ndarray: Campioni float32 mono in [-1, 1].
+    """
+    cmd = [
+        WhisperConfig.FFMPEG_PATH,
+        "-nostdin",
+        "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        result = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg non trovato: {WhisperConfig.FFMPEG_PATH}") from None
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Impossibile decodificare l'audio: {e.stderr.decode(errors='replace').strip()}") from None
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
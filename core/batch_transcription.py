@@ -0,0 +1,176 @@
+"""
+batch_transcription.py
+----------------------
+Trascrizione in blocco di file audio con Whisper (registrazioni archiviate,
+lavori offline).
+
+La decodifica (ffmpeg) e il calcolo degli spettrogrammi log-mel avvengono in
+un pool di worker; gli spettrogrammi, portati alla finestra fissa di 30 s di
+Whisper, vengono impilati e passati all'encoder a gruppi (`batch_size`
+enunciati per forward pass). Gli audio più lunghi di 30 s usano la
+trascrizione standard a finestre scorrevoli.
+"""
+
+# Pool di worker per decodifica e spettrogrammi (ffmpeg e torch rilasciano il GIL)
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+import contextlib
+import os
+
+from core.config import WhisperConfig
+from core.audio_utils import AUDIO_EXTENSIONS, decode_audio
+from core.whisper_profiles import decode_options, transcribe_options
+
+
+# Estensioni considerate audio quando si trascrive una cartella
+AUDIO_FILE_EXTENSIONS = tuple(sorted(set(AUDIO_EXTENSIONS.values()) | {".flac"}))
+
+
+def find_audio_files(paths) -> list:
+    """
+    Espande file e cartelle (ricorsivamente) nell'elenco ordinato dei file audio.
+
+    Parametri:
+        paths (list[str]): File o cartelle.
+
+    Restituisce:
+        list[str]: Percorsi dei file audio.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if name.lower().endswith(AUDIO_FILE_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+class BatchTranscriber:
+    """
+    Trascrizione di molti file audio con un modello Whisper già caricato.
+    """
+
+    def __init__(self, model, language: str = WhisperConfig.LANGUAGE,
+                 batch_size: int = WhisperConfig.BATCH_SIZE, workers: int = WhisperConfig.BATCH_WORKERS,
+                 lock=None, profile: str = WhisperConfig.ASR_PROFILE):
+        """
+        Parametri:
+            model: Modello Whisper (`whisper.load_model`, es. `AICompanion.wmodel`).
+            language (str): Lingua di trascrizione (None = rilevamento automatico).
+            batch_size (int): Enunciati elaborati dall'encoder in un forward pass.
+            workers (int): Thread per decodifica e spettrogrammi (0 = numero di core).
+            lock (threading.Lock): Lock del modello, se condiviso con altre richieste.
+            profile (str): Profilo di inferenza Whisper (preset di decodifica, WhisperConfig.ASR_PROFILES).
+        """
+        self.model = model
+        self.language = language
+        self.batch_size = max(1, batch_size)
+        self.workers = workers or os.cpu_count() or 1
+        self.lock = lock or contextlib.nullcontext()
+        self.decode_options = {**decode_options(profile), "language": language}
+        self.transcribe_options = {**transcribe_options(profile), "language": language}
+
+    def _prepare(self, source):
+        """
+        Decodifica un audio e, se rientra nella finestra di 30 s, ne calcola lo
+        spettrogramma log-mel (eseguita dai worker).
+
+        Restituisce:
+            tuple: (durata in secondi, spettrogramma o None, campioni se più lunghi di 30 s).
+        """
+        import whisper
+
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        audio = decode_audio(source, WhisperConfig.SAMPLE_RATE)
+        duration = len(audio) / WhisperConfig.SAMPLE_RATE
+
+        if len(audio) > whisper.audio.N_SAMPLES:
+            return duration, None, audio
+
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+        return duration, mel, None
+
+    def _decode_batch(self, batch: list) -> list:
+        """Trascrive un gruppo di spettrogrammi con un solo passaggio dell'encoder."""
+        import torch
+        import whisper
+
+        mel = torch.stack([item["mel"] for item in batch]).to(self.model.device)
+        options = whisper.DecodingOptions(**self.decode_options)
+        with self.lock:
+            results = whisper.decode(self.model, mel, options)
+
+        return [
+            {"file": item["file"], "text": result.text.strip(), "language": result.language,
+             "duration": round(item["duration"], 2)}
+            for item, result in zip(batch, results)
+        ]
+
+    def _transcribe_long(self, name: str, duration: float, audio) -> dict:
+        """Trascrizione standard (finestre scorrevoli di 30 s) per gli audio lunghi."""
+        with self.lock:
+            result = self.model.transcribe(audio, **self.transcribe_options)
+        return {"file": name, "text": result["text"].strip(), "language": result.get("language"),
+                "duration": round(duration, 2)}
+
+    def transcribe(self, sources):
+        """
+        Trascrive una sequenza di audio, restituendo i risultati nell'ordine di ingresso.
+
+        Parametri:
+            sources (iterable[tuple[str, str | bytes]]): Coppie (nome, percorso o contenuto del file).
+
+        Restituisce:
+            generator[dict]: Per ogni audio {"file", "text", "language", "duration"}
+                             oppure {"file", "error"} se non è stato possibile trascriverlo.
+        """
+        sources = iter(sources)
+        batch = []
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-asr") as executor:
+            # Finestra limitata di file in preparazione: la memoria non dipende dal numero di file
+            pending = deque()
+
+            def fill():
+                while len(pending) < self.batch_size + self.workers:
+                    item = next(sources, None)
+                    if item is None:
+                        return
+                    name, source = item
+                    pending.append((name, executor.submit(self._prepare, source)))
+
+            fill()
+            while pending:
+                name, future = pending.popleft()
+                fill()
+
+                try:
+                    duration, mel, audio = future.result()
+                except (OSError, ValueError, RuntimeError) as e:
+                    duration, mel, audio = None, None, None
+                    error = str(e)
+
+                if mel is not None:
+                    batch.append({"file": name, "duration": duration, "mel": mel})
+                    if len(batch) >= self.batch_size:
+                        yield from self._decode_batch(batch)
+                        batch = []
+                    continue
+
+                # Audio lungo o errore: prima il gruppo in corso, per mantenere l'ordine
+                if batch:
+                    yield from self._decode_batch(batch)
+                    batch = []
+
+                if audio is not None:
+                    yield self._transcribe_long(name, duration, audio)
+                else:
+                    yield {"file": name, "error": error}
+
+        if batch:
+            yield from self._decode_batch(batch)
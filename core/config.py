@@ -19,6 +19,7 @@ class ModelConfig:
     # NAME: str = "gemma3:12b"  
     TEMPERATURE: float = 0.1  # Controlla la creatività: 0 = deterministico
     REASONING: bool = False  # Flag per attivare modalità reasoning (se supportata dal modello)
+    CHARS_PER_TOKEN: int = 4  # Caratteri per token usati per stimare la lunghezza dei prompt
 
     # Prompt di sistema principale (ruolo dell'assistente)
     BASE_SYSTEM_PROMPT: str = (
@@ -28,6 +29,17 @@ class ModelConfig:
         "informazione nei miei scritti'. Usa un linguaggio elegante ma comprensibile."
     )
 
+    # Prompt per il riassunto progressivo della conversazione (ChatConfig.MEMORY_MODE = "summary")
+    SUMMARY_SYSTEM_PROMPT: str = (
+        "Aggiorna il riassunto di una conversazione tra un utente e l'assistente. "
+        "Integra i nuovi messaggi nel riassunto attuale mantenendo fatti, nomi, domande "
+        "dell'utente e conclusioni importanti. Scrivi in italiano, in forma compatta, "
+        "senza formattazione. Restituisci SOLO il nuovo riassunto."
+    )
+
+    # Template usato per presentare il riassunto al modello di chat
+    SUMMARY_CONTEXT_TEMPLATE: str = "Riassunto della conversazione precedente:"
+
     # Template usato per integrare i documenti recuperati
     DOC_SYSTEM_TEMPLATE: str = (
         "Le seguenti informazioni provengono dai miei manoscritti e fonti verificate. "
@@ -46,11 +58,96 @@ class EmbeddingConfig:
     LENGTH_FUNCTION: str = len  # Funzione per calcolare la lunghezza del testo
     IS_SEPARATOR_REGEX: bool = False  # Specifica se il separatore è un'espressione regolare
 
+    # Calcolo degli embedding in costruzione del Vector Store (vedi core/embedding_client.py)
+    BATCH_SIZE: int = 64  # Testi inviati per ogni richiesta all'endpoint embed di Ollama
+    CONCURRENCY: int = 4  # Richieste in volo contemporaneamente
+    MAX_RETRIES: int = 3  # Tentativi ripetuti per un batch fallito
+    RETRY_BACKOFF: float = 1.0  # Attesa (s) prima del primo nuovo tentativo, raddoppiata ogni volta
+    CHECKPOINT: bool = True  # Salva i batch completati in <db>.ckpt/ per riprendere dopo un'interruzione
+
+    # Cache degli embedding delle domande (vedi core/embedding_cache.py)
+    QUERY_CACHE_MAX_MEMORY: int = 64 * 1024 * 1024  # Byte massimi occupati in memoria (oltre: eliminazione LRU)
+    QUERY_CACHE_DISK_PATH: str | None = None  # File SQLite condiviso tra processi e riavvii (None = solo memoria)
+
+class IngestionConfig:
+    """
+    Configurazione dell'aggiornamento incrementale dei database vettoriali
+    (vedi `core/ingestion.py`).
+    """
+    PDF_WORKERS: int = 0  # Processi per parsing e chunking dei PDF; 0 = numero di core, 1 = sequenziale
+    STREAM_BATCH_SIZE: int = 1024  # Chunk nuovi accumulati prima di embedding e scrittura su disco (memoria limitata)
+    COMPACT_RATIO: float = 0.3  # Quota di righe eliminate oltre la quale il .db viene compattato
+    ANN_REBUILD_RATIO: float = 0.2  # Righe aggiunte dopo l'addestramento IVF (rispetto a quelle indicizzate) oltre cui l'indice viene ricostruito
+
+class RetrievalConfig:
+    """
+    Configurazione della ricerca semantica (RAG) sull'indice vettoriale.
+    """
+    TOP_K: int = 4  # Numero di chunk recuperati per ogni domanda
+    MODE: str = "hybrid"  # "vector" (solo embedding), "hybrid" (BM25 + embedding con RRF) o "lexical" (solo BM25)
+
+    # Ricerca ibrida: indice lessicale BM25 costruito accanto a ogni .db
+    BM25_K1: float = 1.5  # Saturazione della frequenza dei termini
+    BM25_B: float = 0.75  # Normalizzazione sulla lunghezza del chunk
+    BM25_BUILD_BATCH: int = 10000  # Righe elaborate per blocco nella costruzione dell'indice BM25 (memoria limitata)
+    HYBRID_CANDIDATES: int = 20  # Candidati per ciascuna ricerca (lessicale e vettoriale) prima della fusione
+    RRF_K: int = 60  # Costante della Reciprocal Rank Fusion
+    LEXICAL_FAST_PATH: bool = True  # Salta l'embedding della domanda quando i risultati BM25 sono decisivi
+    LEXICAL_FAST_MAX_TERMS: int = 4  # Termini massimi (escluse le stopword) di una domanda per la scorciatoia lessicale
+
+    # Assemblaggio dei documenti nel prompt (vedi core/context_builder.py)
+    CONTEXT_TOKEN_BUDGET: int = 1200  # Token massimi (stimati) dei documenti inseriti nel prompt
+    CONTEXT_MIN_OVERLAP: int = 20  # Caratteri minimi di sovrapposizione per unire due chunk della stessa fonte
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8  # Quota di trigrammi di parole in comune oltre cui un chunk è un duplicato
+
+    # Indice approssimato IVF (Inverted File), costruito in ingestione accanto a ogni .db
+    ANN_ENABLED: bool = True  # Usa l'indice IVF se presente (e lo costruisce in create_vectorstore)
+    ANN_MIN_VECTORS: int = 50000  # Sotto questa soglia basta la ricerca esatta
+    ANN_NLIST: int = 0  # Numero di liste (cluster); 0 = automatico, circa sqrt(numero chunk)
+    ANN_NPROBE: int = 16  # Liste esplorate per query: più alto = recall maggiore, latenza maggiore
+    ANN_TRAIN_ITERATIONS: int = 20  # Iterazioni di k-means per l'addestramento dei centroidi
+
 class ChatConfig:
     """
     Configurazione del contesto conversazionale.
     """
-    CHAT_HISTORY_LIMIT: int = 6  # Numero massimo di messaggi da mantenere in memoria
+    CHAT_HISTORY_LIMIT: int = 6  # Numero massimo di messaggi da mantenere in memoria (per sessione)
+
+    # Memoria conversazionale: "window" (ultimi CHAT_HISTORY_LIMIT messaggi) oppure
+    # "summary" (riassunto progressivo in background + coda recente limitata in token).
+    # "summary" aggiunge una chiamata al modello dopo ogni risposta: con Ollama su CPU
+    # compete con la domanda successiva e ne aumenta la latenza
+    MEMORY_MODE: str = "window"
+    HISTORY_TOKEN_BUDGET: int = 600  # Token massimi (stimati) dei messaggi recenti inviati al modello
+    SUMMARY_MAX_TOKENS: int = 250  # Token massimi generati per il riassunto
+    SUMMARY_MAX_PENDING: int = 40  # Messaggi massimi per sessione in attesa di riassunto (oltre vengono scartati)
+
+    # Cache semantica delle risposte (vedi core/answer_cache.py)
+    ANSWER_CACHE: bool = True  # Riusa la risposta a una domanda simile con gli stessi documenti recuperati
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Similarità coseno minima tra le domande
+    ANSWER_CACHE_TTL: int = 24 * 3600  # Secondi dopo i quali una risposta salvata scade
+    ANSWER_CACHE_MAX_ENTRIES: int = 1024  # Risposte massime in memoria (oltre → eliminazione LRU)
+
+    # Sessioni conversazionali (una cronologia separata per ogni client)
+    SESSION_COOKIE_NAME: str = "aicompanion_session"  # Cookie con l'id di sessione
+    SESSION_IDLE_TIMEOUT: int = 1800  # Secondi di inattività prima dell'eliminazione della sessione
+    MAX_SESSIONS: int = 10000  # Numero massimo di sessioni in memoria (oltre → eliminazione LRU)
+    SESSION_MEMORY_LIMIT: int = 256 * 1024 * 1024  # Memoria stimata complessiva delle cronologie (byte)
+
+class FeatureConfig:
+    """
+    Profili di funzionalità del server (vedi core/features.py): le librerie audio
+    (torch, Whisper, Kokoro, soundfile) vengono importate e le relative route
+    registrate solo se il profilo le abilita.
+    """
+    PROFILE: str = "full"  # Profilo attivo: "text", "stt", "tts" o "full" (sovrascrivibile con --profile)
+    PROFILES: dict = {
+        "text": (),  # Solo chat testuale
+        "stt": ("stt",),  # Chat testuale + domande vocali (Whisper)
+        "tts": ("tts",),  # Chat testuale + risposte vocali (Kokoro)
+        "full": ("stt", "tts"),  # Tutte le funzionalità
+    }
+    IMPORT_REPORT: bool = False  # Stampa all'avvio tempo e memoria di import di ciascuna libreria del profilo
 
 class WebConfig:
     """
@@ -62,12 +159,27 @@ class WebConfig:
 
     # Endpoint API per AICompanion
     APP_ROUTE_TEST: str = "/test"  # Endpoint API testo
+    APP_ROUTE_TEST_STREAM: str = "/test/stream"  # Endpoint API testo in streaming (SSE)
     APP_ROUTE_AUDIO: str = "/audio"  # Endpoint API audio
+    APP_ROUTE_AUDIO_STREAM: str = "/audio/stream"  # Endpoint API audio in streaming (SSE)
+    APP_ROUTE_AUDIO_WS: str = "/audio/ws"  # Endpoint WebSocket audio: trascrizione durante la registrazione (richiede flask-sock)
+    APP_ROUTE_AUDIO_BATCH: str = "/audio/batch"  # Trascrizione in blocco di più file audio (JSONL, senza chat)
+    APP_ROUTE_HEALTH: str = "/health"  # Stato e tempi di caricamento dei componenti
+    APP_ROUTE_READY: str = "/ready"  # 200 quando tutti i componenti sono pronti, altrimenti 503
 
     # Endpoint API per la modalità interrogazione
     APP_ROUTE_INTERROGAZIONE_START: str = "/test_interrogazione/start"
     APP_ROUTE_INTERROGAZIONE_ANSWER: str = "/test_interrogazione/answer"
 
+    # Formato della risposta con audio su /test e /audio:
+    # "json" (Base64, compatibilità), "wav" (binario) o "multipart" (meta JSON + WAV)
+    AUDIO_RESPONSE_FORMAT: str = "json"
+
+    # Avvio: modelli e database caricati in background (vedi core/model_loader.py)
+    LAZY_LOADING: bool = True  # Il server accetta connessioni subito; False = carica tutto prima di avviarsi
+    WARMUP: bool = True  # Un'inferenza a vuoto per modello dopo il caricamento (evita il caricamento a freddo alla prima richiesta)
+    COMPONENT_WAIT_TIMEOUT: float = 300.0  # Secondi massimi di attesa di una richiesta per un componente non ancora caricato
+
     HOST: str = "127.0.0.1"  # Host locale
     PORT: int = 9000  # Porta di esecuzione dell'app Flask
     DEBUG: bool = False
@@ -80,6 +192,36 @@ class BenchmarksConfig:
     SLEEP_TIME: int = 5  # Secondi di pausa tra uno snapshot e l'altro
     EXCEL_FILE: str = "cpu_benchmark.xlsx"  # Nome del file Excel di output
 
+    # Benchmark ricerca approssimata (benchmarks/benchmark_ann.py)
+    ANN_TOP_K: int = 5  # Numero di risultati confrontati per il calcolo della recall
+    ANN_NPROBE_VALUES: tuple = (1, 2, 4, 8, 16, 32, 64)  # Valori di nprobe da misurare
+    ANN_QUERIES_PATH: str = "interrogazione/domande.json"  # Domande usate come query di test
+
+    # Benchmark trascrizione in blocco (benchmarks/benchmark_transcription.py)
+    TRANSCRIPTION_AUDIO_DIR: str = "questions"  # Registrazioni usate come input
+    TRANSCRIPTION_MAX_FILES: int = 64  # Numero massimo di file trascritti
+    TRANSCRIPTION_BATCH_SIZES: tuple = (1, 4, 8, 16)  # Dimensioni di gruppo misurate
+
+    # Benchmark profili Whisper (benchmarks/benchmark_whisper.py)
+    WHISPER_REFERENCE_PATH: str = "benchmarks/data/whisper_reference.jsonl"  # Audio e trascrizioni di riferimento ({"file", "text"} per riga)
+    WHISPER_PROFILES: tuple = ()  # Profili misurati (vuoto = tutti quelli di WhisperConfig.ASR_PROFILES)
+
+    # Benchmark sintesi vocale parallela (benchmarks/benchmark_tts.py)
+    TTS_WORKER_COUNTS: tuple = (0, 1, 2, 4, 8)  # Processi di sintesi misurati (0 = KPipeline nel processo)
+    TTS_RUNS: int = 3  # Esecuzioni per configurazione (si considera la più veloce)
+    TTS_TEXT: str = (  # Risposta lunga usata come input
+        "Alice stava cominciando a sentirsi molto stanca di sedere vicino a sua sorella sulla riva, "
+        "e di non aver nulla da fare. Una o due volte aveva gettato uno sguardo sul libro che la sorella "
+        "stava leggendo, ma non c'erano figure né dialoghi. E a che serve un libro, pensò Alice, senza "
+        "figure né dialoghi? Così stava considerando fra sé, per quanto poteva, poiché la giornata calda "
+        "la faceva sentire assonnata e stupida, se il piacere di fare una ghirlanda di margherite valesse "
+        "la pena di alzarsi e di cogliere le margherite, quando improvvisamente un Coniglio Bianco dagli "
+        "occhi rosa le passò accanto di corsa. Non c'era nulla di tanto straordinario in questo; né Alice "
+        "pensò che fosse tanto strano sentire il Coniglio dire fra sé: Povero me! Povero me! Farò tardi! "
+        "Ma quando il Coniglio tirò fuori un orologio dal taschino del panciotto, lo guardò e riprese a "
+        "correre, Alice balzò in piedi e, piena di curiosità, corse attraverso il campo dietro di lui."
+    )
+
 class KokoroConfig:
     """
     Configurazione per il sistema text-to-speech Kokoro.
@@ -98,11 +240,24 @@ class KokoroConfig:
     VOICES_PATH: str = "models/voices/"
     VOICE_PATH: str = "models/voices/af_jessica.pt"
     GENERATED_PATH: str = "responses/"
+    SAVE_AUDIO: bool = False  # Salva anche su disco l'audio di ogni risposta (responses/{idx}.wav)
     
+    LANG_CODE: str = "i"  # Codice lingua della pipeline Kokoro ("i" per italiano)
+
     # Parametri audio
     AUDIO_SPEED: float = 0.9  # Velocità di riproduzione della voce sintetizzata
     AUDIO_FREQ: int = 24000  # Frequenza di campionamento audio
 
+    # Sintesi parallela su più processi (vedi core/tts_engine.py)
+    WORKERS: int = 0  # Processi di sintesi, ognuno con il proprio modello (0 = sintesi nel processo del server; sovrascrivibile con --tts-workers)
+    WORKER_THREADS: int = 2  # Thread torch di ciascun processo di sintesi
+
+    # Cache dell'audio sintetizzato, per frase e per risposta (vedi core/tts_cache.py)
+    CACHE: bool = True  # Riusa l'audio di testi già sintetizzati con la stessa voce e velocità
+    CACHE_MAX_MEMORY: int = 128 * 1024 * 1024  # Byte massimi occupati in memoria (oltre: eliminazione LRU)
+    CACHE_DISK_PATH: str | None = "cache/tts"  # Cartella della cache su disco, condivisa tra riavvii (None = solo memoria)
+    CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024  # Spazio massimo su disco (oltre: eliminati i file meno recenti)
+
 class WhisperConfig:
     """
     Configurazione per il modello di trascrizione vocale Whisper.
@@ -118,6 +273,43 @@ class WhisperConfig:
     DEVICE_NAME: str = "cpu"  # Dispositivo su cui eseguire il modello: "cpu" o "cuda"
     LANGUAGE: str = "it"  # Lingua di trascrizione
 
+    # Profili di inferenza (vedi core/whisper_profiles.py): modello quantizzato e preset di decodifica
+    ASR_PROFILE: str = "default"  # Profilo attivo (sovrascrivibile con --asr-profile)
+    ASR_PROFILES: dict = {
+        # Modello float32, decodifica standard di transcribe (greedy con fallback di temperatura)
+        "default": {"quantize": False, "decoding": {}},
+        # Layer lineari int8 (solo CPU), greedy senza fallback né condizionamento sul testo precedente
+        "low_latency": {
+            "quantize": True,
+            "decoding": {"temperature": 0.0, "condition_on_previous_text": False, "without_timestamps": True},
+        },
+        # Modello float32, beam search con fallback di temperatura
+        "accurate": {"quantize": False, "decoding": {"beam_size": 5, "best_of": 5}},
+    }
+
+    # Audio degli utenti (vedi decode_audio in core/audio_utils.py)
+    SAMPLE_RATE: int = 16000  # Frequenza dell'audio passato a Whisper (decodificato in memoria con ffmpeg)
+    FFMPEG_PATH: str = "ffmpeg"  # Eseguibile ffmpeg usato per la decodifica
+    ARCHIVE_AUDIO: bool = True  # Salva in background l'audio originale in questions/{idx}.<estensione>
+
+    # Segmentazione del parlato (VAD) per la trascrizione in streaming (vedi core/vad.py)
+    VAD_FRAME_MS: int = 30  # Durata di ciascun frame analizzato
+    VAD_THRESHOLD_DB: float = -45.0  # Energia minima (dBFS) di un frame di parlato
+    VAD_MARGIN_DB: float = 12.0  # Margine sopra il rumore di fondo stimato
+    VAD_SILENCE_MS: int = 500  # Pausa che chiude un segmento (che viene subito trascritto)
+    VAD_MIN_SPEECH_MS: int = 250  # Parlato minimo di un segmento (più brevi: scartati come rumore)
+    VAD_MAX_SEGMENT_S: float = 15.0  # Durata oltre la quale un segmento viene chiuso comunque
+    VAD_PADDING_MS: int = 200  # Audio mantenuto prima e dopo il parlato
+
+    # Pre-elaborazione delle domande vocali prima di Whisper (vedi core/audio_preprocessing.py)
+    PREPROCESS: bool = True  # Taglia il silenzio iniziale/finale (soglie VAD_*) e normalizza il volume
+    NORMALIZE_TARGET_DBFS: float = -20.0  # Livello RMS del parlato dopo la normalizzazione
+    NORMALIZE_MAX_GAIN_DB: float = 20.0  # Guadagno massimo (evita di amplificare il rumore)
+
+    # Trascrizione in blocco (endpoint /audio/batch e transcribe.py, vedi core/batch_transcription.py)
+    BATCH_SIZE: int = 8  # Enunciati (fino a 30 s) elaborati dall'encoder in un forward pass
+    BATCH_WORKERS: int = 0  # Thread per decodifica e spettrogrammi (0 = numero di core)
+
 class TestChatConfig:
     """
     Configurazione per la modalità 'interrogazione' (AICompanion Test Mode).
@@ -0,0 +1,157 @@
+"""
+context_builder.py
+------------------
+Assemblaggio dei documenti recuperati (RAG) nel contesto del modello.
+
+I chunk prodotti da `choose_splitter` si sovrappongono fino a 250 caratteri,
+quindi chunk adiacenti recuperati insieme ripetono lo stesso testo. Prima di
+entrare nel prompt i documenti vengono:
+- uniti, se provengono dalla stessa fonte e si sovrappongono (fine dell'uno = inizio dell'altro)
+- filtrati, scartando i quasi-duplicati di documenti più pertinenti
+- selezionati per pertinenza fino a riempire un budget di token prefissato
+
+Così la dimensione del prompt (e la latenza di prefill) resta prevedibile.
+"""
+
+# Segmentazione in parole per i confronti tra documenti
+import re
+
+from core.config import ModelConfig, RetrievalConfig
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Stima il numero di token di un testo (circa ModelConfig.CHARS_PER_TOKEN caratteri per token)."""
+    return -(-len(text) // ModelConfig.CHARS_PER_TOKEN)
+
+
+class Passage:
+    """Testo candidato al contesto, con la fonte e la migliore posizione (rank) nel retrieval."""
+
+    __slots__ = ("text", "source", "rank")
+
+    def __init__(self, text: str, source, rank: int):
+        self.text = text
+        self.source = source
+        self.rank = rank
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """
+    Lunghezza della sovrapposizione tra la fine di `left` e l'inizio di `right`
+    (0 se inferiore a min_overlap).
+    """
+    for n in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:n]):
+            return n
+    return 0
+
+
+def merge_overlapping(passages: list, min_overlap: int = RetrievalConfig.CONTEXT_MIN_OVERLAP) -> list:
+    """
+    Unisce i passaggi della stessa fonte che si sovrappongono o sono contenuti
+    l'uno nell'altro. Il passaggio unito conserva la posizione migliore.
+    """
+    merged = list(passages)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(len(merged)):
+                a, b = merged[i], merged[j]
+                if i == j or a.source != b.source:
+                    continue
+
+                if b.text in a.text:
+                    text = a.text
+                else:
+                    n = _overlap(a.text, b.text, min_overlap)
+                    if not n:
+                        continue
+                    text = a.text + b.text[n:]
+
+                merged[i] = Passage(text, a.source, min(a.rank, b.rank))
+                del merged[j]
+                changed = True
+                break
+            if changed:
+                break
+    return merged
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    """Insieme delle sequenze di `size` parole consecutive (minuscole) del testo."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def remove_near_duplicates(passages: list, threshold: float = RetrievalConfig.CONTEXT_DEDUP_THRESHOLD) -> list:
+    """
+    Scarta i passaggi quasi identici (o quasi interamente contenuti) in un
+    passaggio più pertinente già tenuto. I passaggi devono essere ordinati per pertinenza.
+    """
+    kept, kept_shingles = [], []
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        duplicate = any(
+            len(shingles & other) / max(1, min(len(shingles), len(other))) >= threshold
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Tronca il testo al budget di token, preferibilmente alla fine di una frase o di una parola."""
+    limit = max_tokens * ModelConfig.CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind("\n"))
+    if end < limit // 2:
+        end = cut.rfind(" ")
+    return cut[:end + 1].rstrip() if end > 0 else cut
+
+
+def build_document_context(documents: list, token_budget: int = RetrievalConfig.CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Costruisce il testo dei documenti da inserire nel prompt.
+
+    Parametri:
+    -----------
+        documents (list[Document]): Documenti recuperati, dal più pertinente.
+        token_budget (int): Token massimi (stimati) del testo restituito.
+
+    Restituisce:
+    -------------
+        str: Passaggi uniti, senza duplicati, entro il budget (dal più pertinente).
+    """
+    passages = [
+        Passage(doc.page_content.strip(), doc.metadata.get("source"), rank)
+        for rank, doc in enumerate(documents)
+        if doc.page_content.strip()
+    ]
+
+    passages = merge_overlapping(passages)
+    passages.sort(key=lambda p: p.rank)
+    passages = remove_near_duplicates(passages)
+
+    # Riempimento del budget per pertinenza: i passaggi che non entrano vengono saltati
+    selected, used = [], 0
+    for passage in passages:
+        tokens = estimate_tokens(passage.text)
+        if used + tokens <= token_budget:
+            selected.append(passage.text)
+            used += tokens
+
+    # Nemmeno il passaggio più pertinente entra nel budget: viene troncato
+    if not selected and passages:
+        selected.append(_truncate(passages[0].text, token_budget))
+
+    return "\n\n".join(selected)
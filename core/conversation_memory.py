@@ -0,0 +1,104 @@
+"""
+conversation_memory.py
+----------------------
+Riassunto progressivo delle conversazioni.
+
+Dopo ogni risposta, i messaggi che non rientrano più nella coda recente
+(ChatConfig.HISTORY_TOKEN_BUDGET) vengono fusi nel riassunto della sessione
+da un thread in background, senza rallentare la risposta all'utente.
+Al modello arrivano quindi solo il riassunto e pochi messaggi recenti:
+il costo di ogni turno non cresce con la lunghezza della conversazione.
+"""
+
+# Coda delle sessioni da riassumere
+import queue
+
+# Thread di riassunto in background
+import threading
+
+from langchain_ollama import ChatOllama
+
+from core.config import ChatConfig, ModelConfig
+from core.session_store import SessionStore
+
+
+class ConversationSummarizer:
+    """
+    Worker in background che aggiorna il riassunto delle sessioni.
+    Ogni sessione è in coda al più una volta: più risposte ravvicinate
+    vengono riassunte con un'unica chiamata al modello.
+    """
+
+    def __init__(self, sessions: SessionStore,
+                 token_budget: int = ChatConfig.HISTORY_TOKEN_BUDGET,
+                 max_tokens: int = ChatConfig.SUMMARY_MAX_TOKENS):
+        """
+        Parametri:
+            sessions (SessionStore): Archivio delle sessioni da riassumere.
+            token_budget (int): Token massimi (stimati) della coda di messaggi recenti.
+            max_tokens (int): Token massimi generati per il riassunto.
+        """
+        self.sessions = sessions
+        self.token_budget = token_budget
+
+        # Modello dedicato: deterministico e con lunghezza della risposta limitata
+        self.model = ChatOllama(
+            model=ModelConfig.NAME,
+            temperature=0,
+            num_predict=max_tokens,
+            reasoning=False
+        )
+
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name="conversation-summarizer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, session_id: str):
+        """Mette in coda la sessione per l'aggiornamento del riassunto (se non lo è già)."""
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+        self._queue.put(session_id)
+
+    def summarize(self, summary: str, messages: list) -> str:
+        """
+        Fonde i messaggi nel riassunto esistente.
+
+        Parametri:
+            summary (str): Riassunto attuale (vuoto se non esiste).
+            messages (list[tuple[str, str]]): Messaggi (ruolo, testo) da aggiungere al riassunto.
+
+        Restituisce:
+            str: Nuovo riassunto.
+        """
+        roles = {"human": "Utente", "assistant": "Assistente"}
+        transcript = "\n".join(f"{roles.get(role, role)}: {text}" for role, text in messages)
+
+        prompt = [
+            ("system", ModelConfig.SUMMARY_SYSTEM_PROMPT.strip()),
+            ("human", f"Riassunto attuale:\n{summary or '(nessuno)'}\n\nNuovi messaggi:\n{transcript}"),
+        ]
+        response = self.model.invoke(prompt)
+        return getattr(response, "content", str(response)).strip()
+
+    def _run(self):
+        """Ciclo del worker: riassume le sessioni in coda una alla volta."""
+        while True:
+            session_id = self._queue.get()
+            with self._lock:
+                self._pending.discard(session_id)
+
+            try:
+                pending = self.sessions.pending_summary(session_id, self.token_budget)
+                if pending is None:
+                    continue
+                summary, ref, messages = pending
+                self.sessions.fold(session_id, self.summarize(summary, messages), ref)
+
+            except Exception as e:
+                # I messaggi restano nella cronologia e verranno riassunti al turno successivo
+                print(f"[ConversationSummarizer] Errore nel riassunto della sessione: {e}")
@@ -0,0 +1,189 @@
+"""
+embedding_cache.py
+------------------
+Cache degli embedding delle domande, condivisa da tutto il processo.
+
+Chat, interrogazione e `get_relevant_chunks` calcolano l'embedding di ogni
+domanda tramite Ollama. Le domande ripetute (o generate da un modello)
+sono frequenti, quindi gli embedding vengono conservati:
+- in memoria, con eliminazione LRU oltre un limite di memoria
+- opzionalmente su disco (SQLite), condiviso tra processi e riavvii
+
+La chiave è il testo normalizzato (spazi, maiuscole, forma Unicode) più il
+nome del modello di embedding.
+"""
+
+# Chiave su disco (hash di modello + testo)
+import hashlib
+
+# Tier su disco
+import sqlite3
+
+# Accesso concorrente dai thread del server Flask
+import threading
+
+# Normalizzazione del testo
+import unicodedata
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+# Dizionario ordinato per l'ordine LRU
+from collections import OrderedDict
+
+import numpy as np
+
+from langchain_ollama import OllamaEmbeddings
+
+from core.config import EmbeddingConfig
+
+
+def normalize_query(text: str) -> str:
+    """Normalizza il testo di una domanda: forma Unicode NFKC, minuscole, spazi compattati."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU in memoria (limitata in byte) con tier opzionale su disco.
+    """
+
+    def __init__(self, max_memory: int = EmbeddingConfig.QUERY_CACHE_MAX_MEMORY,
+                 disk_path: str | None = EmbeddingConfig.QUERY_CACHE_DISK_PATH):
+        self.max_memory = max_memory
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Tier su disco: tabella chiave → vettore float32
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    @staticmethod
+    def _disk_key(key: tuple) -> str:
+        return hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: tuple) -> np.ndarray | None:
+        """Restituisce l'embedding associato alla chiave (modello, testo normalizzato), se presente."""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (self._disk_key(key),)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._store(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, vector) -> np.ndarray:
+        """Inserisce un embedding in memoria (e su disco, se attivo)."""
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._store(key, vector)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                 (self._disk_key(key), vector.tobytes()))
+                self._db.commit()
+        return vector
+
+    def _store(self, key: tuple, vector: np.ndarray):
+        """Inserimento in memoria con eliminazione LRU oltre il limite."""
+        if key in self._entries:
+            self._memory -= self._entry_size(key, self._entries.pop(key))
+        self._entries[key] = vector
+        self._memory += self._entry_size(key, vector)
+        while self._memory > self.max_memory and len(self._entries) > 1:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._memory -= self._entry_size(old_key, old_vector)
+
+    @staticmethod
+    def _entry_size(key: tuple, vector: np.ndarray) -> int:
+        """Occupazione stimata di una voce (vettore + testo della chiave)."""
+        return vector.nbytes + sum(len(part) for part in key)
+
+    def stats(self) -> dict:
+        """Statistiche della cache: voci, memoria, hit/miss e hit rate."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory": self._memory,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+class CachedEmbeddings:
+    """
+    Embedding delle domande con cache: stessa interfaccia (`embed_query`,
+    `embed_documents`) di OllamaEmbeddings.
+    """
+
+    def __init__(self, model: str, cache: QueryEmbeddingCache):
+        self.model = model
+        self.cache = cache
+        self.embeddings = OllamaEmbeddings(model=model)
+
+    def embed_query(self, text: str) -> list:
+        """Embedding di una domanda (dalla cache se già calcolato)."""
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: list) -> list:
+        """Embedding di più testi: quelli non in cache vengono calcolati con un'unica chiamata."""
+        keys = [(self.model, normalize_query(text)) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+
+        # Testi mancanti, senza ripetizioni
+        missing = {}
+        for text, key, vector in zip(texts, keys, vectors):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {key: self.cache.put(key, vector) for key, vector in zip(missing, computed)}
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return [vector.tolist() for vector in vectors]
+
+
+# Cache e client condivisi da tutto il processo
+_cache = None
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_query_embeddings(model: str = EmbeddingConfig.NAME) -> CachedEmbeddings:
+    """
+    Restituisce il client di embedding (con cache) condiviso dal processo per il modello indicato.
+    """
+    global _cache
+    with _clients_lock:
+        if _cache is None:
+            _cache = QueryEmbeddingCache()
+        if model not in _clients:
+            _clients[model] = CachedEmbeddings(model, _cache)
+        return _clients[model]
+
+
+def query_cache_stats() -> dict:
+    """Statistiche della cache condivisa (vuote se non ancora usata)."""
+    return _cache.stats() if _cache is not None else {}
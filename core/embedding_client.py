@@ -0,0 +1,189 @@
+"""
+embedding_client.py
+-------------------
+Client per il calcolo degli embedding in fase di costruzione dei database vettoriali.
+
+Rispetto a una singola chiamata `embed_documents` su tutti i chunk:
+- i testi vengono inviati all'endpoint embed di Ollama in batch di dimensione fissa
+- più batch sono in volo contemporaneamente (thread: il lavoro è I/O verso il server)
+- i batch falliti vengono ritentati con attesa esponenziale
+- i batch completati possono essere salvati in una cartella di checkpoint, così
+  un'interruzione non fa perdere gli embedding già calcolati
+- vengono misurati chunk/s e token/s
+"""
+
+# Chiave dei checkpoint (hash dei testi del batch)
+import hashlib
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+# Rimozione della cartella di checkpoint
+import shutil
+
+# Attese tra i tentativi e misura del throughput
+import time
+
+# Batch in volo contemporaneamente
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+# Client ufficiale di Ollama (dipendenza di langchain_ollama)
+import ollama
+
+from core.config import EmbeddingConfig
+
+
+class EmbeddingStats:
+    """Contatori di throughput del calcolo degli embedding."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.cached_batches = 0
+        self.retries = 0
+
+    def report(self) -> str:
+        """Riepilogo leggibile del throughput."""
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (f"{self.chunks} chunk in {self.batches} batch ({self.cached_batches} da checkpoint, "
+                f"{self.retries} tentativi ripetuti) in {elapsed:.2f} s → "
+                f"{self.chunks / elapsed:.1f} chunk/s, {self.tokens / elapsed:.1f} token/s")
+
+
+class EmbeddingClient:
+    """
+    Calcolo degli embedding a batch, con richieste concorrenti, tentativi
+    ripetuti e checkpoint su disco.
+    """
+
+    def __init__(self, model: str = EmbeddingConfig.NAME,
+                 batch_size: int = EmbeddingConfig.BATCH_SIZE,
+                 concurrency: int = EmbeddingConfig.CONCURRENCY,
+                 max_retries: int = EmbeddingConfig.MAX_RETRIES,
+                 retry_backoff: float = EmbeddingConfig.RETRY_BACKOFF,
+                 client: ollama.Client | None = None):
+        """
+        Parametri:
+        -----------
+            model (str): Nome del modello di embedding Ollama.
+            batch_size (int): Numero di testi per richiesta.
+            concurrency (int): Numero massimo di richieste in volo.
+            max_retries (int): Tentativi ripetuti per batch prima di rinunciare.
+            retry_backoff (float): Attesa (s) prima del primo nuovo tentativo, raddoppiata ogni volta.
+            client (ollama.Client | None): Client Ollama; se None usa l'host di default (OLLAMA_HOST).
+        """
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.client = client or ollama.Client()
+        self.stats = EmbeddingStats()
+
+    def _checkpoint_path(self, checkpoint_dir: str, texts: list) -> str:
+        """Percorso del checkpoint di un batch, indirizzato dal contenuto (modello + testi)."""
+        digest = hashlib.sha256(self.model.encode("utf-8"))
+        for text in texts:
+            digest.update(b"\0" + text.encode("utf-8"))
+        return os.path.join(checkpoint_dir, digest.hexdigest() + ".npy")
+
+    def _embed_batch(self, texts: list) -> tuple[np.ndarray, int, int]:
+        """
+        Calcola gli embedding di un batch, ritentando in caso di errore.
+
+        Restituisce:
+            tuple[np.ndarray, int, int]: Embedding (n x d), token elaborati e tentativi ripetuti.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embed(model=self.model, input=texts)
+                vectors = np.asarray(response["embeddings"], dtype=np.float32)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Ricevuti {len(vectors)} embedding per {len(texts)} testi")
+
+                # Token effettivi se il server li riporta, altrimenti stima (~4 caratteri per token)
+                tokens = response.get("prompt_eval_count") or sum(len(t) for t in texts) // 4
+                return vectors, tokens, attempt
+
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Batch di embedding fallito dopo {attempt + 1} tentativi: {e}") from e
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"[EmbeddingClient] Errore ({e}), nuovo tentativo tra {delay:.1f} s")
+                time.sleep(delay)
+
+    def _run_batch(self, texts: list, checkpoint_dir: str | None) -> tuple[np.ndarray, int, int]:
+        """Calcola un batch e, se richiesto, ne salva subito il checkpoint."""
+        vectors, tokens, retries = self._embed_batch(texts)
+        if checkpoint_dir:
+            path = self._checkpoint_path(checkpoint_dir, texts)
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, vectors)
+            os.replace(tmp_path, path)
+        return vectors, tokens, retries
+
+    def embed(self, texts: list, checkpoint_dir: str | None = None) -> np.ndarray:
+        """
+        Calcola gli embedding di una lista di testi, nello stesso ordine.
+
+        Parametri:
+        -----------
+            texts (list[str]): Testi da convertire in embedding.
+            checkpoint_dir (str | None): Cartella in cui salvare (e da cui riprendere)
+                                         i batch completati; None = nessun checkpoint.
+
+        Restituisce:
+        -------------
+            np.ndarray: Matrice float32 (n x d) degli embedding.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = [None] * len(batches)
+
+        # Batch già calcolati in un'esecuzione precedente
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            for i, batch in enumerate(batches):
+                path = self._checkpoint_path(checkpoint_dir, batch)
+                if os.path.exists(path):
+                    results[i] = np.load(path)
+                    self.stats.cached_batches += 1
+
+        todo = [i for i, result in enumerate(results) if result is None]
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = {pool.submit(self._run_batch, batches[i], checkpoint_dir): i for i in todo}
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                vectors, tokens, retries = future.result()
+                results[i] = vectors
+
+                self.stats.batches += 1
+                self.stats.chunks += len(batches[i])
+                self.stats.tokens += tokens
+                self.stats.retries += retries
+
+                if done % 10 == 0 or done == len(todo):
+                    print(f"[EmbeddingClient] {done}/{len(todo)} batch → {self.stats.report()}")
+        finally:
+            # In caso di errore i batch non ancora avviati vengono annullati;
+            # quelli in volo terminano e salvano comunque il loro checkpoint
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        return np.concatenate(results)
+
+    @staticmethod
+    def clear_checkpoint(checkpoint_dir: str):
+        """Rimuove la cartella di checkpoint (da chiamare quando il database è stato scritto)."""
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+
+def checkpoint_dir(db_path: str) -> str:
+    """Cartella dei checkpoint di embedding associata a un file .db."""
+    return f"{db_path}.ckpt"
@@ -0,0 +1,104 @@
+"""
+features.py
+-----------
+Profili di funzionalità del server (solo testo, STT, TTS, completo).
+
+Le librerie audio (torch, Whisper, Kokoro, soundfile) occupano secondi di
+avvio e centinaia di MB di memoria: vengono importate solo se il profilo
+attivo abilita la trascrizione (STT) o la sintesi vocale (TTS). Il report
+di import misura tempo e memoria di ciascuna libreria del profilo.
+"""
+
+# Import differito delle librerie dei profili
+import importlib
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+import sys
+import time
+
+# Memoria di picco (non disponibile su Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from core.config import FeatureConfig
+
+
+# Librerie pesanti richieste da ciascuna funzionalità, nell'ordine di import
+FEATURE_MODULES = {
+    "stt": ("torch", "whisper"),
+    "tts": ("torch", "soundfile", "kokoro"),
+}
+
+
+def profile_features(profile: str = FeatureConfig.PROFILE) -> frozenset:
+    """
+    Restituisce le funzionalità ("stt", "tts") abilitate dal profilo.
+
+    Solleva ValueError se il profilo non esiste in FeatureConfig.PROFILES.
+    """
+    if profile not in FeatureConfig.PROFILES:
+        raise ValueError(f"Profilo sconosciuto: {profile} (disponibili: {', '.join(FeatureConfig.PROFILES)})")
+    return frozenset(FeatureConfig.PROFILES[profile])
+
+
+def detect_device() -> str:
+    """Restituisce "cuda" se una GPU è disponibile per torch, altrimenti "cpu"."""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def current_rss_mb() -> float:
+    """Memoria residente del processo in MB (Linux: attuale; altrove: di picco)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0.0
+        # ru_maxrss è in KB su Linux, in byte su macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def import_report(features) -> list:
+    """
+    Importa le librerie delle funzionalità indicate misurando tempo e memoria di ciascuna.
+
+    Le librerie già importate (ad esempio torch, condiviso da STT e TTS)
+    compaiono una sola volta: il costo è attribuito alla prima funzionalità che le richiede.
+
+    Parametri:
+        features (Iterable[str]): Funzionalità ("stt", "tts").
+
+    Restituisce:
+        list[dict]: Per ogni libreria: modulo, funzionalità, secondi di import e MB di memoria aggiunti.
+    """
+    report = []
+    for feature in sorted(features):
+        for module in FEATURE_MODULES[feature]:
+            if module in sys.modules:
+                continue
+            rss = current_rss_mb()
+            start = time.perf_counter()
+            importlib.import_module(module)
+            report.append({
+                "module": module,
+                "feature": feature,
+                "seconds": time.perf_counter() - start,
+                "rss_mb": current_rss_mb() - rss,
+            })
+    return report
+
+
+def print_import_report(profile: str, base_seconds: float, base_rss: float, report: list):
+    """Stampa il report di import: base dell'applicazione, librerie del profilo e totale."""
+    print(f"Report di import (profilo '{profile}'):")
+    print(f"  {'applicazione':<14}{base_seconds:8.2f} s {base_rss:9.1f} MB")
+    for row in report:
+        print(f"  {row['module']:<14}{row['seconds']:8.2f} s {row['rss_mb']:+9.1f} MB  ({row['feature']})")
+    total = base_seconds + sum(row["seconds"] for row in report)
+    print(f"  {'totale':<14}{total:8.2f} s {current_rss_mb():9.1f} MB")
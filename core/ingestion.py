@@ -0,0 +1,380 @@
+"""
+ingestion.py
+------------
+Aggiornamento incrementale dei database vettoriali a partire dai PDF.
+
+Accanto a ogni .db viene salvato un manifest (`<db>.manifest.json`) con:
+- l'hash SHA-256 di ogni file PDF indicizzato
+- per ogni file, l'hash di ciascun chunk e la riga del .db che lo contiene
+
+A ogni aggiornamento:
+- i file con hash invariato vengono saltati senza essere riletti
+- dei file nuovi o modificati si calcolano solo gli embedding dei chunk nuovi
+  (i chunk identici a quelli già presenti riusano la riga esistente)
+- i chunk spariti e i file eliminati vengono marcati come eliminati (tombstone)
+- le nuove righe sono aggiunte in coda al .db esistente, senza riscriverlo
+
+L'elaborazione è una pipeline a flusso (file → chunk → embedding → disco):
+i chunk nuovi vengono accumulati solo fino a `IngestionConfig.STREAM_BATCH_SIZE`
+e poi scritti, quindi la memoria occupata non dipende dalla dimensione del corpus
+(restano in memoria solo gli hash del manifest).
+
+Quando le righe eliminate superano una certa quota il .db viene compattato.
+"""
+
+# Hash del contenuto di file e chunk
+import hashlib
+
+# Lettura/scrittura del manifest
+import json
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+# Identificativi dei nuovi chunk
+import uuid
+
+import numpy as np
+
+from core.config import (
+    EmbeddingConfig,
+    IngestionConfig,
+    RetrievalConfig,
+)
+
+from core.embedding_client import EmbeddingClient, checkpoint_dir
+from core.vector_db import (
+    VectorDB,
+    append_vector_db,
+    compact_vector_db,
+    delete_vector_rows,
+    is_vector_db,
+    write_vector_db,
+)
+from core.vector_utils import (
+    IVFIndex,
+    ParseStats,
+    ann_index_path,
+    build_ann_index,
+    build_lexical_index,
+    convert_legacy_db,
+    iter_parsed_pdfs,
+    load_lexical_index,
+)
+
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(db_path: str) -> str:
+    """Percorso del manifest di ingestione associato a un file .db."""
+    return f"{db_path}.manifest.json"
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """Calcola l'hash SHA-256 del contenuto di un file, leggendolo a blocchi."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text: str, metadata: dict) -> str:
+    """
+    Calcola l'hash di un chunk (testo + metadati).
+    I metadati sono inclusi perché un chunk identico su un'altra pagina
+    deve riportare la pagina corretta nei risultati.
+    """
+    payload = text + "\0" + json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(db_path: str) -> dict | None:
+    """Carica il manifest del .db, oppure None se non esiste."""
+    path = manifest_path(db_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Versione del manifest non supportata: {path}")
+    return manifest
+
+
+def save_manifest(db_path: str, manifest: dict):
+    """Salva il manifest in modo atomico (file temporaneo + sostituzione)."""
+    path = manifest_path(db_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def rebuild_manifest(db: VectorDB) -> dict:
+    """
+    Ricostruisce il manifest di un .db creato senza ingestione incrementale,
+    usando il metadato `source` dei chunk (impostato da PyPDFLoader).
+
+    Gli hash dei file restano vuoti: al primo aggiornamento ogni file viene
+    riletto, ma i chunk invariati riusano le righe esistenti senza nuovi embedding.
+    """
+    files = {}
+    for row in range(len(db)):
+        if db.deleted is not None and db.deleted[row]:
+            continue
+        doc = db.document(row)
+        source = doc.metadata.get("source")
+        if not source:
+            continue
+        entry = files.setdefault(os.path.basename(source), {"sha256": None, "chunks": []})
+        entry["chunks"].append([chunk_hash(doc.page_content, doc.metadata), row])
+
+    return {"version": MANIFEST_VERSION, "embedding_model": db.embedding_model, "files": files}
+
+
+def _append_chunks(db_path: str, pending: list, files: dict, client: EmbeddingClient,
+                   ckpt: str | None, embedding_model: str):
+    """
+    Calcola gli embedding di un gruppo di chunk nuovi, li scrive in coda al .db
+    (creandolo se non esiste) e registra le righe ottenute nel manifest.
+
+    Parametri:
+        pending (list[tuple[str, str, Document]]): Chunk nuovi come (file, hash, chunk).
+    """
+    vectors = client.embed([chunk.page_content for _, _, chunk in pending], checkpoint_dir=ckpt)
+    records = [(chunk.id or str(uuid.uuid4()), chunk.page_content, chunk.metadata) for _, _, chunk in pending]
+
+    if os.path.exists(db_path):
+        rows = append_vector_db(db_path, vectors, records)
+    else:
+        write_vector_db(db_path, vectors, records, embedding_model)
+        rows = range(len(records))
+
+    for (name, h, _), row in zip(pending, rows):
+        files[name]["chunks"].append([h, row])
+
+
+def update_vectorstore(data_dir: str = "./vs/data", db_path: str = "./vs/data.db",
+                       embedding_model: str = EmbeddingConfig.NAME,
+                       workers: int = IngestionConfig.PDF_WORKERS,
+                       batch_size: int = IngestionConfig.STREAM_BATCH_SIZE) -> dict:
+    """
+    Aggiorna in modo incrementale il database vettoriale con i PDF della cartella.
+
+    Parametri:
+    -----------
+        data_dir (str): Cartella contenente i file PDF.
+        db_path (str): Percorso del file .db da creare o aggiornare.
+        embedding_model (str): Nome del modello Ollama da usare per gli embedding.
+        workers (int): Numero di processi per il parsing dei PDF (0 = numero di core).
+        batch_size (int): Chunk nuovi accumulati prima di calcolarne gli embedding e scriverli su disco.
+
+    Restituisce:
+    -------------
+        dict: Statistiche dell'aggiornamento (file saltati/aggiornati/eliminati,
+              chunk riusati/aggiunti/eliminati, compattazione).
+    """
+    if not os.path.exists(data_dir):
+        raise FileNotFoundError(f"La cartella specificata non esiste: {data_dir}")
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+    stats = {"files_skipped": 0, "files_updated": 0, "files_removed": 0,
+             "chunks_reused": 0, "chunks_added": 0, "chunks_removed": 0, "compacted": False}
+
+    # Stato attuale: database esistente (eventualmente convertito) e relativo manifest
+    db = None
+    if os.path.exists(db_path):
+        if not is_vector_db(db_path):
+            convert_legacy_db(db_path, embedding_model)
+        db = VectorDB(db_path)
+        if db.embedding_model != embedding_model:
+            raise ValueError(
+                f"{db_path} è stato creato con il modello {db.embedding_model}: "
+                f"gli embedding di {embedding_model} non sono compatibili, ricreare il database."
+            )
+
+    manifest = load_manifest(db_path) if db is not None else None
+    if manifest is None:
+        manifest = rebuild_manifest(db) if db is not None else \
+            {"version": MANIFEST_VERSION, "embedding_model": embedding_model, "files": {}}
+    files = manifest["files"]
+
+    pdfs = sorted(f for f in os.listdir(data_dir) if f.endswith(".pdf"))
+
+    to_delete = []      # righe da marcare come eliminate
+    pending = []        # chunk nuovi in attesa di embedding: (file, hash, Document)
+
+    # I checkpoint restano fino al salvataggio del manifest: un'esecuzione
+    # interrotta riparte senza ricalcolare gli embedding già ottenuti
+    client = EmbeddingClient(model=embedding_model)
+    ckpt = checkpoint_dir(db_path) if EmbeddingConfig.CHECKPOINT else None
+
+    # File eliminati dalla cartella: tutte le loro righe diventano tombstone
+    for name in sorted(set(files) - set(pdfs)):
+        removed = files.pop(name)
+        to_delete.extend(row for _, row in removed["chunks"])
+        stats["files_removed"] += 1
+
+    # Solo i file nuovi o modificati vengono riletti
+    changed = {}
+    for name in pdfs:
+        file_path = os.path.join(data_dir, name)
+        digest = file_hash(file_path)
+
+        entry = files.get(name)
+        if entry is not None and entry["sha256"] == digest:
+            stats["files_skipped"] += 1
+            continue
+
+        print(f"[update_vectorstore] File nuovo o modificato: {file_path}")
+        changed[file_path] = digest
+
+    # Parsing in parallelo, risultati nell'ordine dei file
+    parse_stats = ParseStats()
+    for result in iter_parsed_pdfs(list(changed), workers):
+        parse_stats.add(result)
+        name = os.path.basename(result.file_path)
+        entry = files.get(name)
+        if result.error:
+            # Il file resta nello stato precedente e verrà ritentato al prossimo aggiornamento
+            print(f"Errore nel caricamento di {name}: {result.error}")
+            continue
+        chunks = result.chunks
+
+        # Righe già presenti per questo file, raggruppate per hash del chunk
+        previous = {}
+        for h, row in (entry["chunks"] if entry else []):
+            previous.setdefault(h, []).append(row)
+
+        kept = []
+        for chunk in chunks:
+            h = chunk_hash(chunk.page_content, chunk.metadata)
+            if previous.get(h):
+                kept.append([h, previous[h].pop()])
+                stats["chunks_reused"] += 1
+            else:
+                pending.append((name, h, chunk))
+
+        # Chunk non più presenti nel file
+        to_delete.extend(row for rows in previous.values() for row in rows)
+        files[name] = {"sha256": changed[result.file_path], "chunks": kept}
+        stats["files_updated"] += 1
+
+        # Gruppo completo: embedding e scrittura su disco, poi il gruppo viene rilasciato
+        if len(pending) >= batch_size:
+            _append_chunks(db_path, pending, files, client, ckpt, embedding_model)
+            stats["chunks_added"] += len(pending)
+            pending = []
+
+    if pending:
+        _append_chunks(db_path, pending, files, client, ckpt, embedding_model)
+        stats["chunks_added"] += len(pending)
+        pending = []
+
+    if changed:
+        print(f"[update_vectorstore] Parsing: {parse_stats.report()}")
+    if stats["chunks_added"]:
+        print(f"[update_vectorstore] Embedding: {client.stats.report()}")
+
+    # Nessun PDF da indicizzare: database vuoto ma valido
+    if not os.path.exists(db_path):
+        write_vector_db(db_path, [], [], embedding_model)
+
+    # Righe non più referenziate dal manifest (es. aggiornamento interrotto): eliminate
+    db = VectorDB(db_path)
+    remove = np.ones(len(db), dtype=bool)
+    for entry in files.values():
+        remove[[row for _, row in entry["chunks"]]] = False
+    remove[to_delete] = True
+    remove[db.deleted_rows] = False
+    to_delete = np.flatnonzero(remove)
+    delete_vector_rows(db_path, to_delete)
+    stats["chunks_removed"] = len(to_delete)
+
+    # Compattazione quando le righe eliminate superano la quota configurata
+    deleted_count = len(db.deleted_rows) + len(to_delete)
+    if deleted_count and deleted_count >= IngestionConfig.COMPACT_RATIO * len(db):
+        del db
+        mapping = compact_vector_db(db_path)
+        for entry in files.values():
+            entry["chunks"] = [[h, int(mapping[row])] for h, row in entry["chunks"]]
+        if os.path.exists(ann_index_path(db_path)):
+            os.remove(ann_index_path(db_path))
+        stats["compacted"] = True
+        db = VectorDB(db_path)
+
+    manifest["embedding_model"] = embedding_model
+    save_manifest(db_path, manifest)
+
+    # Righe e manifest salvati: i checkpoint degli embedding non servono più
+    if ckpt:
+        EmbeddingClient.clear_checkpoint(ckpt)
+
+    _refresh_ann_index(db_path, db)
+
+    # Indice BM25 ricostruito sulle righe attuali se sono cambiate o se manca (le righe eliminate sono escluse in ricerca)
+    rows_changed = stats["chunks_added"] or stats["chunks_removed"] or stats["compacted"]
+    if rows_changed or load_lexical_index(db_path, db) is None:
+        build_lexical_index(db_path, db)
+
+    print(f"[update_vectorstore] {db_path}: {stats}")
+    return stats
+
+
+def _refresh_ann_index(db_path: str, db: VectorDB):
+    """
+    Ricostruisce l'indice IVF quando manca (su un corpus abbastanza grande) o quando
+    le righe aggiunte dopo l'addestramento, cercate in modo esatto, sono troppe.
+    """
+    if not RetrievalConfig.ANN_ENABLED or db.live_count < RetrievalConfig.ANN_MIN_VECTORS:
+        return
+
+    path = ann_index_path(db_path)
+    if os.path.exists(path):
+        ivf = IVFIndex.load(path)
+        if ivf.count <= len(db) and len(db) - ivf.count <= IngestionConfig.ANN_REBUILD_RATIO * ivf.count:
+            return
+
+    build_ann_index(db_path, db.matrix)
+
+
+def convert_legacy_dbs(data_dir: str = "./vs", embedding_model: str = EmbeddingConfig.NAME) -> list:
+    """
+    Converte nel formato binario i .db della cartella salvati nel vecchio formato
+    JSON (`InMemoryVectorStore.dump`), costruendo anche i relativi indici.
+
+    La conversione avviene solo qui, in fase di ingestione: i server aprono i
+    database in sola lettura e ignorano i .db nel vecchio formato.
+
+    Parametri:
+    -----------
+        data_dir (str): Cartella contenente i file .db.
+        embedding_model (str): Modello di embedding con cui i .db sono stati creati.
+
+    Restituisce:
+    -------------
+        list[str]: Percorsi dei .db convertiti.
+    """
+    converted = []
+    for name in sorted(os.listdir(data_dir)):
+        db_path = os.path.join(data_dir, name)
+        if not name.endswith(".db") or is_vector_db(db_path):
+            continue
+
+        convert_legacy_db(db_path, embedding_model)
+        db = VectorDB(db_path)
+        _refresh_ann_index(db_path, db)
+        build_lexical_index(db_path, db)
+        converted.append(db_path)
+
+    return converted
+
+
+# Test
+if __name__ == "__main__":
+    """
+    Esempio di uso
+    Aggiorna il database di default con i PDF di ./vs/data
+    """
+    update_vectorstore()
@@ -0,0 +1,348 @@
+"""
+lexical_index.py
+----------------
+Indice lessicale BM25 (inverted index) di un database vettoriale.
+
+Viene costruito accanto a ogni .db (`<db>.bm25`) e permette di cercare
+i chunk per parole esatte (nomi propri, titoli di capitolo) senza calcolare
+l'embedding della domanda. Le liste invertite sono salvate in forma
+compatta (CSR): per ogni termine, i chunk che lo contengono e la frequenza.
+
+Il file è una sequenza di array .npy non compressi (allineati a 64 byte),
+aperta con memory-mapping: come per il .db, i dati restano su disco e il
+vocabolario (ordinato) è consultato con una ricerca binaria.
+"""
+
+# Ricerca binaria nel vocabolario ordinato
+import bisect
+
+# Conteggio dei termini di ciascun chunk; statistiche del corpus
+from collections import Counter, namedtuple
+
+# Lettura a blocchi dei testi durante la costruzione
+from itertools import islice
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+# Tokenizzazione
+import re
+
+import numpy as np
+
+from core.config import RetrievalConfig
+
+
+# Parole (lettere e cifre Unicode); gli apostrofi separano ("dell'Alice" → dell, alice)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Parole molto frequenti (italiano e inglese) che non aiutano a distinguere i chunk
+STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai anche che chi ci come con cosa cui da dal dalla dalle dai degli dei del della delle dello
+di dove e è ed era gli ha hai hanno ho i il in io la le lei lo loro lui ma mi ne nel nella nelle negli nei noi non o
+per perché più quale quali quando quanto quella quelle quello questa queste questo se si sia sono su sua sue suo suoi
+sul sulla tra fra tu un una uno vi voi
+an and are as at be by did do does for from had has have he her his how i if is it its me my not of on or she so
+that the their them they this to was we were what when where which who whom why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Converte un testo in termini minuscoli, escluse le stopword."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# Array del file dell'indice, nell'ordine in cui sono scritti
+_ARRAYS = ("terms", "term_starts", "term_offsets", "doc_len", "doc_ids", "tfs")
+
+# Occorrenze di un blocco di righe, scritte nel file temporaneo durante la costruzione
+_POSTING = np.dtype([("term", "<i4"), ("doc", "<i4"), ("tf", "<f4")])
+
+
+def _align(f, alignment: int = 64):
+    """Porta la posizione del file al prossimo multiplo di `alignment` (riempiendo di zeri in scrittura)."""
+    pad = -f.tell() % alignment
+    if pad:
+        f.write(b"\0" * pad)
+
+
+def _write_array(f, array: np.ndarray):
+    """Scrive un array .npy (intestazione e dati) allineato."""
+    _align(f)
+    np.lib.format.write_array(f, np.ascontiguousarray(array), version=(1, 0))
+
+
+def _reserve_array(f, dtype, length: int) -> int:
+    """Scrive l'intestazione .npy di un array da riempire in seguito e ne riserva lo spazio; restituisce l'offset dei dati."""
+    _align(f)
+    dtype = np.dtype(dtype)
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (length,)}
+    np.lib.format.write_array_header_1_0(f, header)
+    offset = f.tell()
+    f.truncate(offset + length * dtype.itemsize)
+    f.seek(offset + length * dtype.itemsize)
+    return offset
+
+
+# Statistiche del corpus usate dal punteggio BM25: righe, lunghezza media e, per termine, righe che lo contengono
+CorpusStats = namedtuple("CorpusStats", ("count", "avgdl", "df"))
+
+
+def _idf(count: int, df: float) -> float:
+    """IDF BM25 (variante sempre positiva) di un termine presente in `df` righe su `count`."""
+    return float(np.log1p((count - df + 0.5) / (df + 0.5)))
+
+
+def corpus_stats(indexes: list, query: str) -> CorpusStats:
+    """
+    Statistiche BM25 dell'unione di più indici (un database suddiviso in più .db),
+    limitate ai termini della domanda.
+
+    Con queste statistiche i punteggi di indici diversi sono calcolati sulla stessa
+    scala, come se i chunk fossero in un unico indice, e possono essere ordinati insieme.
+    """
+    count = sum(index.count for index in indexes)
+    total_len = sum(index.avgdl * index.count for index in indexes)
+    df = {term: sum(index.doc_freq(term) for index in indexes) for term in set(tokenize(query))}
+    return CorpusStats(count, total_len / count if count else 0.0, df)
+
+
+class Vocabulary:
+    """
+    Vocabolario ordinato dell'indice: termini UTF-8 concatenati e relativi offset.
+
+    Si comporta come una sequenza ordinata di stringhe: la ricerca di un termine
+    è una ricerca binaria sui dati mappati, senza dizionario in memoria.
+    """
+
+    def __init__(self, data: np.ndarray, starts: np.ndarray):
+        self.data = data
+        self.starts = starts
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.starts[i]:self.starts[i + 1]].tobytes().decode("utf-8")
+
+    def index(self, term: str) -> int:
+        """Id del termine, oppure -1 se non è nel vocabolario."""
+        i = bisect.bisect_left(self, term)
+        return i if i < len(self) and self[i] == term else -1
+
+
+class BM25Index:
+    """
+    Indice BM25 sulle righe di un database vettoriale.
+
+    Attributi principali:
+        vocab (Vocabulary): Vocabolario ordinato (un termine per id).
+        term_offsets (np.ndarray): Inizio della lista invertita di ciascun termine (V + 1).
+        doc_ids (np.ndarray): Righe dei chunk, concatenate per termine.
+        tfs (np.ndarray): Frequenza del termine in ciascuna riga, allineata a doc_ids.
+        doc_len (np.ndarray): Numero di termini di ciascuna riga.
+    """
+
+    def __init__(self, terms, term_starts, term_offsets, doc_ids, tfs, doc_len,
+                 k1: float = RetrievalConfig.BM25_K1, b: float = RetrievalConfig.BM25_B):
+        self.vocab = Vocabulary(terms, term_starts)
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+
+    @property
+    def count(self) -> int:
+        """Numero di righe indicizzate."""
+        return len(self.doc_len)
+
+    def idf(self, term_id: int) -> float:
+        """IDF di un termine (variante BM25 sempre positiva)."""
+        return _idf(self.count, float(self.term_offsets[term_id + 1] - self.term_offsets[term_id]))
+
+    def doc_freq(self, term: str) -> int:
+        """Numero di righe che contengono il termine (0 se non è nel vocabolario)."""
+        i = self.vocab.index(term)
+        return int(self.term_offsets[i + 1] - self.term_offsets[i]) if i >= 0 else 0
+
+    @classmethod
+    def build(cls, texts, path: str, batch_size: int = RetrievalConfig.BM25_BUILD_BATCH) -> "BM25Index":
+        """
+        Costruisce l'indice a partire dai testi delle righe, nell'ordine del database,
+        e lo salva in `path`.
+
+        Le occorrenze sono raccolte a blocchi di `batch_size` righe e accodate a un
+        file temporaneo come array numpy; le liste invertite vengono poi composte
+        direttamente nel file dell'indice (memory-mapped). In memoria restano solo
+        il vocabolario, le lunghezze delle righe e un blocco alla volta. Il file è
+        scritto in un file temporaneo e sostituito a costruzione completata.
+
+        Parametri:
+            texts (Iterable[str]): Testo di ciascuna riga.
+            path (str): File dell'indice.
+            batch_size (int): Righe elaborate per blocco.
+
+        Restituisce:
+            BM25Index: L'indice salvato, aperto con memory-mapping.
+        """
+        texts = iter(texts)
+        runs_path = f"{path}.runs.tmp"
+        tmp_path = f"{path}.tmp"
+        vocab = {}
+        doc_len = []
+        total = 0
+
+        try:
+            # 1. Occorrenze (termine, riga, frequenza) di ciascun blocco, accodate su disco
+            with open(runs_path, "wb") as runs:
+                row = 0
+                while batch := list(islice(texts, max(1, batch_size))):
+                    term_ids, rows, tfs = [], [], []
+                    lengths = np.zeros(len(batch), dtype=np.float32)
+                    for i, text in enumerate(batch):
+                        counts = Counter(tokenize(text))
+                        lengths[i] = sum(counts.values())
+                        for term, tf in counts.items():
+                            term_ids.append(vocab.setdefault(term, len(vocab)))
+                            rows.append(row + i)
+                            tfs.append(tf)
+
+                    postings = np.empty(len(term_ids), dtype=_POSTING)
+                    postings["term"], postings["doc"], postings["tf"] = term_ids, rows, tfs
+                    postings.tofile(runs)
+                    doc_len.append(lengths)
+                    total += len(postings)
+                    row += len(batch)
+
+            # 2. Vocabolario ordinato: i termini vengono rinumerati nell'ordine della ricerca binaria
+            terms = sorted(vocab)
+            remap = np.empty(len(terms), dtype=np.int32)
+            remap[[vocab[term] for term in terms]] = np.arange(len(terms), dtype=np.int32)
+            del vocab
+            encoded = [term.encode("utf-8") for term in terms]
+            term_starts = np.concatenate(([0], np.cumsum([len(t) for t in encoded], dtype=np.int64)))
+            terms = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            del encoded
+
+            runs = np.memmap(runs_path, dtype=_POSTING, mode="r") if total else np.zeros(0, dtype=_POSTING)
+            chunk = max(1, batch_size) * 64
+
+            # 3. Lunghezza delle liste invertite
+            df = np.zeros(len(remap), dtype=np.int64)
+            for start in range(0, total, chunk):
+                df += np.bincount(remap[runs["term"][start:start + chunk]], minlength=len(remap))
+            term_offsets = np.concatenate(([0], np.cumsum(df)))
+
+            with open(tmp_path, "w+b") as f:
+                _write_array(f, terms)
+                _write_array(f, term_starts)
+                _write_array(f, term_offsets)
+                _write_array(f, np.concatenate(doc_len) if doc_len else np.zeros(0, dtype=np.float32))
+                doc_offset = _reserve_array(f, np.int32, total)
+                tf_offset = _reserve_array(f, np.float32, total)
+
+            # 4. Occorrenze copiate nella posizione della propria lista (righe crescenti in ogni lista)
+            if total:
+                doc_ids = np.memmap(tmp_path, dtype=np.int32, mode="r+", offset=doc_offset, shape=(total,))
+                out_tfs = np.memmap(tmp_path, dtype=np.float32, mode="r+", offset=tf_offset, shape=(total,))
+                cursor = term_offsets[:-1].copy()
+                for start in range(0, total, chunk):
+                    block = runs[start:start + chunk]
+                    term_ids = remap[block["term"]]
+                    order = np.argsort(term_ids, kind="stable")
+                    sorted_ids = term_ids[order]
+                    # Posizione di ciascuna occorrenza tra quelle dello stesso termine nel blocco
+                    first = np.searchsorted(sorted_ids, sorted_ids, side="left")
+                    positions = cursor[sorted_ids] + np.arange(len(sorted_ids)) - first
+                    doc_ids[positions] = block["doc"][order]
+                    out_tfs[positions] = block["tf"][order]
+                    cursor += np.bincount(term_ids, minlength=len(cursor))
+                doc_ids.flush()
+                out_tfs.flush()
+                del doc_ids, out_tfs
+            del runs
+
+            os.replace(tmp_path, path)
+        finally:
+            for leftover in (runs_path, tmp_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Apre un indice salvato con `build` tramite memory-mapping (nessuna copia in memoria).
+
+        Solleva ValueError se il file non è un indice valido.
+        """
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        with open(path, "rb") as f:
+            for name in _ARRAYS:
+                f.seek(f.tell() + (-f.tell() % 64))
+                if np.lib.format.read_magic(f) != (1, 0):
+                    raise ValueError(f"Indice BM25 non valido: {path}")
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                start = f.tell()
+                end = start + int(np.prod(shape)) * dtype.itemsize
+                if end > len(data):
+                    raise ValueError(f"Indice BM25 incompleto: {path}")
+                arrays[name] = data[start:end].view(dtype).reshape(shape)
+                f.seek(end)
+        return cls(**arrays)
+
+    def search(self, query: str, k: int, deleted: np.ndarray | None = None,
+               corpus: CorpusStats | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ricerca BM25 top-k.
+
+        Parametri:
+        -----------
+            query (str): Testo della domanda.
+            k (int): Numero massimo di risultati.
+            deleted (np.ndarray | None): Maschera delle righe eliminate, escluse dai risultati.
+            corpus (CorpusStats | None): Statistiche di un corpus più ampio (vedi `corpus_stats`)
+                                         al posto di quelle di questo indice.
+
+        Restituisce:
+        -------------
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Righe, punteggi BM25 e, per ciascun
+            risultato, se contiene tutti i termini della domanda.
+        """
+        query_terms = set(tokenize(query))
+        found = [(term, i) for term in query_terms for i in [self.vocab.index(term)] if i >= 0]
+        if not found or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=bool)
+
+        if corpus is None:
+            idfs = [self.idf(i) for _, i in found]
+            avgdl = self.avgdl
+        else:
+            idfs = [_idf(corpus.count, corpus.df[term]) for term, _ in found]
+            avgdl = corpus.avgdl
+
+        # Occorrenze dei termini della domanda e relativo contributo BM25
+        slices = [slice(int(self.term_offsets[i]), int(self.term_offsets[i + 1])) for _, i in found]
+        docs = np.concatenate([self.doc_ids[s] for s in slices]).astype(np.int64)
+        tfs = np.concatenate([self.tfs[s] for s in slices])
+        idf = np.concatenate([np.full(s.stop - s.start, w, dtype=np.float32) for s, w in zip(slices, idfs)])
+
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / max(avgdl, 1e-9))
+        weights = idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        # Somma per riga candidata e numero di termini trovati
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        matched = np.bincount(inverse)
+
+        if deleted is not None:
+            keep = deleted[candidates] == 0
+            candidates, scores, matched = candidates[keep], scores[keep], matched[keep]
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return candidates[top], scores[top], matched[top] == len(query_terms)
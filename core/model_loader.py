@@ -0,0 +1,158 @@
+"""
+model_loader.py
+---------------
+Caricamento dei componenti del server (modelli e database) in background.
+
+Ogni componente (modello di chat, embedding, indice vettoriale, TTS, ASR)
+viene caricato in un thread separato ed eseguito una volta a vuoto
+(warm-up), così il server HTTP accetta connessioni subito e la prima
+richiesta non paga il caricamento a freddo dei modelli. Le richieste che
+arrivano prima attendono solo il componente di cui hanno bisogno.
+
+Lo stato di ciascun componente (attesa, caricamento, pronto, errore) e i
+tempi di caricamento e warm-up sono esposti da `/health` e `/ready`.
+"""
+
+# Caricamento in parallelo
+import threading
+
+# Misura dei tempi di caricamento
+import time
+
+from core.config import WebConfig
+
+
+class Component:
+    """
+    Componente caricato una sola volta: funzione di caricamento, warm-up opzionale e stato.
+    """
+
+    def __init__(self, name: str, loader, warmup=None):
+        """
+        Parametri:
+            name (str): Nome del componente (chiave in `/health`).
+            loader (callable): Funzione senza argomenti che restituisce il componente caricato.
+            warmup (callable | None): Funzione chiamata con il componente per una prima inferenza a vuoto.
+        """
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+
+        self.status = "pending"
+        self.error = None
+        self.load_time = None
+        self.warmup_time = None
+        self.value = None
+        self._done = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Carica il componente ed esegue il warm-up (una sola volta; gli errori vengono registrati)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        try:
+            self.status = "loading"
+            start = time.perf_counter()
+            value = self.loader()
+            self.load_time = time.perf_counter() - start
+
+            # Un warm-up fallito non rende il componente inutilizzabile
+            if self.warmup is not None and WebConfig.WARMUP:
+                self.status = "warming_up"
+                start = time.perf_counter()
+                try:
+                    self.warmup(value)
+                except Exception as e:
+                    print(f"[{self.name}] Warm-up non riuscito: {e}")
+                self.warmup_time = time.perf_counter() - start
+
+            self.value = value
+            self.status = "ready"
+            print(f"[{self.name}] Pronto in {self.load_time + (self.warmup_time or 0):.1f} s")
+
+        except Exception as e:
+            self.error = str(e)
+            self.status = "error"
+            print(f"[{self.name}] Errore nel caricamento: {e}")
+
+        finally:
+            self._done.set()
+
+    def get(self, timeout: float = WebConfig.COMPONENT_WAIT_TIMEOUT):
+        """
+        Restituisce il componente, attendendo al più `timeout` secondi che sia caricato.
+
+        Se il caricamento non è ancora iniziato avviene nel thread chiamante.
+        Solleva RuntimeError se il caricamento è fallito o non termina in tempo.
+        """
+        if not self._started:
+            self.load()
+        if not self._done.wait(timeout):
+            raise RuntimeError(f"Componente '{self.name}' non ancora pronto: riprovare tra poco")
+        if self.status == "error":
+            raise RuntimeError(f"Componente '{self.name}' non disponibile: {self.error}")
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def info(self) -> dict:
+        """Stato del componente e tempi di caricamento e warm-up (secondi)."""
+        info = {"status": self.status, "load_time": self.load_time, "warmup_time": self.warmup_time}
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+class ComponentRegistry:
+    """
+    Insieme dei componenti del server, caricati in background o all'avvio.
+    """
+
+    def __init__(self):
+        self.components = {}
+
+    def add(self, name: str, loader, warmup=None) -> Component:
+        """Registra un componente (vedi `Component`)."""
+        component = Component(name, loader, warmup)
+        self.components[name] = component
+        return component
+
+    def start(self, background: bool = True):
+        """
+        Avvia il caricamento di tutti i componenti: ciascuno in un thread
+        separato (`background=True`) oppure in sequenza nel thread chiamante.
+        """
+        for component in self.components.values():
+            if background:
+                threading.Thread(target=component.load, name=f"load-{component.name}", daemon=True).start()
+            else:
+                component.load()
+
+    def get(self, name: str):
+        """Restituisce il componente indicato, attendendo che sia caricato."""
+        return self.components[name].get()
+
+    @property
+    def ready(self) -> bool:
+        """True se tutti i componenti sono pronti."""
+        return all(component.ready for component in self.components.values())
+
+    def health(self) -> dict:
+        """Stato complessivo ("ready", "loading" o "error") e stato di ciascun componente."""
+        statuses = [component.status for component in self.components.values()]
+        if "error" in statuses:
+            status = "error"
+        elif all(s == "ready" for s in statuses):
+            status = "ready"
+        else:
+            status = "loading"
+        return {
+            "status": status,
+            "components": {name: component.info() for name, component in self.components.items()},
+        }
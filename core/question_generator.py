@@ -2,15 +2,15 @@ import json
 import os
 import re
 from langchain_ollama.llms import OllamaLLM
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import InMemoryVectorStore
 
 # Import delle configurazioni globali
 from core.config import (
     TestChatConfig,
-    EmbeddingConfig,
 )
 
+# Apertura dei database vettoriali (memory-mapping condiviso con la chat)
+from core.vector_utils import load_vector_index
+
 
 def create_interrogation(db_paths: list, n_questions: int = TestChatConfig.N_QUESTIONS):
     """
@@ -39,29 +39,20 @@ def create_interrogation(db_paths: list, n_questions: int = TestChatConfig.N_QUE
 
     # print(f"Avvio generazione interrogazione usando {len(db_paths)} DB...")
 
-    # Inizializza embeddings
-    embeddings = OllamaEmbeddings(model=EmbeddingConfig.NAME)
-
-    vectorstores = []
-    # Caricamento dei DB e unione
+    valid_paths = []
+    # Verifica dei DB da caricare
     for path in db_paths:
         if not os.path.exists(path):
             print(f"DB non trovato e ignorato: {path}")
             continue
-
-        # print(f"Caricamento DB: {path}")
-        vs = InMemoryVectorStore.load(path=path, embedding=embeddings)
-        vectorstores.append(vs)
+        valid_paths.append(path)
 
     # Nessun db é stato letto correttamente
-    if not vectorstores:
+    if not valid_paths:
         raise RuntimeError("Nessun DB valido è stato caricato.")
 
-    # Merge dei VectorStore (se > 1 altrimenti main_vs = vectorstores[0] = vs)
-    main_vs = vectorstores[0]
-    for vs in vectorstores[1:]:
-        main_vs.merge_from(vs)
-    # print("Unione dei .db avvenuti con successo.")
+    # Apertura e unione dei DB in un unico indice (memory-mapped, nessuna copia dei dati)
+    main_vs = load_vector_index(valid_paths)
 
     if not os.path.exists(TestChatConfig.CONTEXT_PATH):
         raise FileNotFoundError(f"File contesto non trovato: {TestChatConfig.CONTEXT_PATH}")
@@ -0,0 +1,248 @@
+"""
+session_store.py
+----------------
+Gestione della cronologia conversazionale per sessione.
+Ogni client ha la propria cronologia, limitata a un numero fisso di messaggi
+(buffer circolare); le sessioni inattive o meno usate vengono eliminate.
+
+Ogni sessione può inoltre avere un riassunto dei messaggi più vecchi: i
+messaggi riassunti vengono rimossi dalla cronologia (vedi `pending_summary`
+e `fold`), così al modello basta il riassunto più una coda recente limitata.
+"""
+
+# Buffer circolare e dizionario ordinato per l'ordine LRU
+from collections import OrderedDict, deque
+
+# Identificativo progressivo di ciascuna sessione creata
+from itertools import count
+
+# Stima dell'occupazione in memoria dei messaggi
+import sys
+
+# Accesso concorrente dai thread del server Flask
+import threading
+
+# Orologio monotono per il timeout di inattività
+import time
+
+# Stima dei token della coda di messaggi recenti
+from core.context_builder import estimate_tokens
+
+
+class ChatSession:
+    """
+    Cronologia di una singola sessione: buffer circolare di coppie (ruolo, messaggio).
+    """
+
+    __slots__ = ("history", "last_access", "size", "summary", "dropped", "epoch")
+
+    _epochs = count()
+
+    def __init__(self, max_messages: int):
+        # Il deque scarta automaticamente i messaggi più vecchi oltre il limite
+        self.history = deque(maxlen=max_messages)
+        # Ultimo accesso (time.monotonic) usato per il timeout di inattività
+        self.last_access = time.monotonic()
+        # Occupazione stimata in byte dei messaggi conservati
+        self.size = 0
+        # Riassunto dei messaggi già rimossi dalla cronologia
+        self.summary = ""
+        # Messaggi rimossi dall'inizio della cronologia (riassunti o scartati dal buffer)
+        self.dropped = 0
+        # Distingue una sessione ricreata con lo stesso id da quella precedente
+        self.epoch = next(ChatSession._epochs)
+
+
+class SessionStore:
+    """
+    Archivio in memoria delle sessioni di chat, indicizzate per session id.
+
+    Politiche di eliminazione:
+    - sessioni inattive da più di `idle_timeout` secondi
+    - sessioni meno usate di recente (LRU) oltre `max_sessions`
+    - sessioni meno usate di recente finché la memoria stimata supera `memory_limit`
+    """
+
+    def __init__(self, max_messages: int, max_sessions: int, idle_timeout: float, memory_limit: int):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit
+
+        # Ordine di inserimento = ordine LRU (la prima è la meno usata di recente)
+        self._sessions = OrderedDict()
+        # Occupazione stimata complessiva in byte
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_history(self, session_id: str) -> list:
+        """
+        Restituisce una copia della cronologia della sessione (vuota se nuova).
+
+        Parametri:
+            session_id (str): Identificativo della sessione.
+
+        Restituisce:
+            list[tuple[str, str]]: Messaggi (ruolo, testo) dal più vecchio al più recente.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            self._touch(session_id, session)
+            return list(session.history)
+
+    def append(self, session_id: str, role: str, message: str):
+        """
+        Aggiunge un messaggio alla cronologia della sessione, creandola se necessario.
+
+        Parametri:
+            session_id (str): Identificativo della sessione.
+            role (str): Ruolo del messaggio ('human' o 'assistant').
+            message (str): Testo del messaggio.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ChatSession(self.max_messages)
+                self._sessions[session_id] = session
+            self._touch(session_id, session)
+
+            # Buffer pieno: il messaggio più vecchio verrà scartato dal deque
+            if len(session.history) == session.history.maxlen:
+                _, oldest = session.history[0]
+                self._account(session, -sys.getsizeof(oldest))
+                session.dropped += 1
+
+            session.history.append((role, message))
+            self._account(session, sys.getsizeof(message))
+
+            self._evict(keep=session_id)
+
+    def get_context(self, session_id: str, token_budget: int | None = None) -> tuple[str, list]:
+        """
+        Restituisce il riassunto della sessione e i messaggi recenti da inviare al modello.
+
+        Parametri:
+            session_id (str): Identificativo della sessione.
+            token_budget (int | None): Token massimi (stimati) dei messaggi recenti;
+                                       None = tutta la cronologia.
+
+        Restituisce:
+            tuple[str, list[tuple[str, str]]]: Riassunto (vuoto se assente) e messaggi recenti.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return "", []
+            self._touch(session_id, session)
+            history = list(session.history)
+            return session.summary, history[self._tail_start(history, token_budget):]
+
+    def pending_summary(self, session_id: str, token_budget: int) -> tuple[str, tuple[int, int], list] | None:
+        """
+        Restituisce i messaggi fuori dalla coda recente, da riassumere.
+
+        Restituisce:
+            tuple[str, tuple[int, int], list] | None: Riassunto attuale, riferimento da
+            passare a `fold` (sessione, posizione progressiva del primo messaggio non
+            incluso), messaggi da riassumere; None se non c'è nulla da riassumere.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            history = list(session.history)
+            start = self._tail_start(history, token_budget)
+            if start == 0:
+                return None
+            return session.summary, (session.epoch, session.dropped + start), history[:start]
+
+    def fold(self, session_id: str, summary: str, ref: tuple[int, int]):
+        """
+        Sostituisce il riassunto della sessione e rimuove i messaggi riassunti.
+
+        Parametri:
+            session_id (str): Identificativo della sessione.
+            summary (str): Nuovo riassunto.
+            ref (tuple[int, int]): Riferimento restituito da `pending_summary`.
+        """
+        epoch, upto = ref
+        with self._lock:
+            session = self._sessions.get(session_id)
+            # Sessione eliminata (o ricreata) nel frattempo: il riassunto non è più valido
+            if session is None or session.epoch != epoch:
+                return
+            while session.dropped < upto and session.history:
+                _, message = session.history.popleft()
+                self._account(session, -sys.getsizeof(message))
+                session.dropped += 1
+            self._account(session, sys.getsizeof(summary) - sys.getsizeof(session.summary))
+            session.summary = summary
+
+    @staticmethod
+    def _tail_start(history: list, token_budget: int | None) -> int:
+        """
+        Indice del primo messaggio della coda recente che rientra nel budget di token.
+        L'ultimo scambio (domanda + risposta) è sempre incluso.
+        """
+        if token_budget is None:
+            return 0
+        start, used = len(history), 0
+        while start > 0:
+            tokens = estimate_tokens(history[start - 1][1])
+            if used + tokens > token_budget and len(history) - start >= 2:
+                break
+            used += tokens
+            start -= 1
+
+        # La coda inizia con una domanda dell'utente, non con una risposta isolata
+        if start < len(history) - 2 and history[start][0] == 'assistant':
+            start += 1
+        return start
+
+    def clear(self, session_id: str):
+        """Elimina la sessione indicata, se presente."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._size -= session.size
+
+    def stats(self) -> dict:
+        """Restituisce numero di sessioni attive e memoria stimata occupata (byte)."""
+        with self._lock:
+            return {"sessions": len(self._sessions), "memory": self._size}
+
+    def _touch(self, session_id: str, session: ChatSession):
+        """Aggiorna l'ultimo accesso e sposta la sessione in coda all'ordine LRU."""
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(session_id)
+
+    def _account(self, session: ChatSession, delta: int):
+        """Aggiorna l'occupazione stimata della sessione e del totale."""
+        session.size += delta
+        self._size += delta
+
+    def _evict(self, keep: str):
+        """
+        Applica le politiche di eliminazione partendo dalle sessioni meno usate.
+        La sessione `keep` (appena usata) non viene mai eliminata.
+        """
+        # Sessioni inattive: in ordine LRU, la prima non scaduta interrompe la scansione
+        deadline = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep or session.last_access >= deadline:
+                break
+            self._drop_oldest()
+
+        # Limite sul numero di sessioni e sulla memoria complessiva
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._size > self.memory_limit
+        ):
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        """Elimina la sessione meno usata di recente."""
+        _, session = self._sessions.popitem(last=False)
+        self._size -= session.size
@@ -0,0 +1,107 @@
+"""
+streaming_asr.py
+----------------
+Trascrizione incrementale di un flusso audio (domanda vocale in streaming).
+
+I blocchi PCM ricevuti mentre l'utente parla vengono segmentati dal VAD
+(`core/vad.py`); ogni segmento completato viene trascritto subito da un
+worker dedicato, con il testo già trascritto come contesto. Quando l'utente
+smette di parlare resta da trascrivere solo l'ultimo segmento.
+"""
+
+# Worker di trascrizione (uno per flusso, segmenti in ordine)
+from concurrent.futures import ThreadPoolExecutor
+
+import threading
+
+import numpy as np
+
+from core.config import WhisperConfig
+from core.vad import VoiceActivitySegmenter
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    """Converte PCM 16-bit little-endian in campioni float32 in [-1, 1]."""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class StreamingTranscriber:
+    """
+    Trascrizione di un singolo flusso audio, segmento per segmento.
+    """
+
+    def __init__(self, transcribe, sample_rate: int = WhisperConfig.SAMPLE_RATE, keep_audio: bool = False):
+        """
+        Parametri:
+            transcribe (callable): Funzione (campioni, prompt) → testo (es. `AICompanion.transcribe`).
+            sample_rate (int): Frequenza di campionamento del flusso.
+            keep_audio (bool): Se True conserva l'audio ricevuto (per l'archiviazione).
+        """
+        self.transcribe = transcribe
+        self.segmenter = VoiceActivitySegmenter(sample_rate=sample_rate)
+        self.keep_audio = keep_audio
+        self.chunks = []
+        self.texts = []
+        self.segments = 0
+
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="streaming-asr")
+
+    def _transcribe_segment(self, segment: np.ndarray):
+        """Trascrive un segmento usando il testo precedente come contesto (eseguita dal worker)."""
+        with self._lock:
+            prompt = " ".join(self.texts)
+        text = self.transcribe(segment, prompt or None).strip()
+        if text:
+            with self._lock:
+                self.texts.append(text)
+
+    def _submit(self, segment: np.ndarray):
+        self.segments += 1
+        self._futures.append(self._executor.submit(self._transcribe_segment, segment))
+
+    def feed(self, data: bytes) -> int:
+        """
+        Aggiunge un blocco PCM 16-bit mono e avvia la trascrizione dei segmenti completati.
+
+        Restituisce:
+            int: Numero di segmenti avviati con questo blocco.
+        """
+        samples = pcm16_to_float32(data)
+        if self.keep_audio:
+            self.chunks.append(samples)
+        segments = self.segmenter.feed(samples)
+        for segment in segments:
+            self._submit(segment)
+        return len(segments)
+
+    @property
+    def text(self) -> str:
+        """Testo trascritto finora (segmenti completati, in ordine)."""
+        with self._lock:
+            return " ".join(self.texts)
+
+    def finish(self) -> str:
+        """
+        Chiude il flusso: trascrive l'ultimo segmento e attende i segmenti in corso.
+
+        Restituisce:
+            str: Trascrizione completa.
+        """
+        segment = self.segmenter.flush()
+        if segment is not None:
+            self._submit(segment)
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown()
+        return self.text
+
+    def close(self):
+        """Interrompe il flusso scartando i segmenti non ancora trascritti."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def audio(self) -> np.ndarray:
+        """Audio ricevuto (solo con keep_audio)."""
+        return np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.float32)
@@ -0,0 +1,187 @@
+"""
+tts_cache.py
+------------
+Cache dell'audio sintetizzato da Kokoro.
+
+Il personaggio ripete spesso le stesse frasi ("Non trovo questa informazione
+nei miei scritti") e le risposte in cache vengono risintetizzate identiche:
+l'audio viene quindi conservato per chiave di contenuto, sia per singola
+frase (streaming) sia per risposta intera:
+- in memoria, con eliminazione LRU oltre un limite di memoria
+- opzionalmente su disco (un file .npz per voce), con un limite di spazio
+
+La chiave è l'hash del testo normalizzato (forma Unicode, spazi) più voce,
+velocità e modello: cambiando uno dei parametri l'audio viene risintetizzato.
+"""
+
+# Chiave di contenuto
+import hashlib
+
+# Accesso concorrente dai thread del server Flask
+import threading
+
+# Normalizzazione del testo
+import unicodedata
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+# Dizionario ordinato per l'ordine LRU
+from collections import OrderedDict
+
+import numpy as np
+
+from core.config import KokoroConfig
+
+
+def normalize_tts_text(text: str) -> str:
+    """Normalizza il testo da sintetizzare: forma Unicode NFKC e spazi compattati (maiuscole e punteggiatura restano)."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def tts_key(text: str, voice: str = KokoroConfig.VOICE_PATH, speed: float = KokoroConfig.AUDIO_SPEED) -> str:
+    """Chiave di contenuto dell'audio di un testo per voce, velocità e modello configurati."""
+    parts = (normalize_tts_text(text), voice, repr(float(speed)), KokoroConfig.MODEL_PATH)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Cache LRU in memoria (limitata in byte) con tier opzionale su disco (limitato in byte).
+
+    Ogni voce è la lista dei segmenti audio (float32, `KokoroConfig.AUDIO_FREQ` Hz)
+    prodotti dalla pipeline per quel testo.
+    """
+
+    def __init__(self, max_memory: int = KokoroConfig.CACHE_MAX_MEMORY,
+                 disk_path: str | None = KokoroConfig.CACHE_DISK_PATH,
+                 disk_max_bytes: int = KokoroConfig.CACHE_DISK_MAX_BYTES):
+        self.max_memory = max_memory
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Tier su disco: file <chiave>.npz, dal meno al più recente (data di modifica)
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self._files = OrderedDict()
+        self._disk_bytes = 0
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            entries = []
+            for name in os.listdir(disk_path):
+                if name.endswith(".npz"):
+                    stat = os.stat(os.path.join(disk_path, name))
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._files[key] = size
+                self._disk_bytes += size
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.disk_path, f"{key}.npz")
+
+    def get(self, text: str, voice: str = KokoroConfig.VOICE_PATH, speed: float = KokoroConfig.AUDIO_SPEED):
+        """
+        Restituisce i segmenti audio già sintetizzati per il testo, se presenti.
+
+        Restituisce:
+            list[np.ndarray] | None: Segmenti audio (sola lettura) oppure None.
+        """
+        key = tts_key(text, voice, speed)
+        with self._lock:
+            segments = self._entries.get(key)
+            if segments is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return segments
+
+            if key in self._files:
+                try:
+                    with np.load(self._file(key)) as data:
+                        segments = [data[f"arr_{i}"] for i in range(len(data.files))]
+                    os.utime(self._file(key))
+                    self._files.move_to_end(key)
+                except (OSError, ValueError):
+                    # File rimosso o danneggiato: viene risintetizzato
+                    self._disk_bytes -= self._files.pop(key)
+                    segments = None
+
+                if segments is not None:
+                    self._store(key, self._freeze(segments))
+                    self.disk_hits += 1
+                    return self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, segments, voice: str = KokoroConfig.VOICE_PATH,
+            speed: float = KokoroConfig.AUDIO_SPEED) -> list:
+        """Inserisce i segmenti audio di un testo in memoria (e su disco, se attivo)."""
+        key = tts_key(text, voice, speed)
+        segments = self._freeze(segments)
+        with self._lock:
+            self._store(key, segments)
+            if self.disk_path:
+                self._write(key, segments)
+        return segments
+
+    @staticmethod
+    def _freeze(segments) -> list:
+        frozen = []
+        for segment in segments:
+            segment = np.asarray(segment, dtype=np.float32)
+            segment.setflags(write=False)
+            frozen.append(segment)
+        return frozen
+
+    def _store(self, key: str, segments: list):
+        """Inserimento in memoria con eliminazione LRU oltre il limite."""
+        if key in self._entries:
+            self._memory -= sum(s.nbytes for s in self._entries.pop(key))
+        self._entries[key] = segments
+        self._memory += sum(s.nbytes for s in segments)
+        while self._memory > self.max_memory and len(self._entries) > 1:
+            _, old_segments = self._entries.popitem(last=False)
+            self._memory -= sum(s.nbytes for s in old_segments)
+
+    def _write(self, key: str, segments: list):
+        """Scrittura su disco (atomica) con eliminazione dei file meno recenti oltre il limite."""
+        path = self._file(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, *segments)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[tts-cache] Impossibile salvare {path}: {e}")
+            return
+
+        self._disk_bytes -= self._files.pop(key, 0)
+        self._files[key] = os.path.getsize(path)
+        self._disk_bytes += self._files[key]
+
+        while self._disk_bytes > self.disk_max_bytes and len(self._files) > 1:
+            old_key, size = self._files.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._file(old_key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Statistiche della cache: voci, memoria, disco, hit/miss e hit rate."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory": self._memory,
+                "disk_entries": len(self._files),
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,116 @@
+"""
+tts_engine.py
+-------------
+Sintesi vocale Kokoro parallela su più processi.
+
+Il `KPipeline` di Kokoro genera i segmenti di un testo uno dopo l'altro con
+un solo modello: il tempo di sintesi cresce con la lunghezza della risposta
+anche su macchine con molti core. Qui il testo viene diviso in segmenti e
+convertito in fonemi nel processo principale, con la stessa G2P del
+`KPipeline` (senza modello); i segmenti vengono poi sintetizzati in
+parallelo da un pool di processi, ognuno con il proprio `KModel` e un numero
+fisso di thread torch. L'audio viene restituito nell'ordine del testo.
+"""
+
+# Pool di processi (spawn: torch non è sicuro dopo fork)
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from core.config import KokoroConfig
+
+
+# Stato di ciascun processo worker: modello e voci caricate
+_worker = {}
+
+
+def _init_worker(model_path: str, config_path: str, lang_code: str, threads: int):
+    """Inizializza un processo worker: thread torch fissati e `KModel` dedicato (su CPU)."""
+    import torch
+
+    # Ogni worker usa pochi thread: il parallelismo viene dai processi
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    from kokoro import KModel, KPipeline
+
+    _worker["model"] = KModel(model=model_path, config=config_path).to("cpu").eval()
+    # Pipeline senza modello, usata solo per caricare le voci
+    _worker["voices"] = KPipeline(lang_code=lang_code, model=False)
+
+
+def _synthesize(phonemes: str, voice: str, speed: float) -> np.ndarray:
+    """Sintetizza un segmento già convertito in fonemi (eseguita nei worker)."""
+    pack = _worker["voices"].load_voice(voice)
+    audio = _worker["model"](phonemes, pack[len(phonemes) - 1], speed)
+    return np.asarray(audio, dtype=np.float32)
+
+
+class ParallelSynthesizer:
+    """
+    Motore di sintesi Kokoro con un pool di processi worker.
+    """
+
+    # Nessun KModel nel processo principale (vedi `AICompanion.kmodel`)
+    model = None
+
+    def __init__(self, workers: int = KokoroConfig.WORKERS, threads: int = KokoroConfig.WORKER_THREADS,
+                 lang_code: str = KokoroConfig.LANG_CODE):
+        """
+        Parametri:
+            workers (int): Processi di sintesi, ognuno con il proprio modello.
+            threads (int): Thread torch di ciascun processo.
+            lang_code (str): Codice lingua di Kokoro ("i" per italiano).
+        """
+        # G2P di Kokoro (import pesante, solo quando serve): pipeline senza modello
+        from kokoro import KPipeline
+
+        self.workers = workers
+        self.g2p = KPipeline(lang_code=lang_code, model=False)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(KokoroConfig.MODEL_PATH, KokoroConfig.CONFIG_PATH, lang_code, threads),
+        )
+
+    def phonemize(self, text: str, voice: str = KokoroConfig.VOICE_PATH,
+                  speed: float = KokoroConfig.AUDIO_SPEED) -> list:
+        """Divide il testo in segmenti e li converte in fonemi (come il `KPipeline`)."""
+        return [phonemes for _, phonemes, _ in self.g2p(text, voice=voice, speed=speed) if phonemes]
+
+    def synthesize(self, text: str, voice: str = KokoroConfig.VOICE_PATH, speed: float = KokoroConfig.AUDIO_SPEED):
+        """
+        Sintetizza un testo distribuendo i segmenti sui worker.
+
+        Parametri:
+            text (str): Testo da convertire in parlato.
+            voice (str): Voce (percorso o nome).
+            speed (float): Velocità della voce.
+
+        Restituisce (generatore):
+            np.ndarray: Campioni float32 di ciascun segmento, nell'ordine del testo
+                        (il primo arriva appena pronto, mentre gli altri sono in corso).
+        """
+        futures = [self.executor.submit(_synthesize, phonemes, voice, speed)
+                   for phonemes in self.phonemize(text, voice, speed)]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # Client disconnesso: i segmenti non ancora iniziati vengono scartati
+            for future in futures:
+                future.cancel()
+
+    def warmup(self):
+        """Avvia tutti i worker (caricamento dei modelli) con una sintesi a vuoto ciascuno."""
+        phonemes = self.phonemize("Ciao.")
+        futures = [self.executor.submit(_synthesize, phonemes[0], KokoroConfig.VOICE_PATH, KokoroConfig.AUDIO_SPEED)
+                   for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        """Termina i processi worker."""
+        self.executor.shutdown(cancel_futures=True)
@@ -1,4 +1,6 @@
+import json
 import re
+import uuid
 
 def format_for_html(text: str) -> str:
     """Formatta il testo in HTML."""
@@ -52,3 +54,71 @@ def format_for_tts(text: str) -> str:
     text = re.sub(r'\s{2,}', ' ', text)
     text = re.sub(r'\n{2,}', '\n', text)
     return text.strip()
+
+
+def format_sse(event: str, payload: dict) -> str:
+    """
+    Serializza un evento nel formato Server-Sent Events (SSE).
+
+    Il payload viene codificato in JSON su una sola riga, così eventuali
+    ritorni a capo nel testo del modello non spezzano il frame SSE.
+    """
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+# Fine frase: punteggiatura forte seguita da spazio, oppure un ritorno a capo
+_SENTENCE_END = re.compile(r'(?<=[.!?…:;])["»”)\]]*\s+|\n+')
+
+
+def split_sentences(buffer: str) -> tuple[list[str], str]:
+    """
+    Separa da un buffer di testo in crescita le frasi già concluse.
+
+    Usata per la sintesi vocale in pipeline: ogni frase completa può essere
+    passata al TTS mentre il modello sta ancora generando il resto.
+
+    Parametri:
+        buffer (str): Testo accumulato finora dallo stream del modello.
+
+    Restituisce:
+        tuple[list[str], str]:
+            - frasi complete (non vuote)
+            - testo residuo ancora incompleto
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        sentence = buffer[start:match.start()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+def encode_multipart(parts: list[tuple[str, str | None, str, bytes]]) -> tuple[bytes, str]:
+    """
+    Costruisce un corpo `multipart/form-data` a partire da parti binarie.
+
+    Lato browser il risultato è leggibile direttamente con `Response.formData()`.
+
+    Parametri:
+        parts (list): Tuple (nome, nome_file | None, content_type, dati).
+
+    Restituisce:
+        tuple[bytes, str]: Corpo della risposta e relativo header Content-Type.
+    """
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, filename, content_type, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        chunks.append(
+            f"--{boundary}\r\n"
+            f"Content-Disposition: {disposition}\r\n"
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+        )
+        chunks.append(data)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(chunks), f"multipart/form-data; boundary={boundary}"
@@ -0,0 +1,137 @@
+"""
+vad.py
+------
+Rilevamento dell'attività vocale (VAD) per la trascrizione in streaming.
+
+L'audio arriva a blocchi mentre l'utente parla; viene diviso in frame di
+pochi millisecondi e ogni frame è classificato come parlato o silenzio in
+base all'energia, rispetto a una stima adattiva del rumore di fondo. Un
+segmento si chiude dopo una pausa sufficientemente lunga (o oltre una
+durata massima) e può essere trascritto subito, mentre l'utente continua
+a parlare.
+"""
+
+# Frame precedenti l'inizio del parlato (pre-roll)
+from collections import deque
+
+import numpy as np
+
+from core.config import WhisperConfig
+
+
+def frame_energies(frames: np.ndarray) -> np.ndarray:
+    """Energia (dBFS) di ciascun frame (righe della matrice)."""
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+class VoiceActivitySegmenter:
+    """
+    Segmentazione a energia di un flusso audio mono float32 in segmenti di parlato.
+    """
+
+    def __init__(self, sample_rate: int = WhisperConfig.SAMPLE_RATE,
+                 frame_ms: int = WhisperConfig.VAD_FRAME_MS,
+                 threshold_db: float = WhisperConfig.VAD_THRESHOLD_DB,
+                 margin_db: float = WhisperConfig.VAD_MARGIN_DB,
+                 silence_ms: int = WhisperConfig.VAD_SILENCE_MS,
+                 min_speech_ms: int = WhisperConfig.VAD_MIN_SPEECH_MS,
+                 max_segment_s: float = WhisperConfig.VAD_MAX_SEGMENT_S,
+                 padding_ms: int = WhisperConfig.VAD_PADDING_MS):
+        """
+        Parametri:
+            sample_rate (int): Frequenza di campionamento dell'audio in ingresso.
+            frame_ms (int): Durata di ciascun frame analizzato.
+            threshold_db (float): Energia minima (dBFS) di un frame di parlato.
+            margin_db (float): Margine sopra il rumore di fondo stimato per considerare un frame parlato.
+            silence_ms (int): Pausa che chiude un segmento.
+            min_speech_ms (int): Parlato minimo di un segmento (più brevi: scartati come rumore).
+            max_segment_s (float): Durata oltre la quale un segmento viene chiuso comunque.
+            padding_ms (int): Audio mantenuto prima e dopo il parlato.
+        """
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max(1, int(max_segment_s * 1000) // frame_ms)
+        self.padding_frames = padding_ms // frame_ms
+
+        self.noise_db = threshold_db - margin_db
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._preroll = deque(maxlen=max(1, self.padding_frames))
+        self._reset_segment()
+
+    def _reset_segment(self):
+        self._segment = []
+        self._in_speech = False
+        self._speech = 0
+        self._silence = 0
+
+    def _close(self, trailing: int) -> np.ndarray | None:
+        """Chiude il segmento corrente (mantenendo `padding` frame di silenzio finale)."""
+        frames = self._segment[:len(self._segment) - max(0, trailing - self.padding_frames)]
+        speech = self._speech
+        self._reset_segment()
+        if speech < self.min_speech_frames:
+            return None
+        return np.concatenate(frames)
+
+    def feed(self, samples: np.ndarray) -> list:
+        """
+        Aggiunge campioni al flusso.
+
+        Parametri:
+            samples (np.ndarray): Campioni float32 mono.
+
+        Restituisce:
+            list[np.ndarray]: Segmenti di parlato completati con questi campioni.
+        """
+        samples = np.concatenate((self._rest, np.asarray(samples, dtype=np.float32)))
+        n = len(samples) // self.frame_size
+        self._rest = samples[n * self.frame_size:]
+        if n == 0:
+            return []
+
+        frames = samples[:n * self.frame_size].reshape(n, self.frame_size)
+        energies = frame_energies(frames)
+
+        segments = []
+        for frame, energy in zip(frames, energies):
+            speech = energy >= max(self.threshold_db, self.noise_db + self.margin_db)
+
+            if not self._in_speech:
+                if speech:
+                    # Inizio del parlato: il segmento parte con il pre-roll
+                    self._in_speech = True
+                    self._segment = list(self._preroll)
+                    self._preroll.clear()
+                else:
+                    # Stima del rumore di fondo sui frame di silenzio
+                    self.noise_db = 0.95 * self.noise_db + 0.05 * energy
+                    if self.padding_frames:
+                        self._preroll.append(frame)
+                    continue
+
+            self._segment.append(frame)
+            if speech:
+                self._speech += 1
+                self._silence = 0
+            else:
+                self._silence += 1
+
+            if self._silence >= self.silence_frames or len(self._segment) >= self.max_frames:
+                segment = self._close(self._silence)
+                if segment is not None:
+                    segments.append(segment)
+
+        return segments
+
+    def flush(self) -> np.ndarray | None:
+        """Chiude il flusso e restituisce l'ultimo segmento di parlato (se presente)."""
+        if self._in_speech and len(self._rest):
+            self._segment.append(self._rest)
+        self._rest = np.zeros(0, dtype=np.float32)
+        if not self._in_speech:
+            return None
+        return self._close(self._silence)
@@ -0,0 +1,301 @@
+"""
+vector_db.py
+------------
+Formato binario su disco dei database vettoriali (.db).
+
+Un database è composto da:
+- `<nome>.db`     → intestazione JSON (formato, versione, numero di righe, dimensione, modello)
+- `<nome>.db.vec` → matrice float32 (n x d) degli embedding normalizzati, aperta con np.memmap
+- `<nome>.db.off` → tabella degli offset int64 (n + 1) dei record testuali
+- `<nome>.db.txt` → record JSON concatenati {"id", "text", "metadata"} in UTF-8
+- `<nome>.db.del` → (opzionale) un byte per riga, 1 = riga eliminata (tombstone)
+
+Le righe possono essere aggiunte in coda (`append_vector_db`) o marcate come
+eliminate (`delete_vector_rows`) senza riscrivere il database;
+`compact_vector_db` rimuove fisicamente le righe eliminate.
+
+L'apertura non legge i dati: matrice e testi vengono mappati in memoria e
+caricati dal sistema operativo solo quando servono. Processi diversi che
+aprono lo stesso database (chat e interrogazione) condividono la page cache.
+"""
+
+# Lettura/scrittura dell'intestazione e dei record testuali
+import json
+
+# Mappatura in memoria del file dei testi
+import mmap
+
+# Libreria standard per gestire percorsi e file system
+import os
+
+import numpy as np
+
+from langchain_core.documents import Document
+
+
+# Identificativo del formato nell'intestazione
+FORMAT_NAME = "aicompanion-vdb"
+FORMAT_VERSION = 1
+
+
+def _sidecar(db_path: str, ext: str) -> str:
+    """Percorso di un file accessorio del database (es. `<db>.vec`)."""
+    return f"{db_path}.{ext}"
+
+
+def is_vector_db(db_path: str) -> bool:
+    """
+    Verifica se il file .db è un'intestazione del formato binario
+    (e non un dump JSON di InMemoryVectorStore).
+    """
+    # L'intestazione è di pochi byte: un file grande è sicuramente un dump legacy
+    if os.path.getsize(db_path) > 65536:
+        return False
+    try:
+        with open(db_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+    except (ValueError, UnicodeDecodeError):
+        return False
+    return isinstance(header, dict) and header.get("format") == FORMAT_NAME
+
+
+def _prepare(vectors, documents: list) -> tuple[np.ndarray, list]:
+    """Normalizza gli embedding e serializza i record testuali."""
+    matrix = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    if not documents:
+        matrix = matrix.reshape(0, 0)
+    if len(matrix) != len(documents):
+        raise ValueError("Il numero di embedding non corrisponde al numero di documenti.")
+
+    # Normalizzazione L2: la similarità coseno diventa un prodotto scalare
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    records = [
+        json.dumps({"id": doc_id, "text": text, "metadata": metadata}, ensure_ascii=False).encode("utf-8")
+        for doc_id, text, metadata in documents
+    ]
+    return matrix, records
+
+
+def _read_header(db_path: str) -> dict:
+    """Legge e valida l'intestazione di un database."""
+    with open(db_path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME or header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Formato del database non supportato: {db_path}")
+    return header
+
+
+def _write_header(db_path: str, count: int, dim: int, embedding_model: str):
+    """Scrive l'intestazione in modo atomico (file temporaneo + sostituzione)."""
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "count": count,
+        "dim": dim,
+        "embedding_model": embedding_model,
+    }
+    tmp_path = db_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(tmp_path, db_path)
+
+
+def write_vector_db(db_path: str, vectors, documents: list, embedding_model: str):
+    """
+    Scrive un database vettoriale nel formato binario.
+
+    I file accessori vengono scritti in file temporanei e sostituiti solo a
+    scrittura completata; l'intestazione è scritta per ultima.
+
+    Parametri:
+    -----------
+        db_path (str): Percorso del file .db (intestazione).
+        vectors: Embedding dei documenti (n x d), normalizzati prima della scrittura.
+        documents (list[tuple[str, str, dict]]): Record (id, testo, metadati) nello stesso ordine.
+        embedding_model (str): Nome del modello di embedding usato.
+    """
+    matrix, records = _prepare(vectors, documents)
+
+    # Tabella degli offset dei record testuali
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in records], out=offsets[1:])
+
+    # Scrittura dei file accessori (prima in file temporanei)
+    for ext, write in (
+        ("vec", lambda f: matrix.tofile(f)),
+        ("off", lambda f: offsets.tofile(f)),
+        ("txt", lambda f: f.writelines(records)),
+    ):
+        tmp_path = _sidecar(db_path, ext) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, _sidecar(db_path, ext))
+
+    # Un database riscritto non ha righe eliminate
+    if os.path.exists(_sidecar(db_path, "del")):
+        os.remove(_sidecar(db_path, "del"))
+
+    _write_header(db_path, len(records), int(matrix.shape[1]), embedding_model)
+
+
+def append_vector_db(db_path: str, vectors, documents: list) -> range:
+    """
+    Aggiunge righe in coda a un database esistente, senza riscriverlo.
+
+    I file accessori vengono prima riportati alla lunghezza indicata
+    dall'intestazione (scarta eventuali scritture interrotte), poi estesi;
+    l'intestazione con il nuovo numero di righe è aggiornata per ultima.
+
+    Parametri:
+    -----------
+        db_path (str): Percorso del file .db.
+        vectors: Embedding delle nuove righe.
+        documents (list[tuple[str, str, dict]]): Record (id, testo, metadati) delle nuove righe.
+
+    Restituisce:
+    -------------
+        range: Indici delle righe aggiunte.
+    """
+    header = _read_header(db_path)
+    count, dim = int(header["count"]), int(header["dim"])
+    if not documents:
+        return range(count, count)
+
+    matrix, records = _prepare(vectors, documents)
+    if dim and matrix.shape[1] != dim:
+        raise ValueError(f"Dimensione degli embedding non compatibile: {matrix.shape[1]} invece di {dim}")
+
+    # Offset attuali (count + 1 valori) e fine del file dei testi
+    text_end = 0
+    if count:
+        text_end = int(np.fromfile(_sidecar(db_path, "off"), dtype=np.int64, count=count + 1)[-1])
+
+    offsets = np.zeros(len(records), dtype=np.int64)
+    np.cumsum([len(r) for r in records], out=offsets)
+    offsets += text_end
+
+    for ext, size, write in (
+        ("vec", count * dim * 4, lambda f: matrix.tofile(f)),
+        ("off", (count + 1) * 8, lambda f: offsets.tofile(f)),
+        ("txt", text_end, lambda f: f.writelines(records)),
+        ("del", count, lambda f: f.write(bytes(len(records)))),
+    ):
+        path = _sidecar(db_path, ext)
+        if ext == "del" and not os.path.exists(path):
+            continue
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(size)
+            f.seek(size)
+            write(f)
+
+    _write_header(db_path, count + len(records), int(matrix.shape[1]), header.get("embedding_model"))
+    return range(count, count + len(records))
+
+
+def delete_vector_rows(db_path: str, rows):
+    """
+    Marca come eliminate (tombstone) le righe indicate; i dati restano su disco
+    finché il database non viene compattato.
+    """
+    rows = np.asarray(list(rows), dtype=np.int64)
+    count = int(_read_header(db_path)["count"])
+    if len(rows) == 0:
+        return
+
+    deleted = read_deleted(db_path, count)
+    deleted[rows] = 1
+    tmp_path = _sidecar(db_path, "del") + ".tmp"
+    deleted.tofile(tmp_path)
+    os.replace(tmp_path, _sidecar(db_path, "del"))
+
+
+def read_deleted(db_path: str, count: int) -> np.ndarray:
+    """Restituisce la maschera delle righe eliminate (uint8, una per riga)."""
+    path = _sidecar(db_path, "del")
+    deleted = np.zeros(count, dtype=np.uint8)
+    if os.path.exists(path):
+        stored = np.fromfile(path, dtype=np.uint8, count=count)
+        deleted[:len(stored)] = stored
+    return deleted
+
+
+def compact_vector_db(db_path: str) -> np.ndarray:
+    """
+    Riscrive il database senza le righe eliminate.
+
+    Restituisce:
+    -------------
+        np.ndarray: Per ogni riga precedente, il nuovo indice (-1 se eliminata).
+    """
+    db = VectorDB(db_path)
+    live = np.flatnonzero(db.deleted == 0) if db.deleted is not None else np.arange(len(db))
+
+    vectors = np.asarray(db.matrix[live])
+    documents = []
+    for i in live:
+        doc = db.document(int(i))
+        documents.append((doc.id, doc.page_content, doc.metadata))
+    embedding_model = db.embedding_model
+    count = len(db)
+    del db
+
+    write_vector_db(db_path, vectors, documents, embedding_model)
+
+    mapping = np.full(count, -1, dtype=np.int64)
+    mapping[live] = np.arange(len(live))
+    return mapping
+
+
+class VectorDB:
+    """
+    Database vettoriale aperto in sola lettura tramite memory-mapping.
+
+    Attributi principali:
+        matrix (np.ndarray): Embedding normalizzati (n x d), mappati da disco.
+        ann: Indice approssimato opzionale (IVFIndex) associato al database.
+    """
+
+    def __init__(self, db_path: str):
+        header = _read_header(db_path)
+
+        self.path = db_path
+        self.count = int(header["count"])
+        self.dim = int(header["dim"])
+        self.embedding_model = header.get("embedding_model")
+
+        # File vuoti non possono essere mappati in memoria
+        if self.count == 0:
+            self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self._text = b""
+        else:
+            self.matrix = np.memmap(_sidecar(db_path, "vec"), dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            self.offsets = np.memmap(_sidecar(db_path, "off"), dtype=np.int64, mode="r", shape=(self.count + 1,))
+            with open(_sidecar(db_path, "txt"), "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Righe eliminate (tombstone): None se non ce ne sono
+        deleted = read_deleted(db_path, self.count)
+        self.deleted = deleted if deleted.any() else None
+        self.deleted_rows = np.flatnonzero(deleted)
+
+        # Indici approssimato (IVF) e lessicale (BM25), assegnati da chi apre il database (vedi load_DB)
+        self.ann = None
+        self.lexical = None
+
+    def __len__(self) -> int:
+        """Numero di righe, comprese quelle eliminate (la numerazione resta stabile)."""
+        return self.count
+
+    @property
+    def live_count(self) -> int:
+        """Numero di righe non eliminate."""
+        return self.count - len(self.deleted_rows)
+
+    def document(self, i: int) -> Document:
+        """Decodifica il record della riga i e lo restituisce come Document."""
+        record = json.loads(self._text[self.offsets[i]:self.offsets[i + 1]])
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
@@ -1,6 +1,15 @@
 
 import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
+
+from langchain_core.documents import Document
 from langchain_ollama import OllamaEmbeddings
 
 from langchain_community.document_loaders import PyPDFLoader
@@ -10,8 +19,492 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from core.config import (
     EmbeddingConfig,
+    IngestionConfig,
+    RetrievalConfig,
 )
 
+# Calcolo degli embedding a batch concorrenti (costruzione dei database)
+from core.embedding_client import EmbeddingClient, checkpoint_dir
+
+# Indice lessicale BM25 per la ricerca ibrida
+from core.lexical_index import BM25Index, corpus_stats, tokenize
+
+# Embedding delle domande con cache condivisa dal processo
+from core.embedding_cache import get_query_embeddings
+
+# Formato binario su disco dei database vettoriali
+from core.vector_db import VectorDB, is_vector_db, write_vector_db
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Seleziona i k punteggi più alti lungo l'ultimo asse, in ordine decrescente.
+
+    Usa `argpartition` (O(n)) e ordina solo i k candidati, invece di ordinare
+    tutti gli n punteggi. Funziona sia con un vettore (una query) sia con una
+    matrice (una riga per query).
+
+    Restituisce:
+        tuple[np.ndarray, np.ndarray]: Indici delle righe e relativi punteggi.
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        empty = scores[..., :0]
+        return empty.astype(np.int64), empty
+
+    if k < n:
+        idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        idx = np.broadcast_to(np.arange(n), scores.shape).copy()
+
+    top = np.take_along_axis(scores, idx, axis=-1)
+    order = np.argsort(-top, axis=-1, kind="stable")
+    return np.take_along_axis(idx, order, axis=-1), np.take_along_axis(top, order, axis=-1)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalizza (in place) le righe di una matrice float32 alla norma L2 unitaria."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+    """Assegna ogni riga al centroide più simile, a blocchi per limitare la memoria."""
+    assign = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), block):
+        assign[start:start + block] = np.argmax(matrix[start:start + block] @ centroids.T, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """
+    Indice approssimato Inverted File (IVF) per corpora di grandi dimensioni.
+
+    Gli embedding vengono raggruppati in `nlist` cluster (k-means sferico);
+    a ogni query si esplorano solo le `nprobe` liste con il centroide più
+    simile, invece dell'intera matrice. Le righe sono salvate come
+    permutazione ordinata per lista (`order`) più tabella degli offset.
+
+    Le righe aggiunte al database dopo l'addestramento (oltre `count`)
+    sono sempre confrontate in modo esatto.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def count(self) -> int:
+        """Numero di righe coperte dalle liste invertite."""
+        return len(self.order)
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, nlist: int = RetrievalConfig.ANN_NLIST,
+              iterations: int = RetrievalConfig.ANN_TRAIN_ITERATIONS, seed: int = 0) -> "IVFIndex":
+        """
+        Addestra i centroidi (k-means sferico) e costruisce le liste invertite.
+
+        Parametri:
+        -----------
+            matrix (np.ndarray): Embedding normalizzati (n x d).
+            nlist (int): Numero di liste; 0 = automatico (circa sqrt(n)).
+            iterations (int): Iterazioni di k-means.
+            seed (int): Seme per la scelta dei centroidi iniziali.
+
+        Restituisce:
+        -------------
+            IVFIndex: Indice pronto all'uso.
+        """
+        n = len(matrix)
+        if n == 0:
+            raise ValueError("Impossibile addestrare un indice IVF su una matrice vuota.")
+
+        nlist = min(nlist or max(1, int(round(np.sqrt(n)))), n)
+        rng = np.random.default_rng(seed)
+
+        # Campione di addestramento limitato (256 punti per centroide bastano)
+        sample_size = min(n, nlist * 256)
+        sample = matrix[np.sort(rng.choice(n, sample_size, replace=False))]
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = _assign(sample, centroids)
+
+            # Somma dei punti di ciascun cluster tramite ordinamento + reduceat
+            sorted_idx = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.add.reduceat(sample[sorted_idx], starts[filled], axis=0)
+
+            # Cluster vuoti: ripartono da un punto casuale del campione
+            centroids[filled] = sums
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+            _normalize_rows(centroids)
+
+        # Liste invertite: righe ordinate per cluster + offset di inizio lista
+        assign = _assign(matrix, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=nlist))))
+        return cls(centroids, order, offsets)
+
+    def save(self, path: str):
+        """Salva l'indice in formato `.npz`."""
+        np.savez(path, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Carica un indice salvato con `save`."""
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"])
+
+    def search(self, matrix: np.ndarray, queries: np.ndarray, k: int,
+               nprobe: int = RetrievalConfig.ANN_NPROBE, deleted: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ricerca approssimata top-k.
+
+        Parametri:
+        -----------
+            matrix (np.ndarray): Embedding normalizzati indicizzati (n x d).
+            queries (np.ndarray): Query normalizzate (m x d).
+            k (int): Numero di risultati per query.
+            nprobe (int): Numero di liste esplorate per query (recall ↑, latenza ↑).
+            deleted (np.ndarray | None): Maschera delle righe eliminate, escluse dai candidati.
+
+        Restituisce:
+        -------------
+            tuple[np.ndarray, np.ndarray]: Indici delle righe (m x k) e similarità coseno (m x k).
+        """
+        k = min(k, len(matrix))
+        probes, _ = _top_k(queries @ self.centroids.T, nprobe)
+
+        # Righe aggiunte dopo l'addestramento: sempre confrontate
+        tail = np.arange(self.count, len(matrix))
+
+        ids = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for q, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate(
+                [self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists] + [tail]
+            )
+            if deleted is not None:
+                candidates = candidates[deleted[candidates] == 0]
+
+            # Troppo pochi candidati: ricerca esatta per questa query
+            if len(candidates) < k:
+                candidates = np.arange(len(matrix)) if deleted is None else np.flatnonzero(deleted == 0)
+
+            top, top_scores = _top_k(matrix[candidates] @ query, k)
+            ids[q, :len(top)] = candidates[top]
+            scores[q, :len(top)] = top_scores
+
+            # Meno righe valide che risultati richiesti: posizioni vuote scartate a valle
+            ids[q, len(top):] = 0
+            scores[q, len(top):] = -np.inf
+        return ids, scores
+
+
+class VectorIndex:
+    """
+    Indice vettoriale esatto basato su NumPy.
+
+    Ogni database (.db) è una matrice float32 contigua di embedding già
+    normalizzati, mappata da disco (vedi `core/vector_db.py`): la similarità
+    coseno con una query si riduce a un prodotto matrice-vettore per database,
+    seguito da `argpartition` per il top-k e da un'unione dei risultati.
+    Più query possono essere risolte insieme con un unico prodotto matriciale.
+
+    Le righe eliminate (tombstone, vedi `db.deleted`) non vengono mai
+    restituite; se le righe valide sono meno di k i posti mancanti hanno
+    similarità -inf e vengono scartati dai metodi che restituiscono Document.
+
+    Se un database dispone di un indice IVF (`db.ann`) la sua ricerca è
+    approssimata e confronta solo le liste più promettenti; `exact=True`
+    forza la scansione completa.
+    """
+
+    def __init__(self, dbs: list, embeddings=None):
+        """
+        Parametri:
+        -----------
+            dbs (list[VectorDB]): Database vettoriali aperti; le righe sono numerate
+                                  in modo consecutivo nell'ordine della lista.
+            embeddings: Modello di embedding usato per le query testuali.
+        """
+        self.dbs = list(dbs)
+        self.embeddings = embeddings
+
+        # Prima riga globale di ciascun database
+        self._bases = np.concatenate(([0], np.cumsum([len(db) for db in self.dbs]))).astype(np.int64)
+
+    def __len__(self) -> int:
+        return int(self._bases[-1])
+
+    def document(self, i: int) -> Document:
+        """Restituisce il Document della riga globale i."""
+        shard = bisect_right(self._bases, i) - 1
+        return self.dbs[shard].document(int(i - self._bases[shard]))
+
+    def _normalize_queries(self, query_vectors) -> np.ndarray:
+        """Converte le query in una matrice float32 normalizzata (m x d)."""
+        return _normalize_rows(np.array(query_vectors, dtype=np.float32, ndmin=2))
+
+    def search_by_vectors(self, query_vectors, k: int = RetrievalConfig.TOP_K, exact: bool = False,
+                          nprobe: int = RetrievalConfig.ANN_NPROBE) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ricerca top-k per una o più query con un unico prodotto matriciale.
+
+        Parametri:
+        -----------
+            query_vectors: Embedding delle query (d oppure m x d).
+            k (int): Numero di risultati per query.
+            exact (bool): Se True ignora l'indice approssimato e confronta tutte le righe.
+            nprobe (int): Liste IVF esplorate per query (solo ricerca approssimata).
+
+        Restituisce:
+        -------------
+            tuple[np.ndarray, np.ndarray]: Indici delle righe (m x k) e similarità coseno (m x k).
+        """
+        queries = self._normalize_queries(query_vectors)
+
+        # Top-k di ciascun database, con indici riportati alla numerazione globale
+        found_ids, found_scores = [], []
+        for base, db in zip(self._bases, self.dbs):
+            if len(db) == 0:
+                continue
+            if db.ann is not None and not exact:
+                ids, scores = db.ann.search(db.matrix, queries, k, nprobe, db.deleted)
+            else:
+                scores = queries @ db.matrix.T
+                scores[:, db.deleted_rows] = -np.inf
+                ids, scores = _top_k(scores, k)
+            found_ids.append(ids + base)
+            found_scores.append(scores)
+
+        if not found_ids:
+            # Indice vuoto: nessun risultato per nessuna query
+            empty = np.zeros((len(queries), 0), dtype=np.float32)
+            return empty.astype(np.int64), empty
+
+        if len(found_ids) == 1:
+            return found_ids[0], found_scores[0]
+
+        # Unione dei candidati: top-k sui k x (numero di database) migliori
+        ids = np.concatenate(found_ids, axis=1)
+        top, scores = _top_k(np.concatenate(found_scores, axis=1), k)
+        return np.take_along_axis(ids, top, axis=1), scores
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = RetrievalConfig.TOP_K, exact: bool = False) -> list:
+        """Restituisce le coppie (Document, similarità) più vicine all'embedding fornito."""
+        idx, scores = self.search_by_vectors(embedding, k, exact=exact)
+        return [(self.document(i), float(score)) for i, score in zip(idx[0], scores[0]) if np.isfinite(score)]
+
+    def similarity_search_by_vector(self, embedding, k: int = RetrievalConfig.TOP_K, exact: bool = False) -> list:
+        """Restituisce i Document più vicini all'embedding fornito."""
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, exact)]
+
+    def similarity_search(self, query: str, k: int = RetrievalConfig.TOP_K) -> list:
+        """Calcola l'embedding della query e restituisce i Document più pertinenti."""
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def similarity_search_batch(self, queries: list, k: int = RetrievalConfig.TOP_K) -> list:
+        """
+        Risolve più query testuali insieme: un'unica chiamata di embedding
+        e un unico prodotto matriciale.
+
+        Restituisce:
+        -------------
+            list[list[Document]]: Per ogni query, i Document più pertinenti.
+        """
+        if not queries:
+            return []
+        idx, scores = self.search_by_vectors(self.embeddings.embed_documents(queries), k)
+        return [
+            [self.document(i) for i, score in zip(row, row_scores) if np.isfinite(score)]
+            for row, row_scores in zip(idx, scores)
+        ]
+
+    @property
+    def has_lexical(self) -> bool:
+        """True se tutti i database non vuoti dispongono dell'indice BM25."""
+        return all(db.lexical is not None for db in self.dbs if len(db))
+
+    def lexical_search(self, query: str, k: int = RetrievalConfig.TOP_K) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ricerca BM25 top-k sui database che dispongono dell'indice lessicale.
+
+        Con più database i punteggi usano le statistiche dell'insieme (righe totali,
+        lunghezza media, frequenza dei termini in tutti i .db): sono sulla stessa scala
+        e l'ordinamento unico coincide con quello di un solo indice sull'intero corpus.
+
+        Restituisce:
+        -------------
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Righe globali, punteggi BM25 e,
+            per ciascun risultato, se contiene tutti i termini della domanda.
+        """
+        indexed = [(base, db) for base, db in zip(self._bases, self.dbs) if db.lexical is not None]
+        corpus = corpus_stats([db.lexical for _, db in indexed], query) if len(indexed) > 1 else None
+        found = [
+            (ids + base, scores, full)
+            for base, db in indexed
+            for ids, scores, full in [db.lexical.search(query, k, db.deleted, corpus)]
+        ]
+        if not found:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=bool)
+
+        ids, scores, full = (np.concatenate(parts) for parts in zip(*found))
+        top = np.argsort(-scores, kind="stable")[:k]
+        return ids[top], scores[top], full[top]
+
+    def as_retriever(self, k: int = RetrievalConfig.TOP_K, mode: str = RetrievalConfig.MODE):
+        """
+        Restituisce un retriever con interfaccia `invoke`/`batch` basato su questo indice.
+
+        Parametri:
+            k (int): Numero di documenti restituiti.
+            mode (str): "vector" (solo embedding), "hybrid" (BM25 + embedding) o "lexical" (solo BM25).
+        """
+        if mode == "vector" or not self.has_lexical:
+            return VectorIndexRetriever(self, k)
+        return HybridRetriever(self, k, lexical_only=(mode == "lexical"))
+
+
+class VectorIndexRetriever:
+    """
+    Retriever minimale sopra un VectorIndex, compatibile con l'uso
+    `retriever.invoke(query)` dei retriever LangChain.
+    """
+
+    def __init__(self, index: VectorIndex, k: int = RetrievalConfig.TOP_K):
+        self.index = index
+        self.k = k
+
+    def invoke(self, query: str) -> list:
+        """Restituisce i Document più pertinenti per la query."""
+        return self.index.similarity_search(query, self.k)
+
+    def search(self, query: str) -> tuple[list, np.ndarray | None]:
+        """
+        Come `invoke`, ma restituisce anche l'embedding della query usato per la ricerca.
+
+        Restituisce:
+        -------------
+            tuple[list[Document], np.ndarray]: Documenti più pertinenti ed embedding della query.
+        """
+        vector = np.asarray(self.index.embeddings.embed_query(query), dtype=np.float32)
+        return self.index.similarity_search_by_vector(vector, self.k), vector
+
+    def batch(self, queries: list) -> list:
+        """Restituisce i Document più pertinenti per ciascuna query, in un'unica ricerca."""
+        return self.index.similarity_search_batch(queries, self.k)
+
+
+class HybridRetriever:
+    """
+    Retriever ibrido: ricerca lessicale BM25 + ricerca vettoriale, unite con
+    Reciprocal Rank Fusion (RRF): punteggio = somma di 1 / (RRF_K + posizione).
+
+    Scorciatoia lessicale: per domande brevi (nomi, titoli) in cui i primi k
+    risultati BM25 contengono tutti i termini cercati, la risposta lessicale è
+    considerata decisiva e l'embedding della domanda non viene calcolato.
+    """
+
+    def __init__(self, index: VectorIndex, k: int = RetrievalConfig.TOP_K, lexical_only: bool = False):
+        self.index = index
+        self.k = k
+        self.lexical_only = lexical_only
+        self.candidates = max(k, RetrievalConfig.HYBRID_CANDIDATES)
+
+        # Quante ricerche hanno usato la sola via lessicale e quante quella ibrida
+        # (aggiornate dai thread concorrenti del server Flask)
+        self._counts = {"lexical": 0, "hybrid": 0}
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        """Statistiche delle ricerche: quante risolte dalla sola via lessicale e quante ibride."""
+        with self._lock:
+            return dict(self._counts)
+
+    def _is_decisive(self, query: str, full: np.ndarray) -> bool:
+        """La via lessicale basta se la domanda è breve e i primi k risultati contengono tutti i termini."""
+        if not RetrievalConfig.LEXICAL_FAST_PATH:
+            return False
+        n_terms = len(set(tokenize(query)))
+        return 0 < n_terms <= RetrievalConfig.LEXICAL_FAST_MAX_TERMS and len(full) >= self.k and full[:self.k].all()
+
+    def _fuse(self, lexical_ids: np.ndarray, vector_ids: np.ndarray) -> list:
+        """Unisce due classifiche con Reciprocal Rank Fusion e restituisce i k migliori indici."""
+        scores = {}
+        for ranking in (lexical_ids, vector_ids):
+            for rank, i in enumerate(ranking.tolist()):
+                scores[i] = scores.get(i, 0.0) + 1.0 / (RetrievalConfig.RRF_K + rank + 1)
+        return sorted(scores, key=scores.get, reverse=True)[:self.k]
+
+    def _lexical(self, query: str):
+        """Candidati BM25 e scelta della scorciatoia lessicale."""
+        ids, _, full = self.index.lexical_search(query, self.candidates)
+        return ids, self.lexical_only or self._is_decisive(query, full)
+
+    def invoke(self, query: str) -> list:
+        """Restituisce i Document più pertinenti per la query."""
+        return self.batch([query])[0]
+
+    def search(self, query: str) -> tuple[list, np.ndarray | None]:
+        """
+        Come `invoke`, ma restituisce anche l'embedding della query, se calcolato.
+
+        Restituisce:
+        -------------
+            tuple[list[Document], np.ndarray | None]: Documenti più pertinenti ed embedding
+            della query (None se la ricerca si è fermata alla via lessicale).
+        """
+        results, vectors = self._search([query])
+        return results[0], vectors[0]
+
+    def batch(self, queries: list) -> list:
+        """
+        Restituisce i Document più pertinenti per ciascuna query; gli embedding
+        delle query non risolte dalla via lessicale sono calcolati in un'unica chiamata.
+        """
+        return self._search(queries)[0]
+
+    def _search(self, queries: list) -> tuple[list, list]:
+        """Documenti di ciascuna query ed embedding calcolati (None per le query risolte dalla via lessicale)."""
+        lexical = [self._lexical(query) for query in queries]
+        pending = [i for i, (_, decisive) in enumerate(lexical) if not decisive]
+
+        query_vectors = [None] * len(queries)
+        vector_ids = {}
+        if pending:
+            vectors = np.asarray(self.index.embeddings.embed_documents([queries[i] for i in pending]), dtype=np.float32)
+            idx, scores = self.index.search_by_vectors(vectors, self.candidates)
+            for i, vector, row, row_scores in zip(pending, vectors, idx, scores):
+                query_vectors[i] = vector
+                vector_ids[i] = row[np.isfinite(row_scores)]
+
+        with self._lock:
+            self._counts["hybrid"] += len(vector_ids)
+            self._counts["lexical"] += len(queries) - len(vector_ids)
+
+        results = []
+        for i, (lexical_ids, _) in enumerate(lexical):
+            if i in vector_ids:
+                ids = self._fuse(lexical_ids, vector_ids[i])
+            else:
+                ids = lexical_ids[:self.k].tolist()
+            results.append([self.index.document(j) for j in ids])
+        return results, query_vectors
+
 
 def choose_splitter(text_length: int, custom_size: int | None = None, custom_overlap: int | None = None) -> RecursiveCharacterTextSplitter:
     """
@@ -56,13 +549,129 @@ def choose_splitter(text_length: int, custom_size: int | None = None, custom_ove
     )
 
 
-def load_pdfs(data_dir: str = "./vs/data") -> list:
+# Esito dell'elaborazione di un PDF (chunks è None se si è verificato un errore)
+ParsedPDF = namedtuple("ParsedPDF", ["file_path", "pages", "chunks", "error"])
+
+
+def parse_pdf(file_path: str) -> ParsedPDF:
+    """
+    Carica un singolo file PDF e lo suddivide in chunk testuali.
+    Gli errori non vengono propagati ma riportati nel risultato, così un
+    file danneggiato non interrompe l'elaborazione degli altri.
+
+    Parametri:
+    -----------
+        file_path (str): Percorso del file PDF.
+
+    Restituisce:
+    -------------
+        ParsedPDF: Percorso, numero di pagine, chunk (Document) ed eventuale errore.
+    """
+    try:
+        # Carica il PDF e ottiene le pagine come documenti
+        loader = PyPDFLoader(file_path)
+        docs = loader.load()
+
+        # Combina tutto il testo per calcolare la lunghezza complessiva
+        total_text = " ".join(doc.page_content for doc in docs)
+
+        # Sceglie automaticamente lo splitter ottimale
+        splitter = choose_splitter(len(total_text))
+
+        # Divide i documenti in chunk testuali
+        return ParsedPDF(file_path, len(docs), splitter.split_documents(docs), None)
+
+    except Exception as e:
+        return ParsedPDF(file_path, 0, None, f"{type(e).__name__}: {e}")
+
+
+def split_pdf(file_path: str) -> list:
+    """Carica un singolo file PDF e restituisce i suoi chunk (solleva un errore se fallisce)."""
+    result = parse_pdf(file_path)
+    if result.error:
+        raise RuntimeError(result.error)
+    return result.chunks
+
+
+def iter_parsed_pdfs(file_paths: list, workers: int = IngestionConfig.PDF_WORKERS):
+    """
+    Elabora più PDF in parallelo su un pool di processi (parsing e chunking sono
+    CPU-bound) e restituisce i risultati man mano, nello stesso ordine dei file.
+
+    Al massimo `2 x workers` file sono in lavorazione o in attesa di essere
+    consumati, quindi la memoria resta limitata anche con molti file.
+
+    Parametri:
+    -----------
+        file_paths (list[str]): Percorsi dei file PDF, nell'ordine desiderato.
+        workers (int): Numero di processi; 0 = numero di core, 1 = elaborazione sequenziale.
+
+    Restituisce:
+    -------------
+        Generator[ParsedPDF]: Un risultato per file, in ordine.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+
+    # Un solo file o un solo processo: nessun costo di avvio del pool
+    if workers <= 1:
+        for file_path in file_paths:
+            yield parse_pdf(file_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(file_paths)
+
+        # Finestra di sottomissione limitata
+        for file_path in remaining:
+            pending.append(pool.submit(parse_pdf, file_path))
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            result = pending.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append(pool.submit(parse_pdf, next_path))
+            yield result
+
+
+class ParseStats:
+    """Contatori di throughput del parsing (pagine/s e chunk/s)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.files = 0
+        self.errors = 0
+        self.pages = 0
+        self.chunks = 0
+
+    def add(self, result: ParsedPDF):
+        """Registra l'esito di un file."""
+        self.files += 1
+        if result.error:
+            self.errors += 1
+        else:
+            self.pages += result.pages
+            self.chunks += len(result.chunks)
+
+    def report(self) -> str:
+        """Riepilogo leggibile del throughput."""
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (f"{self.files} file ({self.errors} errori), {self.pages} pagine, {self.chunks} chunk "
+                f"in {elapsed:.2f} s → {self.pages / elapsed:.1f} pagine/s, {self.chunks / elapsed:.1f} chunk/s")
+
+
+def load_pdfs(data_dir: str = "./vs/data", workers: int = IngestionConfig.PDF_WORKERS) -> list:
     """
     Carica tutti i file PDF da una cartella e li suddivide in chunk testuali.
+    I file vengono elaborati in parallelo (vedi `iter_parsed_pdfs`); l'ordine
+    dei chunk è deterministico (file in ordine alfabetico).
 
     Parametri:
     -----------
         data_dir (str): Percorso alla cartella contenente i file PDF da processare.
+        workers (int): Numero di processi per il parsing (0 = numero di core).
 
     Restituisce:
     -------------
@@ -75,50 +684,43 @@ def load_pdfs(data_dir: str = "./vs/data") -> list:
     if not os.path.exists(data_dir):
         raise FileNotFoundError(f"La cartella specificata non esiste: {data_dir}")
 
-    for file in os.listdir(data_dir):
-        if not file.endswith(".pdf"):
-            continue  # ignora file non PDF
-
-        file_path = os.path.join(data_dir, file)
-        print(f"[load_pdfs] Caricamento di: {file_path}")
+    # Ignora i file non PDF
+    file_paths = [os.path.join(data_dir, file) for file in sorted(os.listdir(data_dir)) if file.endswith(".pdf")]
 
-        try:
-            # Carica il PDF e ottiene le pagine come documenti
-            loader = PyPDFLoader(file_path)
-            docs = loader.load()
+    stats = ParseStats()
+    for result in iter_parsed_pdfs(file_paths, workers):
+        stats.add(result)
+        if result.error:
+            print(f"Errore nel caricamento di {os.path.basename(result.file_path)}: {result.error}")
+            continue
 
-            # Combina tutto il testo per calcolare la lunghezza complessiva
-            total_text = " ".join(doc.page_content for doc in docs)
+        print(f"[load_pdfs] Caricato: {result.file_path} ({result.pages} pagine, {len(result.chunks)} chunk)")
 
-            # Sceglie automaticamente lo splitter ottimale
-            splitter = choose_splitter(len(total_text))
-
-            # Divide i documenti in chunk testuali
-            split_docs = splitter.split_documents(docs)
-
-            # Aggiunge i chunk alla lista principale
-            chunks.extend(split_docs)
-
-        except Exception as e:
-            print(f"Errore nel caricamento di {file}: {e}")
+        # Aggiunge i chunk del file alla lista principale
+        chunks.extend(result.chunks)
 
+    print(f"[load_pdfs] {stats.report()}")
     print(f"Totale chunk creati: {len(chunks)}")
     return chunks
 
 
-def create_vectorstore(chunks: list, db_path: str = "./vs/data.db", embedding_model: str = EmbeddingConfig.NAME) -> InMemoryVectorStore:
+def create_vectorstore(chunks: list, db_path: str = "./vs/data.db", embedding_model: str = EmbeddingConfig.NAME) -> VectorIndex:
     """
-    Crea e salva un VectorStore locale a partire da una lista di chunk testuali.
+    Crea e salva un database vettoriale locale a partire da una lista di chunk testuali.
+
+    Il database viene scritto nel formato binario di `core/vector_db.py`
+    (intestazione .db + matrice degli embedding + testi) e riaperto tramite
+    memory-mapping.
 
     Parametri:
     -----------
         chunks (list): Lista di oggetti Document contenenti testo da indicizzare.
-        db_path (str): Percorso del file .db dove salvare il VectorStore generato.
+        db_path (str): Percorso del file .db dove salvare il database generato.
         embedding_model (str): Nome del modello Ollama da usare per calcolare gli embedding.
 
     Restituisce:
     -------------
-        InMemoryVectorStore: Il VectorStore generato e pronto all'uso.
+        VectorIndex: L'indice del database generato, pronto all'uso.
     """
 
     if not chunks:
@@ -126,63 +728,251 @@ def create_vectorstore(chunks: list, db_path: str = "./vs/data.db", embedding_mo
 
     os.makedirs(os.path.dirname(db_path), exist_ok=True)  # crea la cartella se non esiste
 
-    # Inizializza il modello di embedding 
-    embeddings = OllamaEmbeddings(model=embedding_model)
+    # Calcola gli embedding di tutti i chunk (batch concorrenti, con checkpoint)
+    client = EmbeddingClient(model=embedding_model)
+    ckpt = checkpoint_dir(db_path) if EmbeddingConfig.CHECKPOINT else None
+    vectors = client.embed([chunk.page_content for chunk in chunks], checkpoint_dir=ckpt)
+    print(f"[create_vectorstore] Embedding: {client.stats.report()}")
+
+    # Salva su disco il database vettoriale (formato binario)
+    write_vector_db(
+        db_path,
+        vectors,
+        [(chunk.id or str(uuid.uuid4()), chunk.page_content, chunk.metadata) for chunk in chunks],
+        embedding_model
+    )
 
-    # Crea il VectorStore a partire dai documenti 
-    vs = InMemoryVectorStore.from_documents(chunks, embeddings)
+    # Database scritto: i checkpoint non servono più
+    if ckpt:
+        EmbeddingClient.clear_checkpoint(ckpt)
 
-    # Salva su disco il database vettoriale 
-    vs.dump(db_path)
+    # Un indice IVF precedente non corrisponde più al contenuto del .db
+    if os.path.exists(ann_index_path(db_path)):
+        os.remove(ann_index_path(db_path))
 
     print(f"VectorStore creato con {len(chunks)} chunk e salvato in: {db_path}")
 
-    return vs
+    db = VectorDB(db_path)
+
+    # Indice lessicale BM25 accanto al .db (ricerca ibrida)
+    db.lexical = build_lexical_index(db_path, db)
+
+    # Indice approssimato accanto al .db, solo per corpora grandi
+    if RetrievalConfig.ANN_ENABLED and len(db) >= RetrievalConfig.ANN_MIN_VECTORS:
+        db.ann = build_ann_index(db_path, db.matrix)
+
+    return VectorIndex([db], get_query_embeddings(embedding_model))
+
+
+def convert_legacy_db(db_path: str, embedding_model: str = EmbeddingConfig.NAME):
+    """
+    Converte un .db salvato con `InMemoryVectorStore.dump` (JSON) nel formato binario.
+
+    La conversione avviene una sola volta: il file .db viene sostituito
+    dall'intestazione del nuovo formato e i dati spostati nei file accessori.
+
+    Parametri:
+    -----------
+        db_path (str): Percorso del file .db da convertire.
+        embedding_model (str): Modello di embedding con cui il .db è stato creato.
+    """
+    vs = InMemoryVectorStore.load(db_path, OllamaEmbeddings(model=embedding_model))
+    entries = list(vs.store.values())
+
+    write_vector_db(
+        db_path,
+        [entry["vector"] for entry in entries],
+        [(entry["id"], entry["text"], entry["metadata"]) for entry in entries],
+        embedding_model
+    )
+
+    print(f"[convert_legacy_db] Convertito nel formato binario: {db_path} ({len(entries)} chunk)")
 
 
-def load_DB(data_dir="./vs"):
+def ann_index_path(db_path: str) -> str:
+    """Percorso dell'indice IVF associato a un file .db."""
+    return f"{db_path}.ivf.npz"
+
+
+def build_ann_index(db_path: str, matrix: np.ndarray | None = None, nlist: int = RetrievalConfig.ANN_NLIST) -> IVFIndex:
+    """
+    Costruisce e salva l'indice approssimato (IVF) di un database vettoriale.
+
+    Parametri:
+    -----------
+        db_path (str): Percorso del file .db.
+        matrix (np.ndarray | None): Embedding normalizzati già aperti; se None il .db viene aperto.
+        nlist (int): Numero di liste IVF (0 = automatico).
+
+    Restituisce:
+    -------------
+        IVFIndex: L'indice costruito, salvato in `<db_path>.ivf.npz`.
+    """
+    if matrix is None:
+        matrix = VectorDB(db_path).matrix
+
+    ivf = IVFIndex.train(matrix, nlist=nlist)
+    ivf.save(ann_index_path(db_path))
+
+    print(f"[build_ann_index] Indice IVF con {ivf.nlist} liste salvato in: {ann_index_path(db_path)}")
+    return ivf
+
+
+def lexical_index_path(db_path: str) -> str:
+    """Percorso dell'indice BM25 associato a un file .db."""
+    return f"{db_path}.bm25"
+
+
+def build_lexical_index(db_path: str, db: VectorDB | None = None) -> BM25Index:
+    """
+    Costruisce e salva l'indice lessicale BM25 di un database vettoriale.
+
+    Parametri:
+    -----------
+        db_path (str): Percorso del file .db.
+        db (VectorDB | None): Database già aperto; se None il .db viene aperto.
+
+    Restituisce:
+    -------------
+        BM25Index: L'indice costruito, salvato in `<db_path>.bm25`.
+    """
+    if db is None:
+        db = VectorDB(db_path)
+
+    # Costruzione a blocchi di righe: la memoria non cresce con il corpus
+    bm25 = BM25Index.build((db.document(i).page_content for i in range(len(db))), lexical_index_path(db_path))
+
+    # Indice nel formato precedente (.npz compresso), sostituito da quello appena costruito
+    if os.path.exists(f"{db_path}.bm25.npz"):
+        os.remove(f"{db_path}.bm25.npz")
+
+    print(f"[build_lexical_index] Indice BM25 con {len(bm25.vocab)} termini salvato in: {lexical_index_path(db_path)}")
+    return bm25
+
+
+def load_lexical_index(db_path: str, db: VectorDB) -> BM25Index | None:
+    """
+    Apre l'indice BM25 di un database, se esiste e copre tutte le righe.
+
+    Restituisce:
+        BM25Index | None: L'indice (memory-mapped) oppure None se manca, non è aggiornato o non è valido.
+    """
+    lexical_path = lexical_index_path(db_path)
+    if not os.path.exists(lexical_path):
+        return None
+    try:
+        bm25 = BM25Index.load(lexical_path)
+    except (OSError, ValueError):
+        return None
+    return bm25 if bm25.count == len(db) else None
+
+
+def open_vector_db(db_path: str) -> VectorDB:
+    """
+    Apre un database vettoriale (.db) tramite memory-mapping, insieme al suo
+    eventuale indice IVF e all'indice BM25.
+
+    I .db nel vecchio formato JSON non vengono convertiti qui (l'apertura è in
+    sola lettura e può avvenire da più processi): la conversione spetta
+    all'ingestione (`python ingest.py --convert-legacy`).
+
+    Parametri:
+        db_path (str): Percorso del file .db
+
+    Restituisce:
+        VectorDB: Database aperto in sola lettura
+
+    Solleva ValueError se il .db è nel vecchio formato JSON.
+    """
+    if not is_vector_db(db_path):
+        raise ValueError(f"{db_path} è nel vecchio formato JSON: convertirlo con `python ingest.py --convert-legacy`")
+
+    db = VectorDB(db_path)
+    if db.embedding_model != EmbeddingConfig.NAME:
+        print(f"Attenzione: {db_path} è stato creato con il modello {db.embedding_model}, "
+              f"in uso {EmbeddingConfig.NAME}")
+
+    # Indice IVF costruito in fase di ingestione; le righe aggiunte dopo sono cercate in modo esatto
+    ann_path = ann_index_path(db_path)
+    if RetrievalConfig.ANN_ENABLED and os.path.exists(ann_path):
+        ivf = IVFIndex.load(ann_path)
+        if ivf.count <= len(db):
+            db.ann = ivf
+        else:
+            print(f"Indice IVF non aggiornato e ignorato: {ann_path}")
+
+    # Indice BM25 costruito in fase di ingestione; se manca o non è aggiornato la ricerca resta vettoriale
+    if RetrievalConfig.MODE != "vector" and len(db):
+        db.lexical = load_lexical_index(db_path, db)
+        if db.lexical is None:
+            print(f"Attenzione: indice BM25 mancante o non aggiornato per {db_path}, "
+                  f"ricerca solo vettoriale (eseguire l'ingestione per ricostruirlo)")
+
+    return db
+
+
+def load_vector_index(db_paths: list) -> VectorIndex:
+    """
+    Apre i database vettoriali indicati e li unisce in un unico VectorIndex.
+
+    L'apertura è O(1) rispetto alla dimensione del corpus: embedding e testi
+    restano su disco e vengono letti dal sistema operativo solo quando servono.
+
+    Parametri:
+        db_paths (list[str]): Percorsi dei file .db
+
+    Restituisce:
+        VectorIndex: Indice unico su tutti i database
+    """
+    embeddings = get_query_embeddings(EmbeddingConfig.NAME)
+    dbs = [open_vector_db(path) for path in db_paths]
+    return VectorIndex(dbs, embeddings)
+
+
+def load_DB(data_dir="./vs") -> VectorIndex:
     """
     Carica tutti i database vettoriali (.db) presenti nella cartella /vs
-    e li unisce in un unico InMemoryVectorStore.
+    e li unisce in un unico VectorIndex.
 
     Parametri:
         data_dir (str): Directory contenente i file .db
 
     Restituisce:
-        InMemoryVectorStore: Unione di tutti i VectorStore caricati
+        VectorIndex: Indice unico con gli embedding di tutti i database caricati
     """
-    embeddings = OllamaEmbeddings(model=EmbeddingConfig.NAME)
-    stores = []
-
-    for file in os.listdir(data_dir):
-        if file.endswith(".db"):
-            file_path = os.path.join(data_dir, file)
-            vs = InMemoryVectorStore.load(file_path, embeddings)
-            stores.append(vs)
+    db_paths = [
+        os.path.join(data_dir, file)
+        for file in sorted(os.listdir(data_dir))
+        if file.endswith(".db")
+    ]
+
+    # .db nel vecchio formato JSON: ignorati finché l'ingestione non li converte
+    for path in [path for path in db_paths if not is_vector_db(path)]:
+        print(f"Attenzione: {path} è nel vecchio formato JSON e viene ignorato "
+              f"(convertirlo con `python ingest.py --convert-legacy`)")
+        db_paths.remove(path)
 
     # Nessun .db trovato
-    if not stores:
-        raise FileNotFoundError(f"Nessun file .db trovato in {data_dir}")
+    if not db_paths:
+        raise FileNotFoundError(f"Nessun file .db nel formato binario trovato in {data_dir}")
 
-    # Unisce tutti i VectorStore caricati in uno unico
-    combined = stores[0]
-    for s in stores[1:]:
-        combined.merge_from(s)
+    index = load_vector_index(db_paths)
 
-    print(f"Caricati correttamente {len(stores)} database vettoriali da {data_dir}")
-    return combined
+    print(f"Caricati correttamente {len(db_paths)} database vettoriali da {data_dir} ({len(index)} chunk)")
+    return index
 
 
-def get_relevant_chunks(question: str, vs: InMemoryVectorStore, embedding_model: str = EmbeddingConfig.NAME,top_k: int = 5) -> list[str]:
+def get_relevant_chunks(question: str, vs: VectorIndex, embedding_model: str = EmbeddingConfig.NAME,top_k: int = 5, exact: bool = False) -> list[str]:
     """
     Restituisce i chunk più rilevanti rispetto a una domanda fornita dall'utente.
 
     Parametri:
     -----------
         question (str): Domanda o query dell’utente.
-        vs (InMemoryVectorStore): Database vettoriale già caricato in memoria.
+        vs (VectorIndex): Indice vettoriale già caricato in memoria (vedi `load_DB`).
         embedding_model (str): Nome del modello Ollama da usare per calcolare l’embedding della query.
         top_k (int): Numero di risultati più rilevanti da restituire (default = 5).
+        exact (bool): Se True forza la ricerca esatta anche quando è disponibile l'indice IVF.
 
     Restituisce:
     -------------
@@ -195,12 +985,11 @@ def get_relevant_chunks(question: str, vs: InMemoryVectorStore, embedding_model:
     if vs is None:
         raise ValueError("Il VectorStore fornito è None. Carica prima un database vettoriale valido.")
 
-    # Calcola l'embedding della domanda 
-    embeddings = OllamaEmbeddings(model=embedding_model)
-    question_embedding = embeddings.embed_query(question)
+    # Calcola l'embedding della domanda (client e cache condivisi dal processo)
+    question_embedding = get_query_embeddings(embedding_model).embed_query(question)
 
     # Esegue la ricerca semantica basata sulla similarità vettoriale 
-    results = vs.similarity_search_by_vector(question_embedding, k=top_k)
+    results = vs.similarity_search_by_vector(question_embedding, k=top_k, exact=exact)
 
     # Estrae il contenuto testuale dei chunk trovati 
     relevant_chunks = [r.page_content for r in results]
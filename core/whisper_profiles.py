@@ -0,0 +1,103 @@
+"""
+whisper_profiles.py
+-------------------
+Profili di inferenza Whisper (vedi WhisperConfig.ASR_PROFILES).
+
+Ogni profilo combina:
+- il modello: float32 oppure con i layer lineari quantizzati int8 in modo
+  dinamico (solo CPU: pesi int8, attivazioni quantizzate al volo);
+- il preset di decodifica passato a `transcribe` (greedy senza fallback
+  di temperatura per la bassa latenza, beam search per l'accuratezza).
+"""
+
+# Copia del modello float32 prima della quantizzazione (benchmark)
+import copy
+
+from core.config import WhisperConfig
+
+
+def asr_profile(name: str = WhisperConfig.ASR_PROFILE) -> dict:
+    """
+    Restituisce il profilo di inferenza Whisper indicato.
+
+    Solleva ValueError se il profilo non esiste in WhisperConfig.ASR_PROFILES.
+    """
+    if name not in WhisperConfig.ASR_PROFILES:
+        raise ValueError(f"Profilo Whisper sconosciuto: {name} (disponibili: {', '.join(WhisperConfig.ASR_PROFILES)})")
+    return WhisperConfig.ASR_PROFILES[name]
+
+
+def transcribe_options(name: str = WhisperConfig.ASR_PROFILE) -> dict:
+    """Argomenti di decodifica del profilo per `model.transcribe` (lingua e FP32 inclusi)."""
+    return {"language": WhisperConfig.LANGUAGE, "fp16": False, **asr_profile(name)["decoding"]}
+
+
+def decode_options(name: str = WhisperConfig.ASR_PROFILE) -> dict:
+    """
+    Argomenti del profilo per `whisper.DecodingOptions` (trascrizione in blocco,
+    un solo passaggio a temperatura 0: del preset restano solo i parametri della beam search).
+    """
+    decoding = asr_profile(name)["decoding"]
+    options = {key: decoding[key] for key in ("beam_size", "patience", "length_penalty") if key in decoding}
+    return {"language": WhisperConfig.LANGUAGE, "fp16": False, "without_timestamps": True, **options}
+
+
+def quantize_whisper(model, inplace: bool = False):
+    """
+    Quantizza in int8 (dinamica) i layer lineari di un modello Whisper su CPU.
+
+    I layer lineari (attenzione e MLP di encoder e decoder) concentrano quasi
+    tutto il calcolo: con pesi int8 la trascrizione su CPU è più veloce e il
+    modello occupa meno memoria. Embedding e convoluzioni restano float32.
+
+    Parametri:
+        model: Modello Whisper float32 su CPU.
+        inplace (bool): Se False quantizza una copia e lascia invariato l'originale.
+
+    Restituisce:
+        Il modello quantizzato.
+    """
+    import torch
+    import whisper
+
+    if model.device.type != "cpu":
+        raise ValueError(f"La quantizzazione int8 è supportata solo su CPU (dispositivo: {model.device})")
+
+    if not inplace:
+        model = copy.deepcopy(model)
+
+    # whisper.model.Linear cambia solo il dtype dei pesi nel forward: come nn.Linear
+    # viene riconosciuto (e sostituito) dalla quantizzazione dinamica
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_whisper(name: str = WhisperConfig.MODEL_PATH, device: str = WhisperConfig.DEVICE_NAME,
+                 profile: str = WhisperConfig.ASR_PROFILE):
+    """
+    Carica il modello Whisper per il profilo indicato (quantizzato se il profilo lo prevede).
+
+    Parametri:
+        name (str): Nome o percorso del modello Whisper.
+        device (str): Dispositivo su cui caricare il modello ("cpu" o "cuda").
+        profile (str): Profilo di inferenza (WhisperConfig.ASR_PROFILES).
+
+    Restituisce:
+        Il modello Whisper pronto per `transcribe`.
+    """
+    # Whisper per la trascrizione vocale (import pesante, solo quando serve)
+    import whisper
+
+    quantize = asr_profile(profile)["quantize"]
+    model = whisper.load_model(name=name, device=device)
+
+    if quantize:
+        if model.device.type == "cpu":
+            model = quantize_whisper(model, inplace=True)
+        else:
+            print(f"Profilo Whisper {profile}: quantizzazione int8 ignorata su {model.device} (solo CPU)")
+
+    return model
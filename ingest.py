@@ -0,0 +1,98 @@
+"""
+ingest.py
+---------
+Ingestione da riga di comando dei PDF in un database vettoriale (.db).
+
+La pipeline è a flusso (PDF → chunk → embedding → disco): i chunk vengono
+scritti sul .db a gruppi di dimensione fissa, quindi la memoria di picco
+non dipende dalla dimensione del corpus. Se il .db esiste già viene
+aggiornato in modo incrementale (solo file nuovi o modificati).
+
+Esempi:
+    python ingest.py
+    python ingest.py --data-dir ./vs/alice --db ./vs/alice.db
+    python ingest.py --rebuild --workers 8 --batch-size 512
+    python ingest.py --convert-legacy
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Misura della memoria di picco (non disponibile su Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from core.config import EmbeddingConfig, IngestionConfig
+from core.ingestion import convert_legacy_dbs, manifest_path, update_vectorstore
+from core.embedding_client import checkpoint_dir
+from core.vector_utils import ann_index_path, lexical_index_path
+
+
+def remove_vectorstore(db_path: str):
+    """Elimina il .db indicato con tutti i file accessori (dati, manifest, indici IVF e BM25)."""
+    for path in (db_path, f"{db_path}.vec", f"{db_path}.off", f"{db_path}.txt", f"{db_path}.del",
+                 manifest_path(db_path), ann_index_path(db_path), lexical_index_path(db_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingestione dei PDF in un database vettoriale (.db).")
+    parser.add_argument("--data-dir", default="./vs/data", help="cartella con i file PDF (default: ./vs/data)")
+    parser.add_argument("--db", default="./vs/data.db", help="file .db da creare o aggiornare (default: ./vs/data.db)")
+    parser.add_argument("--model", default=EmbeddingConfig.NAME, help="modello di embedding Ollama")
+    parser.add_argument("--workers", type=int, default=IngestionConfig.PDF_WORKERS,
+                        help="processi per il parsing dei PDF (0 = numero di core)")
+    parser.add_argument("--batch-size", type=int, default=IngestionConfig.STREAM_BATCH_SIZE,
+                        help="chunk accumulati prima di embedding e scrittura su disco")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="ricrea il .db da zero invece di aggiornarlo (i checkpoint di embedding vengono riusati)")
+    parser.add_argument("--convert-legacy", action="store_true",
+                        help="converte nel formato binario i .db nel vecchio formato JSON della cartella di --db ed esce")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.convert_legacy:
+        data_dir = os.path.dirname(args.db) or "."
+        converted = convert_legacy_dbs(data_dir, args.model)
+        print(f"Convertiti {len(converted)} database nel formato binario in {data_dir}")
+        return 0
+
+    if args.rebuild:
+        print(f"Ricostruzione completa di {args.db}")
+        remove_vectorstore(args.db)
+
+    start = time.perf_counter()
+    try:
+        stats = update_vectorstore(
+            data_dir=args.data_dir,
+            db_path=args.db,
+            embedding_model=args.model,
+            workers=args.workers,
+            batch_size=args.batch_size,
+        )
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"Errore: {e}", file=sys.stderr)
+        if os.path.isdir(checkpoint_dir(args.db)):
+            print("Gli embedding già calcolati sono salvati: rilanciare il comando per riprendere.", file=sys.stderr)
+        return 1
+
+    summary = f"Ingestione completata in {time.perf_counter() - start:.1f} s"
+    if resource is not None:
+        # ru_maxrss è in KB su Linux, in byte su macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+        summary += f" (memoria di picco {peak_mb:.0f} MB)"
+    print(f"{summary}: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,11 +16,20 @@ const downloadBtn = document.getElementById('downloadBtn');
 const previewAudio = document.getElementById('previewAudio');
 // Checkbox per indicare se si vuole ricevere la risposta del bot anche in audio (TTS)
 const ttsFlag = document.getElementById('ttsFlag');
-
-// Endpoint per inviare messaggi di testo
-const TEXT_ENDPOINT = '/test';
-// Endpoint per inviare messaggi audio
-const AUDIO_ENDPOINT = '/audio';
+// Riquadri dei controlli audio e dell'opzione TTS (nascosti se il profilo non li supporta)
+const audioControls = document.querySelector('.audio-controls');
+const ttsOption = document.querySelector('.tts-option');
+
+// Endpoint per inviare messaggi di testo con risposta in streaming (SSE)
+const TEXT_STREAM_ENDPOINT = '/test/stream';
+// Endpoint per inviare messaggi audio con risposta in streaming (SSE)
+const AUDIO_STREAM_ENDPOINT = '/audio/stream';
+// Endpoint WebSocket: l'audio viene trascritto mentre l'utente parla
+const AUDIO_WS_ENDPOINT = '/audio/ws';
+// Frequenza di campionamento del PCM inviato sul WebSocket (quella di Whisper)
+const WS_SAMPLE_RATE = 16000;
+// Endpoint con il profilo attivo e le funzionalità disponibili
+const HEALTH_ENDPOINT = '/health';
 
 // Blob contenente l'audio registrato dall'utente
 let recordedBlob = null;
@@ -30,6 +39,27 @@ let recorder = null;
 let chunks = [];
 // Flag booleano per indicare se il sistema sta elaborando una richiesta
 let isProcessing = false;
+// Funzionalità del server (aggiornate da /health all'avvio): con il profilo "text"
+// le route audio non esistono e i relativi controlli vengono nascosti
+let features = { stt: true, tts: true, stt_stream: true };
+// WebSocket aperto durante la registrazione (null se non disponibile: si usa /audio/stream)
+let liveSocket = null;
+// Cattura PCM del microfono per il WebSocket (AudioContext e nodo di elaborazione)
+let liveCapture = null;
+// Id della sessione ricevuto dal WebSocket (evento "session"), reinviato al server
+// con le richieste successive: la risposta del WebSocket non può impostare il cookie
+let sessionId = sessionStorage.getItem('sessionId');
+
+// rememberSession: conserva l'id di sessione inviato dal server
+function rememberSession(data) {
+	sessionId = data.session_id;
+	sessionStorage.setItem('sessionId', sessionId);
+}
+
+// sessionHeaders: header con l'id di sessione (se noto) da aggiungere alle richieste HTTP
+function sessionHeaders(headers = {}) {
+	return sessionId ? { ...headers, 'X-Session-Id': sessionId } : headers;
+}
 
 // setBusy: abilita o disabilita tutti i controlli della UI
 // durante l'elaborazione di una richiesta per evitare input multipli
@@ -58,63 +88,208 @@ function appendMessage(text, who = 'ai', html = false) {
 	chat.scrollTop = chat.scrollHeight; // Scroll automatico verso il basso
 }
 
-// appendBotAudio: aggiunge un messaggio audio del bot nella chat
-// base64Audio = stringa base64 dell'audio generato dal bot
-// text = trascrizione testuale opzionale da mostrare sopra l'audio
-function appendBotAudio(base64Audio, text = '') {
-	const container = document.createElement('div');
-	container.className = 'msg ai';
-
-	// Se presente una trascrizione, la aggiunge sopra l'audio
-	if (text) {
-		const p = document.createElement('p');
-		p.textContent = text;
-		container.appendChild(p);
+// readEventStream: legge una risposta Server-Sent Events da fetch
+// e invoca onEvent(evento, dati) per ogni evento ricevuto
+// (EventSource non supporta richieste POST, quindi il parsing è manuale)
+async function readEventStream(res, onEvent) {
+	const reader = res.body.getReader();
+	const decoder = new TextDecoder();
+	let buffer = '';
+
+	while (true) {
+		const { value, done } = await reader.read();
+		if (done) break;
+		buffer += decoder.decode(value, { stream: true });
+
+		// Ogni evento SSE termina con una riga vuota
+		let sep;
+		while ((sep = buffer.indexOf('\n\n')) !== -1) {
+			const frame = buffer.slice(0, sep);
+			buffer = buffer.slice(sep + 2);
+
+			let event = 'message';
+			let data = '';
+			for (const line of frame.split('\n')) {
+				if (line.startsWith('event: ')) event = line.slice(7);
+				else if (line.startsWith('data: ')) data += line.slice(6);
+			}
+			if (data) onEvent(event, JSON.parse(data));
+		}
 	}
+}
 
-	// Decodifica base64 → stringa binaria
-	const bytes = atob(base64Audio);
-	// Crea array di byte
+// base64ToBlob: converte una stringa base64 in un Blob del tipo indicato
+function base64ToBlob(base64Str, type) {
+	const bytes = atob(base64Str);
 	const arr = new Uint8Array(bytes.length);
 	for (let i = 0; i < bytes.length; i++) arr[i] = bytes.charCodeAt(i);
+	return new Blob([arr], { type });
+}
 
-	// Crea un Blob audio e imposta la sorgente dell'elemento <audio>
-	const audio = document.createElement('audio');
-	audio.controls = true;
-	audio.src = URL.createObjectURL(new Blob([arr], { type: 'audio/wav' }));
-	container.appendChild(audio);
+// createAudioQueue: riproduce in sequenza i segmenti audio ricevuti in streaming,
+// così la prima frase parte mentre le successive sono ancora in sintesi
+function createAudioQueue() {
+	const pending = [];
+	const audio = new Audio();
+	let playing = false;
+
+	function playNext() {
+		if (!pending.length) {
+			playing = false;
+			return;
+		}
+		playing = true;
+		audio.src = pending.shift();
+		audio.play().catch(err => {
+			console.log('Autoplay TTS fallito:', err);
+			playing = false;
+		});
+	}
 
-	// Aggiunge il messaggio alla chat e scroll automatico
-	chat.appendChild(container);
-	chat.scrollTop = chat.scrollHeight;
+	audio.onended = playNext;
 
-	// Riproduzione automatica appena arriva l'audio
-	audio.play().catch(err => {
-		console.log('Autoplay fallito:', err);
-	});
+	return {
+		push(url) {
+			pending.push(url);
+			if (!playing) playNext();
+		}
+	};
 }
 
-// playTTS: riproduce un audio generato dal TTS (Text-to-Speech)
-// base64Str = stringa base64 contenente l'audio WAV
-function playTTS(base64Str) {
-	// Decodifica la stringa base64 in una stringa binaria
-	const bytes = atob(base64Str);
-	// Converte la stringa binaria in un array di byte (Uint8Array)
-	const arr = new Uint8Array(bytes.length);
-	for (let i = 0; i < bytes.length; i++) arr[i] = bytes.charCodeAt(i);
+// createBotMessage: crea il gestore degli eventi di una risposta in streaming
+// (comune a SSE e WebSocket) che aggiorna il messaggio del bot man mano che
+// arrivano token e segmenti audio
+// onUser = callback opzionale per la trascrizione (solo messaggi vocali)
+function createBotMessage(withAudio, onUser = null) {
+	// Messaggio del bot aggiornato progressivamente
+	const div = document.createElement('div');
+	div.className = 'msg ai';
+	const text = document.createElement('p');
+	div.appendChild(text);
+
+	const player = withAudio ? createAudioQueue() : null;
+	let shown = false;
+
+	// Il messaggio del bot viene inserito dopo l'eventuale trascrizione utente
+	function show() {
+		if (shown) return;
+		chat.appendChild(div);
+		shown = true;
+	}
 
-	// Crea un Blob con MIME type audio/wav
-	const blob = new Blob([arr], { type: 'audio/wav' });
+	return (event, data) => {
+		// Trascrizioni parziali (WebSocket): la risposta non è ancora iniziata
+		if (event === 'partial') return;
+
+		if (event === 'user') {
+			if (onUser) onUser(data.user);
+			return;
+		}
+
+		show();
+		if (event === 'token') text.textContent += data.text;
+		// Ogni frase sintetizzata viene accodata al player appena arriva
+		else if (event === 'audio') player.push(URL.createObjectURL(base64ToBlob(data.base64, 'audio/wav')));
+		// A fine generazione sostituisce il testo grezzo con la versione HTML
+		else if (event === 'done') text.innerHTML = data.html;
+		else if (event === 'error') text.textContent = 'Errore: ' + data.error;
+		chat.scrollTop = chat.scrollHeight;
+	};
+}
 
-	// Crea un oggetto Audio e assegna come sorgente il Blob appena creato
-	const audio = new Audio(URL.createObjectURL(blob));
+// streamMessage: invia una richiesta a un endpoint di streaming (SSE) e mostra
+// la risposta del bot man mano che arriva
+async function streamMessage(endpoint, options, withAudio, onUser = null) {
+	const res = await fetch(endpoint + (withAudio ? '?tts=1' : ''), options);
+	const type = res.headers.get('Content-Type') || '';
+
+	// Errori di validazione arrivano come JSON normale; altri errori (es. route
+	// non disponibile con il profilo attivo) come pagina HTML
+	if (!res.ok || !type.startsWith('text/event-stream')) {
+		if (type.startsWith('application/json')) {
+			const data = await res.json();
+			appendMessage('Errore: ' + (data.error || JSON.stringify(data)));
+		} else {
+			appendMessage('Errore: ' + res.status + ' ' + res.statusText);
+		}
+		return;
+	}
+
+	await readEventStream(res, createBotMessage(withAudio, onUser));
+}
 
-	// Riproduzione automatica appena arriva l'audio
-	audio.play().catch(err => {
-		console.log('Autoplay TTS fallito:', err);
+// streamSocketMessage: chiude la domanda vocale sul WebSocket (l'audio è già
+// stato inviato durante la registrazione) e mostra la risposta del bot
+// Si risolve alla fine della risposta o alla chiusura del WebSocket
+function streamSocketMessage(ws, withAudio, onUser) {
+	const onEvent = createBotMessage(withAudio, onUser);
+
+	return new Promise(resolve => {
+		ws.onmessage = e => {
+			const { event, data } = JSON.parse(e.data);
+			if (event === 'session') return rememberSession(data);
+			onEvent(event, data);
+			if (event === 'done' || event === 'error') ws.close();
+		};
+		ws.onclose = resolve;
+		ws.send(JSON.stringify({ event: 'end', tts: withAudio }));
 	});
 }
 
+// openLiveSocket: apre il WebSocket di trascrizione e inizia a inviare il
+// microfono come PCM 16-bit mono a 16 kHz; in caso di errore resta il fallback
+// su /audio/stream con la registrazione completa
+function openLiveSocket(stream) {
+	if (!features.stt_stream || !window.WebSocket || !window.AudioContext) return;
+
+	const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+	const query = sessionId ? '?session=' + encodeURIComponent(sessionId) : '';
+	const ws = new WebSocket(protocol + '//' + location.host + AUDIO_WS_ENDPOINT + query);
+	ws.binaryType = 'arraybuffer';
+	// Durante la registrazione interessa solo l'id di sessione (le trascrizioni parziali sono ignorate)
+	ws.onmessage = e => {
+		const { event, data } = JSON.parse(e.data);
+		if (event === 'session') rememberSession(data);
+	};
+	// Server senza flask-sock o connessione rifiutata: si usa /audio/stream
+	ws.onerror = () => { if (liveSocket === ws) liveSocket = null; };
+	liveSocket = ws;
+
+	const context = new AudioContext({ sampleRate: WS_SAMPLE_RATE });
+	const source = context.createMediaStreamSource(stream);
+	const processor = context.createScriptProcessor(4096, 1, 1);
+
+	processor.onaudioprocess = e => {
+		if (ws.readyState !== WebSocket.OPEN) return;
+		const samples = e.inputBuffer.getChannelData(0);
+		const pcm = new Int16Array(samples.length);
+		for (let i = 0; i < samples.length; i++) {
+			pcm[i] = Math.max(-1, Math.min(1, samples[i])) * 0x7fff;
+		}
+		ws.send(pcm.buffer);
+	};
+
+	source.connect(processor);
+	processor.connect(context.destination);
+	liveCapture = { context, source, processor };
+}
+
+// stopLiveCapture: interrompe l'invio del microfono (il WebSocket resta aperto fino all'invio)
+function stopLiveCapture() {
+	if (!liveCapture) return;
+	liveCapture.processor.disconnect();
+	liveCapture.source.disconnect();
+	liveCapture.context.close();
+	liveCapture = null;
+}
+
+// closeLiveSocket: scarta la domanda in corso sul WebSocket (nuova registrazione)
+function closeLiveSocket() {
+	stopLiveCapture();
+	if (liveSocket) liveSocket.close();
+	liveSocket = null;
+}
+
 // sendTextMessage: invia il testo scritto dall'utente al backend
 // Se il flag TTS è attivo, chiede anche la risposta vocale
 async function sendTextMessage() {
@@ -130,23 +305,14 @@ async function sendTextMessage() {
 	setBusy(true);
 
 	try {
-		// Se il flag TTS è selezionato, aggiunge il parametro alla query
-		const ttsQuery = ttsFlag.checked ? '?tts=1' : '';
-
-		// Invia il messaggio al backend (endpoint /test) via POST
-		const res = await fetch(TEXT_ENDPOINT + ttsQuery, {
+		// Invia il messaggio al backend (endpoint /test/stream) via POST:
+		// il testo arriva token per token e, se il flag TTS è selezionato,
+		// l'audio arriva frase per frase
+		await streamMessage(TEXT_STREAM_ENDPOINT, {
 			method: 'POST',
-			headers: { 'Content-Type': 'application/json' },
+			headers: sessionHeaders({ 'Content-Type': 'application/json' }),
 			body: JSON.stringify({ message })
-		});
-
-		// Legge la risposta JSON dal server
-		const data = await res.json();
-
-		// Se la risposta contiene audio base64, aggiungi messaggio audio del bot
-		if (data.base64) appendBotAudio(data.base64, data.response || '');
-		// Altrimenti mostra la risposta testuale
-		else appendMessage(data.response || JSON.stringify(data), 'ai', true);
+		}, ttsFlag.checked);
 
 	} catch (err) {
 		// In caso di errore di rete o backend, mostra l'errore nella chat
@@ -167,24 +333,28 @@ async function sendAudioMessage() {
 	setBusy(true);
 
 	try {
-		// Se il flag TTS è selezionato, aggiunge il parametro alla query
-		const ttsQuery = ttsFlag.checked ? '?tts=1' : '';
-
-		// Invia l'audio al backend (endpoint /audio) via POST
-		const res = await fetch(AUDIO_ENDPOINT + ttsQuery, {
-			method: 'POST',
-			body: recordedBlob
-		});
-
-		// Legge la risposta JSON dal server
-		const data = await res.json();
-
+		// Copia locale: il blob viene azzerato nel blocco finally
+		const blob = recordedBlob;
 		// Mostra l'audio inviato dall'utente e la trascrizione
-		appendUserAudio(recordedBlob, data.user || 'Trascrizione non disponibile');
-
-		// Mostra la risposta del bot: audio + trascrizione se disponibile
-		if (data.base64) appendBotAudio(data.base64, data.response || '');
-		else appendMessage(data.response || JSON.stringify(data), 'ai', true);
+		const onUser = transcription => appendUserAudio(blob, transcription || 'Trascrizione non disponibile');
+
+		const ws = liveSocket;
+		liveSocket = null;
+
+		if (ws && ws.readyState === WebSocket.OPEN) {
+			// L'audio è già stato trascritto durante la registrazione (endpoint /audio/ws):
+			// resta solo l'ultimo segmento, poi arriva la risposta in streaming
+			await streamSocketMessage(ws, ttsFlag.checked, onUser);
+		} else {
+			if (ws) ws.close();
+			// Invia l'audio al backend (endpoint /audio/stream) via POST:
+			// prima arriva la trascrizione, poi la risposta in streaming
+			await streamMessage(AUDIO_STREAM_ENDPOINT, {
+				method: 'POST',
+				headers: sessionHeaders(),
+				body: blob
+			}, ttsFlag.checked, onUser);
+		}
 
 	} catch (err) {
 		// In caso di errore di rete o backend, mostra l'errore nella chat
@@ -213,9 +383,13 @@ recBtn.addEventListener('click', async () => {
 	// Se il registratore è già attivo, interrompe la registrazione
 	if (recorder && recorder.state === 'recording') {
 		recorder.stop();
+		stopLiveCapture();
 		return;
 	}
 
+	// Una nuova registrazione scarta la domanda precedente non inviata
+	closeLiveSocket();
+
 	try {
 		// Richiede il permesso di accedere al microfono
 		const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
@@ -244,8 +418,14 @@ recBtn.addEventListener('click', async () => {
 			downloadBtn.disabled = false;
 		};
 
-		// Avvia la registrazione
+		// Avvia la registrazione e, se possibile, la trascrizione in streaming
 		recorder.start();
+		try {
+			openLiveSocket(stream);
+		} catch (err) {
+			// AudioContext non disponibile a 16 kHz: si usa /audio/stream
+			closeLiveSocket();
+		}
 
 		// Cambia il testo del pulsante per indicare che la registrazione è in corso
 		recBtn.textContent = '⏹️';
@@ -308,4 +488,29 @@ msgInput.addEventListener('keydown', e => {
 		e.preventDefault();
 		sendTextMessage();
 	}
-});
\ No newline at end of file
+});
+
+// loadFeatures: legge da /health le funzionalità del profilo attivo e nasconde
+// i controlli non supportati (microfono senza STT, risposta audio senza TTS)
+async function loadFeatures() {
+	try {
+		const res = await fetch(HEALTH_ENDPOINT);
+		const type = res.headers.get('Content-Type') || '';
+		if (!res.ok || !type.startsWith('application/json')) return;
+		features = { ...features, ...(await res.json()).features };
+	} catch (err) {
+		// Server non raggiungibile: restano i controlli predefiniti
+		return;
+	}
+
+	if (!features.stt) {
+		recBtn.style.display = 'none';
+		audioControls.style.display = 'none';
+	}
+	if (!features.tts) {
+		ttsFlag.checked = false;
+		ttsOption.style.display = 'none';
+	}
+}
+
+loadFeatures();
@@ -0,0 +1,103 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.documents import Document
+
+from core.config import ModelConfig
+from core.context_builder import (
+    Passage,
+    build_document_context,
+    estimate_tokens,
+    merge_overlapping,
+    remove_near_duplicates,
+)
+
+
+def doc(text: str, source: str = "alice.pdf") -> Document:
+    return Document(page_content=text, metadata={"source": source})
+
+
+def sentence(n: int) -> str:
+    """Frase di prova di lunghezza fissa, senza parole in comune con quelle degli altri n."""
+    return " ".join(f"p{n:03d}x{j:02d}" for j in range(10)) + ". "
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("x") == 1
+    assert estimate_tokens("x" * ModelConfig.CHARS_PER_TOKEN * 3) == 3
+    assert estimate_tokens("x" * (ModelConfig.CHARS_PER_TOKEN * 3 + 1)) == 4
+
+
+def test_overlapping_chunks_of_the_same_source_are_merged():
+    text = "".join(sentence(i) for i in range(6))
+    first, second = text[:250], text[200:]
+
+    merged = merge_overlapping([Passage(second, "alice.pdf", 0), Passage(first, "alice.pdf", 1)])
+    assert len(merged) == 1
+    assert merged[0].text == text
+    # Il passaggio unito conserva la posizione migliore
+    assert merged[0].rank == 0
+
+
+def test_chunks_of_different_sources_are_not_merged():
+    text = "".join(sentence(i) for i in range(6))
+    merged = merge_overlapping([Passage(text[:250], "a.pdf", 0), Passage(text[200:], "b.pdf", 1)])
+    assert len(merged) == 2
+
+
+def test_contained_chunk_is_merged():
+    text = "".join(sentence(i) for i in range(4))
+    merged = merge_overlapping([Passage(text, "alice.pdf", 1), Passage(text[50:120], "alice.pdf", 0)])
+    assert [(p.text, p.rank) for p in merged] == [(text, 0)]
+
+
+def test_near_duplicates_keep_the_most_relevant():
+    text = "".join(sentence(i) for i in range(5))
+    passages = [
+        Passage(text, "a.pdf", 0),
+        Passage(text.upper(), "b.pdf", 1),
+        Passage(sentence(99), "c.pdf", 2),
+    ]
+    kept = remove_near_duplicates(passages)
+    assert [p.source for p in kept] == ["a.pdf", "c.pdf"]
+
+
+def test_context_respects_the_token_budget():
+    documents = [doc(sentence(i) * 4, source=f"{i}.pdf") for i in range(10)]
+    budget = estimate_tokens(documents[0].page_content.strip()) * 3
+
+    context = build_document_context(documents, token_budget=budget)
+    passages = context.split("\n\n")
+    assert len(passages) == 3
+    assert sum(estimate_tokens(p) for p in passages) <= budget
+    # Selezione per pertinenza: i primi documenti recuperati
+    assert passages == [d.page_content.strip() for d in documents[:3]]
+
+
+def test_passages_that_do_not_fit_are_skipped():
+    documents = [doc(sentence(1) * 20, "a.pdf"), doc(sentence(2), "b.pdf"), doc(sentence(3), "c.pdf")]
+    budget = estimate_tokens(sentence(2)) * 2 + 1
+
+    context = build_document_context(documents, token_budget=budget)
+    assert context.split("\n\n") == [sentence(2).strip(), sentence(3).strip()]
+
+
+def test_single_long_passage_is_truncated():
+    text = "".join(sentence(i) for i in range(50))
+    context = build_document_context([doc(text)], token_budget=40)
+
+    assert 0 < estimate_tokens(context) <= 40
+    assert text.startswith(context)
+    # Troncato alla fine di una frase o di una parola, mai a metà parola
+    assert text[len(context)] == " "
+
+
+def test_overlapping_chunks_are_not_repeated():
+    text = "".join(sentence(i) for i in range(8))
+    documents = [doc(text[:300]), doc(text[250:]), doc("")]
+
+    context = build_document_context(documents, token_budget=10000)
+    assert context == text.strip()
@@ -0,0 +1,238 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+
+import numpy as np
+import pytest
+
+from core.config import EmbeddingConfig, RetrievalConfig
+from core.lexical_index import BM25Index, tokenize
+from core.vector_db import write_vector_db
+from core.vector_utils import (
+    HybridRetriever,
+    VectorIndex,
+    VectorIndexRetriever,
+    build_lexical_index,
+    lexical_index_path,
+    open_vector_db,
+)
+
+
+TEXTS = [
+    "Il Cappellaio Matto prende il tè con la Lepre Marzolina",
+    "Alice cade nella tana del Bianconiglio",
+    "La Regina di Cuori grida: tagliatele la testa!",
+    "Il Bianconiglio ha fretta, il Bianconiglio è in ritardo",
+    "Il Gatto del Cheshire sorride ad Alice",
+    "",
+]
+
+
+class CountingEmbeddings:
+    """Embedding di prova (vettori pseudo-casuali per testo) che conta le chiamate."""
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.calls = 0
+
+    def _vector(self, text: str) -> list:
+        rng = np.random.default_rng(sum(text.encode("utf-8")))
+        return rng.normal(size=self.dim).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: list) -> list:
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+
+def bm25_reference(texts: list, query: str, k1: float, b: float) -> np.ndarray:
+    """Punteggi BM25 calcolati direttamente dalla definizione."""
+    docs = [tokenize(text) for text in texts]
+    avgdl = sum(len(d) for d in docs) / len(docs)
+    scores = np.zeros(len(docs))
+    for term in set(tokenize(query)):
+        df = sum(term in d for d in docs)
+        if not df:
+            continue
+        idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.count(term)
+            scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avgdl))
+    return scores
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "alice.db.bm25")
+
+
+def test_tokenize():
+    assert tokenize("Dell'Alice e il Bianconiglio, PERCHÉ?") == ["dell", "alice", "bianconiglio"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 1000])
+def test_scores_match_reference(index_path, batch_size):
+    bm25 = BM25Index.build(TEXTS, index_path, batch_size=batch_size)
+    assert bm25.count == len(TEXTS)
+
+    for query in ["Bianconiglio", "Alice Bianconiglio", "regina testa", "lepre marzolina tè"]:
+        expected = bm25_reference(TEXTS, query, bm25.k1, bm25.b)
+        ids, scores, _ = bm25.search(query, k=len(TEXTS))
+        assert np.allclose(scores, expected[ids], rtol=1e-5)
+        assert sorted(ids.tolist()) == np.flatnonzero(expected > 0).tolist()
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_build_is_independent_of_batch_size(tmp_path):
+    texts = [f"parola{i % 7} termine{i % 13} comune" for i in range(100)]
+    small = BM25Index.build(texts, str(tmp_path / "a.bm25"), batch_size=3)
+    large = BM25Index.build(texts, str(tmp_path / "b.bm25"), batch_size=1000)
+
+    assert list(small.vocab) == list(large.vocab) == sorted(set(t for text in texts for t in tokenize(text)))
+    assert np.array_equal(small.term_offsets, large.term_offsets)
+    assert np.array_equal(small.doc_ids, large.doc_ids)
+    assert np.array_equal(small.tfs, large.tfs)
+
+
+def test_saved_index_is_memory_mapped(index_path):
+    BM25Index.build(TEXTS, index_path)
+
+    # Nessun file temporaneo lasciato dalla costruzione
+    assert os.listdir(os.path.dirname(index_path)) == [os.path.basename(index_path)]
+
+    bm25 = BM25Index.load(index_path)
+    assert isinstance(bm25.doc_ids, np.memmap)
+    assert bm25.vocab.index("bianconiglio") >= 0
+    assert bm25.vocab.index("stregatto") == -1
+
+
+def test_truncated_index_is_rejected(index_path):
+    BM25Index.build(TEXTS, index_path)
+    with open(index_path, "r+b") as f:
+        f.truncate(os.path.getsize(index_path) - 4)
+
+    with pytest.raises(ValueError):
+        BM25Index.load(index_path)
+
+
+def test_full_match_and_deleted_rows(index_path):
+    bm25 = BM25Index.build(TEXTS, index_path)
+
+    ids, _, full = bm25.search("Alice Bianconiglio", k=10)
+    assert dict(zip(ids.tolist(), full.tolist())) == {1: True, 3: False, 4: False}
+
+    deleted = np.zeros(len(TEXTS), dtype=np.uint8)
+    deleted[1] = 1
+    ids, _, _ = bm25.search("Alice Bianconiglio", k=10, deleted=deleted)
+    assert 1 not in ids.tolist()
+
+
+def test_empty_corpus_and_unknown_terms(index_path):
+    bm25 = BM25Index.build([], index_path)
+    assert bm25.count == 0
+    assert len(bm25.search("Alice", k=3)[0]) == 0
+
+    bm25 = BM25Index.build(TEXTS, index_path)
+    assert len(bm25.search("stregatto", k=3)[0]) == 0
+    assert len(bm25.search("il la", k=3)[0]) == 0
+
+
+def make_index(tmp_path, embeddings, with_lexical: bool = True) -> VectorIndex:
+    """Database di prova con embedding del modello configurato ed eventuale indice BM25."""
+    db_path = str(tmp_path / "alice.db")
+    vectors = embeddings.embed_documents(TEXTS)
+    write_vector_db(db_path, vectors, [(str(i), text, {}) for i, text in enumerate(TEXTS)], EmbeddingConfig.NAME)
+    if with_lexical:
+        build_lexical_index(db_path)
+    embeddings.calls = 0
+    return VectorIndex([open_vector_db(db_path)], embeddings)
+
+
+def test_scores_across_databases_use_the_whole_corpus(tmp_path):
+    # Un database piccolo e uno grande: i punteggi devono coincidere con un unico indice
+    texts = TEXTS + [f"Bianconiglio orologio {i}" for i in range(20)] + ["Alice e la Regina"]
+    embeddings = CountingEmbeddings()
+    dbs = []
+    for name, part in [("piccolo.db", texts[:2]), ("grande.db", texts[2:])]:
+        db_path = str(tmp_path / name)
+        write_vector_db(db_path, embeddings.embed_documents(part), [(str(i), t, {}) for i, t in enumerate(part)], EmbeddingConfig.NAME)
+        build_lexical_index(db_path)
+        dbs.append(open_vector_db(db_path))
+    index = VectorIndex(dbs, embeddings)
+
+    for query in ["Bianconiglio", "Alice Regina", "tana Bianconiglio"]:
+        bm25 = dbs[0].lexical
+        expected = bm25_reference(texts, query, bm25.k1, bm25.b)
+        ids, scores, _ = index.lexical_search(query, k=len(texts))
+        assert np.allclose(scores, expected[ids], rtol=1e-5)
+        assert sorted(ids.tolist()) == np.flatnonzero(expected > 0).tolist()
+
+
+def test_rrf_fusion_order(tmp_path):
+    retriever = HybridRetriever(make_index(tmp_path, CountingEmbeddings()), k=3)
+
+    # 7 è primo per una classifica e secondo per l'altra: somma più alta
+    fused = retriever._fuse(np.array([7, 1, 2]), np.array([3, 7, 1]))
+    assert fused == [7, 1, 3]
+
+    # Un documento presente in una sola classifica non supera uno presente in entrambe
+    assert retriever._fuse(np.array([5]), np.array([6, 5]))[0] == 5
+
+
+def test_lexical_fast_path_skips_the_embedding(tmp_path, monkeypatch):
+    monkeypatch.setattr(RetrievalConfig, "LEXICAL_FAST_PATH", True)
+    embeddings = CountingEmbeddings()
+    retriever = HybridRetriever(make_index(tmp_path, embeddings), k=1)
+
+    docs, vector = retriever.search("Bianconiglio")
+    assert vector is None and embeddings.calls == 0
+    assert docs[0].page_content == TEXTS[3]
+    assert retriever.stats() == {"lexical": 1, "hybrid": 0}
+
+
+def test_hybrid_path_returns_the_query_embedding(tmp_path, monkeypatch):
+    monkeypatch.setattr(RetrievalConfig, "LEXICAL_FAST_PATH", False)
+    embeddings = CountingEmbeddings()
+    retriever = HybridRetriever(make_index(tmp_path, embeddings), k=2)
+
+    docs, vector = retriever.search("Bianconiglio")
+    assert embeddings.calls == 1
+    assert np.allclose(vector, embeddings.embed_query("Bianconiglio"))
+    assert len(docs) == 2
+    assert retriever.stats() == {"lexical": 0, "hybrid": 1}
+
+    # Batch: un'unica chiamata di embedding per tutte le query non lessicali
+    embeddings.calls = 0
+    results = retriever.batch(["Alice", "Regina di Cuori", "Cappellaio"])
+    assert embeddings.calls == 1 and [len(r) for r in results] == [2, 2, 2]
+
+
+def test_stats_are_counted_across_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(RetrievalConfig, "LEXICAL_FAST_PATH", True)
+    retriever = HybridRetriever(make_index(tmp_path, CountingEmbeddings()), k=1)
+
+    def worker():
+        for _ in range(50):
+            retriever.search("Bianconiglio")
+            retriever.search("Regina Bianconiglio")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert retriever.stats() == {"lexical": 400, "hybrid": 400}
+
+
+def test_missing_lexical_index_falls_back_to_vector_search(tmp_path):
+    index = make_index(tmp_path, CountingEmbeddings(), with_lexical=False)
+
+    assert not os.path.exists(lexical_index_path(index.dbs[0].path))
+    assert not index.has_lexical
+    assert isinstance(index.as_retriever(k=2, mode="hybrid"), VectorIndexRetriever)
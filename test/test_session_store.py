@@ -0,0 +1,148 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.session_store as session_store
+from core.session_store import SessionStore
+
+
+def make_store(**kwargs) -> SessionStore:
+    """Archivio con limiti ampi, sovrascrivibili dal singolo test."""
+    options = {"max_messages": 6, "max_sessions": 100, "idle_timeout": 1800, "memory_limit": 1 << 30}
+    options.update(kwargs)
+    return SessionStore(**options)
+
+
+class FakeClock:
+    """Orologio monotono controllato dal test."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sessions_are_isolated():
+    store = make_store()
+    store.append("a", "human", "ciao")
+    store.append("b", "human", "buongiorno")
+
+    assert store.get_history("a") == [("human", "ciao")]
+    assert store.get_history("b") == [("human", "buongiorno")]
+    assert store.get_history("c") == []
+
+
+def test_history_is_a_ring_buffer():
+    store = make_store(max_messages=4)
+    for i in range(6):
+        store.append("a", "human", f"messaggio {i}")
+
+    assert [m for _, m in store.get_history("a")] == [f"messaggio {i}" for i in range(2, 6)]
+
+
+def test_lru_eviction_over_max_sessions():
+    store = make_store(max_sessions=2)
+    store.append("a", "human", "1")
+    store.append("b", "human", "2")
+    # "a" diventa la più recente: la meno usata è "b"
+    store.get_history("a")
+    store.append("c", "human", "3")
+
+    assert store.stats()["sessions"] == 2
+    assert store.get_history("b") == []
+    assert store.get_history("a") and store.get_history("c")
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_store.time, "monotonic", clock)
+    store = make_store(idle_timeout=60)
+    store.append("a", "human", "1")
+
+    clock.now += 61
+    store.append("b", "human", "2")
+
+    assert store.get_history("a") == []
+    assert store.get_history("b") == [("human", "2")]
+
+
+def test_memory_limit_keeps_the_active_session():
+    store = make_store(memory_limit=1)
+    store.append("a", "human", "x" * 100)
+    store.append("b", "human", "y" * 100)
+
+    # Oltre il limite resta solo la sessione appena usata
+    assert store.stats()["sessions"] == 1
+    assert store.get_history("b") == [("human", "y" * 100)]
+
+
+def test_memory_accounting_returns_to_zero():
+    store = make_store(max_messages=2)
+    for i in range(5):
+        store.append("a", "human", f"messaggio {i}")
+    assert store.stats()["memory"] > 0
+
+    store.clear("a")
+    assert store.stats() == {"sessions": 0, "memory": 0}
+
+
+def test_fold_replaces_summarised_messages():
+    store = make_store(max_messages=40)
+    for i in range(4):
+        store.append("a", "human", f"domanda {i} " + "parola " * 20)
+        store.append("a", "assistant", f"risposta {i} " + "parola " * 20)
+
+    pending = store.pending_summary("a", token_budget=40)
+    assert pending is not None
+    summary, ref, messages = pending
+    assert summary == ""
+    assert messages[0][1].startswith("domanda 0")
+
+    store.fold("a", "riassunto", ref)
+    new_summary, history = store.get_context("a")
+    assert new_summary == "riassunto"
+    # Restano solo i messaggi non riassunti, a partire da una domanda
+    assert history == store.get_history("a")
+    assert len(history) == 8 - len(messages)
+    assert history[0][0] == "human"
+
+
+def test_fold_keeps_messages_added_meanwhile():
+    store = make_store(max_messages=40)
+    for i in range(4):
+        store.append("a", "human", f"domanda {i} " + "parola " * 20)
+        store.append("a", "assistant", f"risposta {i} " + "parola " * 20)
+    _, ref, messages = store.pending_summary("a", token_budget=40)
+
+    # Nuovo scambio arrivato mentre il riassunto era in corso
+    store.append("a", "human", "nuova domanda")
+    store.fold("a", "riassunto", ref)
+
+    history = store.get_history("a")
+    assert len(history) == 9 - len(messages)
+    assert history[-1] == ("human", "nuova domanda")
+
+
+def test_fold_is_ignored_for_a_recreated_session():
+    store = make_store(max_messages=40)
+    for i in range(4):
+        store.append("a", "human", f"domanda {i} " + "parola " * 20)
+        store.append("a", "assistant", f"risposta {i} " + "parola " * 20)
+    _, ref, _ = store.pending_summary("a", token_budget=40)
+
+    store.clear("a")
+    store.append("a", "human", "nuova sessione")
+    store.fold("a", "riassunto obsoleto", ref)
+
+    assert store.get_context("a") == ("", [("human", "nuova sessione")])
+
+
+def test_context_tail_always_includes_last_exchange():
+    store = make_store()
+    store.append("a", "human", "parola " * 500)
+    store.append("a", "assistant", "parola " * 500)
+
+    _, history = store.get_context("a", token_budget=10)
+    assert len(history) == 2
@@ -0,0 +1,132 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from core.streaming_asr import StreamingTranscriber
+from core.vad import VoiceActivitySegmenter, frame_energies
+
+
+SAMPLE_RATE = 16000
+FRAME = SAMPLE_RATE * 30 // 1000
+
+
+def tone(ms: int, amplitude: float = 0.3) -> np.ndarray:
+    """Tono a 220 Hz (parlato simulato)."""
+    t = np.arange(SAMPLE_RATE * ms // 1000) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(ms: int) -> np.ndarray:
+    return np.zeros(SAMPLE_RATE * ms // 1000, dtype=np.float32)
+
+
+def make_segmenter(**kwargs) -> VoiceActivitySegmenter:
+    """Segmentatore con parametri espliciti (frame da 30 ms), indipendenti dalla configurazione."""
+    options = {"sample_rate": SAMPLE_RATE, "frame_ms": 30, "threshold_db": -45, "margin_db": 12,
+               "silence_ms": 480, "min_speech_ms": 240, "max_segment_s": 15, "padding_ms": 180}
+    options.update(kwargs)
+    return VoiceActivitySegmenter(**options)
+
+
+def test_frame_energies():
+    frames = np.stack([tone(30), silence(30)])
+    energies = frame_energies(frames)
+
+    # Sinusoide di ampiezza 0.3: RMS 0.3 / √2
+    assert abs(energies[0] - 20 * np.log10(0.3 / np.sqrt(2))) < 0.1
+    assert energies[1] < -150
+
+
+def test_utterances_separated_by_a_pause():
+    vad = make_segmenter()
+    audio = np.concatenate([silence(600), tone(600), silence(900), tone(900), silence(900)])
+
+    segments = vad.feed(audio)
+    assert len(segments) == 2
+    # Parlato più 6 frame (180 ms) di margine prima e dopo
+    assert len(segments[0]) == len(tone(600)) + 2 * 6 * FRAME
+    assert len(segments[1]) == len(tone(900)) + 2 * 6 * FRAME
+    assert vad.flush() is None
+
+
+def test_segment_keeps_the_speech_samples():
+    vad = make_segmenter()
+    speech = tone(600)
+    segments = vad.feed(np.concatenate([silence(600), speech, silence(600)]))
+
+    assert np.array_equal(segments[0][6 * FRAME:6 * FRAME + len(speech)], speech)
+    assert not segments[0][:6 * FRAME].any() and not segments[0][-6 * FRAME:].any()
+
+
+def test_short_noise_is_dropped():
+    vad = make_segmenter()
+    assert vad.feed(np.concatenate([silence(600), tone(60), silence(900)])) == []
+    assert vad.flush() is None
+
+
+def test_silence_yields_no_segments():
+    vad = make_segmenter()
+    assert vad.feed(silence(3000)) == []
+    assert vad.flush() is None
+
+
+def test_chunking_does_not_change_the_segments():
+    audio = np.concatenate([silence(300), tone(450), silence(600), tone(1200), silence(600)])
+    whole = make_segmenter().feed(audio)
+
+    vad = make_segmenter()
+    chunked = []
+    rng = np.random.default_rng(0)
+    start = 0
+    while start < len(audio):
+        size = int(rng.integers(1, 2000))
+        chunked += vad.feed(audio[start:start + size])
+        start += size
+
+    assert len(chunked) == len(whole) == 2
+    for a, b in zip(chunked, whole):
+        assert np.array_equal(a, b)
+
+
+def test_long_speech_is_split_at_max_duration():
+    vad = make_segmenter(max_segment_s=1.2)
+    segments = vad.feed(np.concatenate([tone(3000), silence(600)]))
+
+    assert len(segments) == 3
+    # 1.2 s = 40 frame per segmento, l'ultimo chiuso dalla pausa
+    assert [len(s) // FRAME for s in segments[:2]] == [40, 40]
+    assert all(len(s) <= 40 * FRAME for s in segments)
+
+
+def test_flush_returns_trailing_speech():
+    vad = make_segmenter()
+    audio = np.concatenate([silence(300), tone(500)])
+    assert vad.feed(audio) == []
+
+    segment = vad.flush()
+    # Anche i campioni che non completano un frame fanno parte del segmento
+    assert len(segment) == 6 * FRAME + len(tone(500))
+    assert vad.flush() is None
+
+
+def test_streaming_transcriber_transcribes_segments_in_order():
+    calls = []
+
+    def transcribe(samples, prompt):
+        calls.append((len(samples), prompt))
+        return f"frase{len(calls)}"
+
+    audio = np.concatenate([silence(300), tone(600), silence(900), tone(600)])
+    pcm = (audio * 32767).astype("<i2").tobytes()
+
+    streaming = StreamingTranscriber(transcribe, sample_rate=SAMPLE_RATE, keep_audio=True)
+    started = sum(streaming.feed(pcm[i:i + 3200]) for i in range(0, len(pcm), 3200))
+    assert started == 1
+
+    assert streaming.finish() == "frase1 frase2"
+    # Il secondo segmento riceve come contesto il testo già trascritto
+    assert [prompt for _, prompt in calls] == [None, "frase1"]
+    assert len(streaming.audio) == len(audio)
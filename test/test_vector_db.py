@@ -0,0 +1,132 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+from core.vector_db import (
+    VectorDB,
+    append_vector_db,
+    compact_vector_db,
+    delete_vector_rows,
+    is_vector_db,
+    write_vector_db,
+)
+
+
+def records(start: int, count: int) -> list:
+    """Record (id, testo, metadati) di prova, con testi non ASCII."""
+    return [(f"id-{i}", f"chunk {i} – perché città", {"source": "alice.pdf", "page": i}) for i in range(start, start + count)]
+
+
+def vectors(start: int, count: int, dim: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(start)
+    return rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def test_write_and_open_round_trip(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 5), records(0, 5), "modello")
+
+    assert is_vector_db(db_path)
+    db = VectorDB(db_path)
+    assert len(db) == 5 and db.dim == 8 and db.embedding_model == "modello"
+    assert db.deleted is None and db.live_count == 5
+
+    doc = db.document(3)
+    assert doc.id == "id-3"
+    assert doc.page_content == "chunk 3 – perché città"
+    assert doc.metadata == {"source": "alice.pdf", "page": 3}
+
+    # Embedding salvati normalizzati: la similarità coseno è un prodotto scalare
+    expected = vectors(0, 5)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert np.allclose(db.matrix, expected, atol=1e-6)
+
+
+def test_empty_database(tmp_path):
+    db_path = str(tmp_path / "vuoto.db")
+    write_vector_db(db_path, [], [], "modello")
+
+    db = VectorDB(db_path)
+    assert len(db) == 0 and db.live_count == 0
+
+
+def test_append_keeps_existing_rows(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 3), records(0, 3), "modello")
+
+    rows = append_vector_db(db_path, vectors(3, 2), records(3, 2))
+    assert rows == range(3, 5)
+
+    db = VectorDB(db_path)
+    assert len(db) == 5
+    assert [db.document(i).id for i in range(5)] == [f"id-{i}" for i in range(5)]
+
+    # Append su un database vuoto: la dimensione viene fissata dalle nuove righe
+    empty_path = str(tmp_path / "vuoto.db")
+    write_vector_db(empty_path, [], [], "modello")
+    assert append_vector_db(empty_path, vectors(0, 2), records(0, 2)) == range(0, 2)
+    assert VectorDB(empty_path).dim == 8
+
+
+def test_append_rejects_other_dimensions(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 3), records(0, 3), "modello")
+
+    with pytest.raises(ValueError):
+        append_vector_db(db_path, vectors(3, 1, dim=4), records(3, 1))
+
+
+def test_append_discards_interrupted_writes(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 3), records(0, 3), "modello")
+
+    # Scrittura interrotta: dati in coda ai file accessori ma intestazione invariata
+    with open(f"{db_path}.txt", "ab") as f:
+        f.write(b"record incompleto")
+    with open(f"{db_path}.vec", "ab") as f:
+        f.write(b"\0" * 12)
+
+    append_vector_db(db_path, vectors(3, 1), records(3, 1))
+    db = VectorDB(db_path)
+    assert len(db) == 4
+    assert db.document(3).id == "id-3"
+
+
+def test_delete_marks_rows_without_rewriting(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 5), records(0, 5), "modello")
+
+    delete_vector_rows(db_path, [1, 3])
+    db = VectorDB(db_path)
+    assert len(db) == 5 and db.live_count == 3
+    assert db.deleted_rows.tolist() == [1, 3]
+    # Le righe eliminate restano leggibili finché il database non viene compattato
+    assert db.document(1).id == "id-1"
+
+    # Le righe aggiunte dopo un'eliminazione non risultano eliminate
+    append_vector_db(db_path, vectors(5, 2), records(5, 2))
+    db = VectorDB(db_path)
+    assert db.deleted_rows.tolist() == [1, 3]
+    assert db.live_count == 5
+
+
+def test_compact_removes_deleted_rows(tmp_path):
+    db_path = str(tmp_path / "alice.db")
+    write_vector_db(db_path, vectors(0, 5), records(0, 5), "modello")
+    delete_vector_rows(db_path, [0, 3])
+    before = np.array(VectorDB(db_path).matrix)
+
+    mapping = compact_vector_db(db_path)
+    assert mapping.tolist() == [-1, 0, 1, -1, 2]
+
+    db = VectorDB(db_path)
+    assert len(db) == 3 and db.deleted is None
+    assert not os.path.exists(f"{db_path}.del")
+    for old, new in enumerate(mapping):
+        if new >= 0:
+            assert db.document(int(new)).id == f"id-{old}"
+            assert np.array_equal(db.matrix[new], before[old])
@@ -0,0 +1,95 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from core.vector_db import VectorDB, delete_vector_rows, write_vector_db
+from core.vector_utils import VectorIndex
+
+
+class TableEmbeddings:
+    """Embedding di prova: ogni testo ha un vettore fisso."""
+
+    def __init__(self, table: dict):
+        self.table = table
+
+    def embed_query(self, text: str) -> list:
+        return self.table[text].tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed_query(text) for text in texts]
+
+
+def open_index(tmp_path, shards: list, deleted: dict = None, embeddings=None) -> VectorIndex:
+    """Scrive un .db per ciascun gruppo di vettori e li unisce in un VectorIndex."""
+    dbs = []
+    row = 0
+    for n, matrix in enumerate(shards):
+        db_path = str(tmp_path / f"shard{n}.db")
+        write_vector_db(db_path, matrix, [(f"id-{row + i}", f"testo {row + i}", {}) for i in range(len(matrix))], "modello")
+        if deleted and n in deleted:
+            delete_vector_rows(db_path, deleted[n])
+        dbs.append(VectorDB(db_path))
+        row += len(matrix)
+    return VectorIndex(dbs, embeddings)
+
+
+def brute_force(matrix: np.ndarray, query: np.ndarray, k: int, excluded=()) -> list:
+    """Top-k per similarità coseno calcolato direttamente."""
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = matrix @ (query / np.linalg.norm(query))
+    scores[list(excluded)] = -np.inf
+    return np.argsort(-scores, kind="stable")[:k].tolist()
+
+
+def test_exact_search_matches_brute_force_across_shards(tmp_path):
+    rng = np.random.default_rng(0)
+    shards = [rng.normal(size=(n, 16)).astype(np.float32) for n in (30, 1, 45)]
+    index = open_index(tmp_path, shards)
+    matrix = np.concatenate(shards)
+
+    assert len(index) == 76
+    queries = rng.normal(size=(5, 16)).astype(np.float32)
+    ids, scores = index.search_by_vectors(queries, k=7, exact=True)
+    for query, row, row_scores in zip(queries, ids, scores):
+        assert row.tolist() == brute_force(matrix, query, 7)
+        assert np.all(np.diff(row_scores) <= 1e-6)
+
+    # Il documento restituito corrisponde alla riga globale
+    assert index.document(31).id == "id-31"
+
+
+def test_deleted_rows_are_never_returned(tmp_path):
+    rng = np.random.default_rng(1)
+    shards = [rng.normal(size=(20, 8)).astype(np.float32) for _ in range(2)]
+    index = open_index(tmp_path, shards, deleted={0: [2, 5], 1: [0]})
+    matrix = np.concatenate(shards)
+
+    query = matrix[5]
+    ids, _ = index.search_by_vectors(query, k=5, exact=True)
+    assert 5 not in ids[0] and 2 not in ids[0] and 20 not in ids[0]
+    assert ids[0].tolist() == brute_force(matrix, query, 5, excluded=(2, 5, 20))
+
+
+def test_fewer_live_rows_than_k(tmp_path):
+    rng = np.random.default_rng(2)
+    index = open_index(tmp_path, [rng.normal(size=(3, 8)).astype(np.float32)], deleted={0: [1]})
+
+    ids, scores = index.search_by_vectors(rng.normal(size=8), k=4, exact=True)
+    assert np.isfinite(scores[0]).sum() == 2
+    docs = index.similarity_search_by_vector(rng.normal(size=8), k=4, exact=True)
+    assert sorted(doc.id for doc in docs) == ["id-0", "id-2"]
+
+
+def test_text_search_and_batch_agree(tmp_path):
+    rng = np.random.default_rng(3)
+    matrix = rng.normal(size=(25, 8)).astype(np.float32)
+    table = {"prima": rng.normal(size=8), "seconda": rng.normal(size=8)}
+    index = open_index(tmp_path, [matrix], embeddings=TableEmbeddings(table))
+
+    batch = index.similarity_search_batch(["prima", "seconda"], k=3)
+    for query, docs in zip(["prima", "seconda"], batch):
+        assert [doc.id for doc in docs] == [doc.id for doc in index.similarity_search(query, k=3)]
+        assert [doc.id for doc in docs] == [f"id-{i}" for i in brute_force(matrix, table[query], 3)]
@@ -0,0 +1,81 @@
+"""
+transcribe.py
+-------------
+Trascrizione da riga di comando di molti file audio con Whisper (es. le
+domande vocali archiviate in questions/), senza passare dal modello di chat.
+
+I file vengono decodificati in parallelo e trascritti a gruppi (vedi
+core/batch_transcription.py); i risultati sono scritti come JSONL, una riga
+per file nell'ordine di ingresso.
+
+Esempi:
+    python transcribe.py questions/ --output trascrizioni.jsonl
+    python transcribe.py a.webm b.wav --batch-size 16 --workers 4
+    python transcribe.py questions/ --asr-profile low_latency
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from core.config import WhisperConfig
+from core.batch_transcription import BatchTranscriber, find_audio_files
+from core.whisper_profiles import load_whisper
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Trascrizione in blocco di file audio con Whisper (output JSONL).")
+    parser.add_argument("paths", nargs="+", help="file audio o cartelle (ricorsive)")
+    parser.add_argument("--output", default="-", help="file JSONL di uscita (default: stdout)")
+    parser.add_argument("--model", default=WhisperConfig.MODEL_PATH, help="nome o percorso del modello Whisper")
+    parser.add_argument("--device", default=WhisperConfig.DEVICE_NAME, help="dispositivo: cpu o cuda")
+    parser.add_argument("--language", default=WhisperConfig.LANGUAGE, help="lingua di trascrizione")
+    parser.add_argument("--asr-profile", default=WhisperConfig.ASR_PROFILE, choices=list(WhisperConfig.ASR_PROFILES),
+                        help="profilo di inferenza Whisper (modello int8 e preset di decodifica)")
+    parser.add_argument("--batch-size", type=int, default=WhisperConfig.BATCH_SIZE,
+                        help="enunciati elaborati dall'encoder in un forward pass")
+    parser.add_argument("--workers", type=int, default=WhisperConfig.BATCH_WORKERS,
+                        help="thread per decodifica e spettrogrammi (0 = numero di core)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    files = find_audio_files(args.paths)
+    if not files:
+        print("Errore: nessun file audio trovato", file=sys.stderr)
+        return 1
+
+    model = load_whisper(name=args.model, device=args.device, profile=args.asr_profile)
+    transcriber = BatchTranscriber(model, language=args.language, batch_size=args.batch_size,
+                                   workers=args.workers, profile=args.asr_profile)
+
+    start = time.perf_counter()
+    done = errors = 0
+    audio_seconds = 0.0
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in transcriber.transcribe((path, path) for path in files):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if "error" in result:
+                errors += 1
+                print(f"Errore su {result['file']}: {result['error']}", file=sys.stderr)
+            else:
+                done += 1
+                audio_seconds += result["duration"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Trascritti {done} file ({audio_seconds:.0f} s di audio) in {elapsed:.1f} s"
+          f" ({audio_seconds / max(elapsed, 1e-9):.1f}x tempo reale), errori: {errors}", file=sys.stderr)
+    return 0 if done else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())